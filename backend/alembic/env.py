@@ -10,7 +10,7 @@ from alembic import context
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.db.database import Base
-from app.models import User, Patient, Visit
+from app.models import User, Patient, Visit, RefreshToken
 from app.core.config import settings
 
 config = context.config
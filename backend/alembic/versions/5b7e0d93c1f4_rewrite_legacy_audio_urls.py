@@ -0,0 +1,33 @@
+"""rewrite_legacy_audio_urls
+
+Revision ID: 5b7e0d93c1f4
+Revises: c4d81e6f2a95
+Create Date: 2026-10-20 09:12:05.684211
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b7e0d93c1f4'
+down_revision: Union[str, Sequence[str], None] = 'c4d81e6f2a95'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Point visits saved with the old static /storage/audio/ URLs at the audio route."""
+    op.execute(
+        "UPDATE visits SET audio_file_url = '/api/v1/audio/files/' || substr(audio_file_url, 16) "
+        "WHERE audio_file_url LIKE '/storage/audio/%'"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(
+        "UPDATE visits SET audio_file_url = '/storage/audio/' || substr(audio_file_url, 21) "
+        "WHERE audio_file_url LIKE '/api/v1/audio/files/%'"
+    )
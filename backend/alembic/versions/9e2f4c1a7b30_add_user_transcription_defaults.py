@@ -0,0 +1,30 @@
+"""add_user_transcription_defaults
+
+Revision ID: 9e2f4c1a7b30
+Revises: 513191cf6cd4
+Create Date: 2026-10-19 19:40:12.506114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e2f4c1a7b30'
+down_revision: Union[str, Sequence[str], None] = '513191cf6cd4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('transcription_language', sa.String(length=20), nullable=True))
+    op.add_column('users', sa.Column('whisper_model', sa.String(length=50), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'whisper_model')
+    op.drop_column('users', 'transcription_language')
@@ -0,0 +1,28 @@
+"""add_visit_prompt_versions
+
+Revision ID: c4d81e6f2a95
+Revises: 9e2f4c1a7b30
+Create Date: 2026-10-19 20:31:47.218930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4d81e6f2a95'
+down_revision: Union[str, Sequence[str], None] = '9e2f4c1a7b30'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('visits', sa.Column('prompt_versions', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('visits', 'prompt_versions')
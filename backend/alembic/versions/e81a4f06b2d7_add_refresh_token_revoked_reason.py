@@ -0,0 +1,33 @@
+"""add_refresh_token_revoked_reason
+
+Revision ID: e81a4f06b2d7
+Revises: 5b7e0d93c1f4
+Create Date: 2026-10-20 09:48:31.903512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e81a4f06b2d7'
+down_revision: Union[str, Sequence[str], None] = '5b7e0d93c1f4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('refresh_tokens', sa.Column('revoked_reason', sa.String(length=20), nullable=True))
+    # Existing revocations: a successor means it was rotated, anything else ended its session
+    op.execute(
+        "UPDATE refresh_tokens SET revoked_reason = CASE WHEN replaced_by_id IS NOT NULL "
+        "THEN 'rotated' ELSE 'logout' END WHERE revoked_at IS NOT NULL"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('refresh_tokens', 'revoked_reason')
@@ -0,0 +1,45 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+from app.core.config import settings
+from app.core.security import require_roles
+from app.utils.profiler import AttributedRoute, run_in_threadpool, run_sampling_profile, slow_request_monitor
+
+router = APIRouter(route_class=AttributedRoute)
+
+
+@router.get("/profile", response_class=PlainTextResponse)
+async def profile_worker(
+    seconds: float = Query(10, gt=0, le=settings.PROFILER_MAX_SECONDS),
+    interval_ms: float = Query(settings.PROFILER_SAMPLE_INTERVAL_MS, ge=1, le=1000),
+    current_user: dict = Depends(require_roles(["admin"]))
+):
+    """
+    Samples all threads of the worker serving this request and returns folded
+    stacks, ready for flamegraph.pl, inferno or speedscope.
+    """
+    # Sample from a pool thread so the event loop itself shows up in the profile
+    folded = await run_in_threadpool(run_sampling_profile, seconds, interval_ms)
+    if folded is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A profile is already running on this worker"
+        )
+    return PlainTextResponse(folded)
+
+
+@router.get("/slow-requests")
+async def list_slow_requests(
+    current_user: dict = Depends(require_roles(["admin"]))
+):
+    return {
+        "threshold_ms": settings.SLOW_REQUEST_THRESHOLD_MS,
+        "requests": await run_in_threadpool(slow_request_monitor.slowest)
+    }
+
+
+@router.delete("/slow-requests", status_code=status.HTTP_204_NO_CONTENT)
+async def clear_slow_requests(
+    current_user: dict = Depends(require_roles(["admin"]))
+):
+    await run_in_threadpool(slow_request_monitor.clear)
+    return None
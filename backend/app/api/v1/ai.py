@@ -1,59 +1,83 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
-from fastapi.responses import FileResponse
+from typing import Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Request, status, UploadFile, File
 from sqlalchemy.orm import Session
-import os
 import uuid
 
 from app.db.database import get_db
 from app.models.visit import Visit
 from app.models.patient import Patient
-from app.schemas.ai import SOAPRequest, PrescriptionRequest, PrescriptionResponse
+from app.schemas.ai import SOAPRequest, PrescriptionRequest, PrescriptionResponse, TranscriptionResponse
 from app.services.transcription_service import transcribe_audio_from_url
-from app.utils.logger import logger
+from app.utils.logger import get_logger
+from app.utils.tracing import span
+from app.utils.profiler import AttributedRoute, run_in_threadpool
 from app.services.soap_service import generate_soap_note
+from app.services.llm_gateway import LLMUnavailableError
+from app.services.structured_output import StructuredOutputError
 from app.services.prescription_service import generate_prescription
-from app.services.pdf_service import generate_prescription_pdf
-from app.core.security import get_current_user
+from app.services.pdf_service import ensure_prescription_pdf
+from app.services.storage_service import get_storage, tmp_audio_key
+from app.utils.storage_response import storage_response
+from app.core.security import get_current_user, get_optional_user_record
+from app.services.user_cache import CachedUser
+from app.services.model_selection import ModelSelectionError, transcription_preferences
+from app.services.prompt_registry import get_prompt_registry
 from app.core.config import settings
+from app.core.cache_policy import PRIVATE_REVALIDATE, cache_policy
 
-router = APIRouter()
-
-# Directory for temporary audio uploads
-AUDIO_UPLOAD_DIR = "tmp/audio"
-os.makedirs(AUDIO_UPLOAD_DIR, exist_ok=True)
+router = APIRouter(route_class=AttributedRoute)
+logger = get_logger(__name__)
 
 
 # ============================================================
 #  TRANSCRIPTION ENDPOINT
 # ============================================================
-@router.post("/transcribe")
+@router.post("/transcribe", response_model=TranscriptionResponse, response_model_exclude_none=True)
 async def transcribe_audio_endpoint(
     audio: UploadFile = File(...),
+    word_timestamps: bool = False,
+    language: Optional[str] = None,
+    model: Optional[str] = None,
+    user: Optional[CachedUser] = Depends(get_optional_user_record),
     #current_user: dict = Depends(get_current_user)
 ):
+    """
+    `language` (ISO code, name or "auto") and `model` override the caller's
+    saved defaults, which in turn override the clinic's.
+    """
+    try:
+        language, model = transcription_preferences(user, language, model)
+    except ModelSelectionError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
     file_id = f"{uuid.uuid4()}.webm"
-    file_path = os.path.join(AUDIO_UPLOAD_DIR, file_id)
+    file_key = tmp_audio_key(file_id)
+    storage = get_storage()
 
     try:
         # Log request receipt for easier debugging and verification
-        try:
-            logger.info("POST /ai/transcribe called - filename=%s content_type=%s", audio.filename, getattr(audio, 'content_type', None))
-        except Exception:
-            # ensure logging never fails the endpoint
-            logger.info("POST /ai/transcribe called")
-        # Save uploaded audio to temporary directory
-        with open(file_path, "wb") as f:
-            f.write(await audio.read())
+        logger.info(
+            "POST /ai/transcribe called - filename=%s content_type=%s",
+            audio.filename, audio.content_type
+        )
+        # Stream the upload into temporary storage
+        with span("storage.put", attributes={"storage.key": file_key}):
+            await run_in_threadpool(storage.put, file_key, audio.file, audio.content_type)
 
-        # Perform transcription
-        result = transcribe_audio_from_url(file_path)
-        logger.info("Transcription finished for %s, result keys=%s", file_id, list(result.keys()) if isinstance(result, dict) else type(result))
+        # Fetching the local copy (a full download for S3) blocks too, so it stays in the threadpool
+        result = await run_in_threadpool(
+            _transcribe_stored, storage, file_key, word_timestamps, language, model
+        )
+        logger.info("Transcription finished for %s", file_id)
 
         # Ensure consistent key for frontend
         return {
             "transcription": result.get("text", result.get("transcription", "")),
             "duration": result.get("duration"),
-            "language": result.get("language")
+            "language": result.get("language"),
+            "model": result.get("model"),
+            "segments": result.get("segments"),
+            "words": result.get("words")
         }
 
     except FileNotFoundError as e:
@@ -73,14 +97,38 @@ async def transcribe_audio_endpoint(
             detail=f"Transcription failed: {str(e)}"
         )
     finally:
-        # Delete temporary audio file
-        if os.path.exists(file_path):
-            try:
-                os.remove(file_path)
-                logger.info("Temporary audio file removed: %s", file_path)
-            except Exception:
-                pass  # silently ignore cleanup errors
+        # Delete temporary audio object
+        try:
+            await run_in_threadpool(storage.delete, file_key)
+            logger.info("Temporary audio file removed: %s", file_key)
+        except Exception:
+            pass  # silently ignore cleanup errors
+
+
+
+def _transcribe_stored(storage, key: str, word_timestamps: bool, language: Optional[str], model: Optional[str]) -> dict:
+    # Transcription runs on a local copy (no copy is made for the local backend)
+    with storage.local_path(key) as file_path:
+        return transcribe_audio_from_url(file_path, word_timestamps, language, model)
+
+
+def _get_visit(db: Session, visit_id: int) -> Visit:
+    visit = db.query(Visit).filter(Visit.id == visit_id).first()
+    if not visit:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Visit not found"
+        )
+    return visit
+
 
+def _record_prompt_versions(db: Session, visit: Visit, *names: str, clear: Tuple[str, ...] = ()):
+    # Reassign rather than mutate: the JSON column does not track in-place changes
+    visit.prompt_versions = {
+        **{name: version for name, version in (visit.prompt_versions or {}).items() if name not in clear},
+        **get_prompt_registry().active_versions(*names),
+    }
+    db.commit()
 
 
 # ============================================================
@@ -89,12 +137,23 @@ async def transcribe_audio_endpoint(
 @router.post("/soap")
 async def generate_soap_endpoint(
     request: SOAPRequest,
+    db: Session = Depends(get_db),
     #current_user: dict = Depends(get_current_user)
 ):
+    # Checked before spending an LLM call on it
+    visit = _get_visit(db, request.visit_id) if request.visit_id else None
+
     try:
-        soap_data = generate_soap_note(request.transcription)
-        
-        print("Generated SOAP data:", soap_data)
+        # The LLM call blocks (retries, backoff); keep it off the event loop
+        soap_data, reduce_rounds = await run_in_threadpool(generate_soap_note, request.transcription)
+        logger.debug("Generated SOAP data: %s", soap_data)
+
+        if visit is not None:
+            # The summary prompt only shaped this note when the transcript was summarized first
+            if reduce_rounds:
+                _record_prompt_versions(db, visit, "soap", "transcript_summary")
+            else:
+                _record_prompt_versions(db, visit, "soap", clear=("transcript_summary",))
 
         return {
             "subjective": soap_data.get("subjective", ""),
@@ -103,11 +162,21 @@ async def generate_soap_endpoint(
             "plan": soap_data.get("plan", "")
         }
 
+    except StructuredOutputError as e:
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=f"SOAP generation failed: {str(e)}"
+        )
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
+    except LLMUnavailableError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"SOAP generation is temporarily unavailable: {str(e)}"
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -178,13 +247,15 @@ async def generate_prescription_endpoint(
 @router.post("/prescription", response_model=PrescriptionResponse)
 async def generate_prescription_endpoint(
     request: PrescriptionRequest,
+    db: Session = Depends(get_db),
 ):
     """
     Simplified demo version.
-    - No database required
+    - No database required (unless visit_id is given, to record prompt versions)
     - No authentication required
     - Dummy patient info is used
     """
+    visit = _get_visit(db, request.visit_id) if request.visit_id else None
 
     # Dummy patient profile for demo
     patient_info = {
@@ -200,11 +271,15 @@ async def generate_prescription_endpoint(
 
     try:
         # Generate AI prescription
-        result = generate_prescription(
+        result = await run_in_threadpool(
+            generate_prescription,
             soap_assessment=request.soap_assessment,
             patient_info=patient_info
         )
 
+        if visit is not None:
+            _record_prompt_versions(db, visit, "prescription")
+
         medications = []
         for med in result.get("medications", []):
             medications.append({
@@ -222,12 +297,24 @@ async def generate_prescription_endpoint(
             follow_up=result.get("follow_up")
         )
 
+    except StructuredOutputError as e:
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=f"Prescription generation failed: {str(e)}"
+        )
+
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
 
+    except LLMUnavailableError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Prescription generation is temporarily unavailable: {str(e)}"
+        )
+
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -239,9 +326,10 @@ async def generate_prescription_endpoint(
 # ============================================================
 #  PRESCRIPTION PDF ENDPOINT
 # ============================================================
-@router.get("/prescription/{visit_id}/pdf")
+@router.get("/prescription/{visit_id}/pdf", dependencies=[Depends(cache_policy(PRIVATE_REVALIDATE))])
 async def get_prescription_pdf(
     visit_id: int,
+    request: Request,
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
@@ -287,20 +375,18 @@ async def get_prescription_pdf(
     }
     
     try:
-        pdf_path = generate_prescription_pdf(
-            visit_id=visit_id,
-            patient_info=patient_info,
-            prescription_data=prescription_data,
-            doctor_info=doctor_info
-        )
-        
-        return FileResponse(
-            path=pdf_path,
-            filename=f"prescription_{visit_id}.pdf",
-            media_type="application/pdf"
+        # Rendering and storage calls block; an unchanged visit reuses the stored PDF
+        pdf_key = await run_in_threadpool(
+            ensure_prescription_pdf, visit_id, patient_info, prescription_data, doctor_info
         )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"PDF generation failed: {str(e)}"
         )
+    
+    # ETag and conditional GET from the stored object, so the PDF is streamed, never buffered
+    return await run_in_threadpool(
+        storage_response, request, get_storage(), pdf_key,
+        filename=f"prescription_{visit_id}.pdf", attachment=True
+    )
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Request, status, UploadFile, File
 from sqlalchemy.orm import Session
 import os
 import uuid
@@ -6,8 +6,12 @@ from datetime import datetime
 from app.db.database import get_db
 from app.core.config import settings
 from app.core.security import get_current_user
+from app.services.storage_service import get_storage, audio_key
+from app.core.cache_policy import PRIVATE_IMMUTABLE, cache_policy
+from app.utils.storage_response import storage_response
+from app.utils.profiler import AttributedRoute, run_in_threadpool
 
-router = APIRouter()
+router = APIRouter(route_class=AttributedRoute)
 
 ALLOWED_EXTENSIONS = {".wav", ".mp3", ".m4a", ".ogg", ".webm"}
 MAX_FILE_SIZE = 50 * 1024 * 1024
@@ -32,29 +36,30 @@ async def upload_audio(
             detail=f"File type not allowed. Allowed types: {', '.join(ALLOWED_EXTENSIONS)}"
         )
     
-    contents = await file.read()
-    if len(contents) > MAX_FILE_SIZE:
+    # The upload is already spooled to disk by Starlette; measure it instead of reading it into memory
+    file.file.seek(0, os.SEEK_END)
+    size = file.file.tell()
+    file.file.seek(0)
+    if size > MAX_FILE_SIZE:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"File too large. Maximum size: {MAX_FILE_SIZE / (1024*1024)}MB"
         )
     
     unique_filename = f"{uuid.uuid4()}_{datetime.now().strftime('%Y%m%d_%H%M%S')}{file_ext}"
-    file_path = os.path.join(settings.STORAGE_AUDIO_PATH, unique_filename)
+    storage = get_storage()
     
-    os.makedirs(settings.STORAGE_AUDIO_PATH, exist_ok=True)
-    
-    with open(file_path, "wb") as f:
-        f.write(contents)
-    
-    file_url = f"/storage/audio/{unique_filename}"
+    stored = await run_in_threadpool(
+        storage.put, audio_key(unique_filename), file.file, file.content_type
+    )
     
     return {
         "message": "File uploaded successfully",
-        "file_url": file_url,
-        "file_path": file_path,
+        "file_url": f"/api/v1/audio/files/{unique_filename}",
+        "stream_url": storage.presigned_url(stored.key),
+        "file_key": stored.key,
         "filename": unique_filename,
-        "size": len(contents)
+        "size": stored.size
     }
 
 
@@ -62,19 +67,44 @@ async def upload_audio(
 async def list_audio_files(
     current_user: dict = Depends(get_current_user)
 ):
-    audio_path = settings.STORAGE_AUDIO_PATH
-    
-    if not os.path.exists(audio_path):
-        return {"files": []}
+    storage = get_storage()
+    objects = await run_in_threadpool(storage.list, settings.STORAGE_AUDIO_PREFIX)
     
     files = []
-    for filename in os.listdir(audio_path):
-        file_path = os.path.join(audio_path, filename)
-        if os.path.isfile(file_path):
-            files.append({
-                "filename": filename,
-                "file_url": f"/storage/audio/{filename}",
-                "size": os.path.getsize(file_path)
-            })
+    for obj in objects:
+        filename = obj.key.rsplit("/", 1)[-1]
+        files.append({
+            "filename": filename,
+            "file_url": f"/api/v1/audio/files/{filename}",
+            "stream_url": storage.presigned_url(obj.key),
+            "file_key": obj.key,
+            "size": obj.size
+        })
     
     return {"files": files}
+
+
+@router.api_route(
+    "/files/{filename}",
+    methods=["GET", "HEAD"],
+    dependencies=[Depends(cache_policy(PRIVATE_IMMUTABLE))]
+)
+def get_audio_file(
+    filename: str,
+    request: Request,
+    current_user: dict = Depends(get_current_user)
+):
+    # Uploaded audio is written once under a UUID name, so it can be cached forever
+    try:
+        key = audio_key(filename)
+        return storage_response(
+            request,
+            get_storage(),
+            key,
+            filename=filename
+        )
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid filename"
+        )
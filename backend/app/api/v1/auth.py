@@ -1,18 +1,53 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 from app.db.database import get_db
 from app.models.user import User
-from app.schemas.user import UserCreate, UserLogin, UserResponse, Token
-from app.core.security import get_password_hash, verify_password, create_access_token, get_current_user
+from app.schemas.user import UserCreate, UserLogin, UserResponse, Token, RefreshRequest, TranscriptionPreferences
+from fastapi.security import HTTPAuthorizationCredentials
+from app.core.security import (
+    get_password_hash_async, verify_password_async, create_access_token, get_current_user, get_current_user_record,
+    revoke_token, security
+)
+from app.core.cache_policy import PRIVATE_REVALIDATE, cache_policy
+from app.core.config import settings
+from app.core.rate_limit import BucketSpec, client_ip, get_rate_limiter, raise_rate_limited
+from app.services.user_cache import CachedUser
+from app.services.model_selection import (
+    ModelSelectionError, check_model_language, normalize_language, validate_model
+)
+from app.services.token_service import (
+    RefreshTokenError, issue_refresh_token, rotate_refresh_token, revoke_refresh_token
+)
+from app.utils.metrics import Counter
+from app.utils.profiler import AttributedRoute, run_in_threadpool
 
-router = APIRouter()
+router = APIRouter(route_class=AttributedRoute)
+
+LOGIN_ATTEMPTS = Counter("scribe_login_attempts_total", "Login attempts by outcome", ["result"])
+
+LOGIN_IP_BUCKET = BucketSpec.per_minute(settings.LOGIN_RATE_LIMIT_IP_BURST, settings.LOGIN_RATE_LIMIT_IP_PER_MINUTE)
+LOGIN_USER_BUCKET = BucketSpec.per_minute(settings.LOGIN_RATE_LIMIT_USER_BURST, settings.LOGIN_RATE_LIMIT_USER_PER_MINUTE)
+
+
+def _access_token_for(user: User) -> str:
+    return create_access_token(
+        data={
+            "sub": str(user.id),
+            "user_id": user.id,
+            "username": user.username,
+            "role": user.role
+        }
+    )
 
 
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-def register(user_data: UserCreate, db: Session = Depends(get_db)):
-    existing_user = db.query(User).filter(
-        (User.email == user_data.email) | (User.username == user_data.username)
-    ).first()
+async def register(user_data: UserCreate, db: Session = Depends(get_db)):
+    existing_user = await run_in_threadpool(
+        lambda: db.query(User).filter(
+            (User.email == user_data.email) | (User.username == user_data.username)
+        ).first()
+    )
     
     if existing_user:
         raise HTTPException(
@@ -27,7 +62,8 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
             detail=f"Invalid role. Must be one of: {valid_roles}"
         )
     
-    hashed_password = get_password_hash(user_data.password)
+    # bcrypt runs in its own bounded pool, like login
+    hashed_password = await get_password_hash_async(user_data.password)
     
     new_user = User(
         email=user_data.email,
@@ -37,18 +73,36 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
         role=user_data.role
     )
     
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    def save():
+        db.add(new_user)
+        db.commit()
+        db.refresh(new_user)
     
+    await run_in_threadpool(save)
     return new_user
 
 
 @router.post("/login", response_model=Token)
-def login(user_data: UserLogin, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == user_data.username).first()
+async def login(user_data: UserLogin, request: Request, db: Session = Depends(get_db)):
+    limiter = get_rate_limiter()
+    ip = client_ip(request)
+    user_key = f"login:user:{user_data.username.lower()}"
+    
+    # Every attempt costs a token from both buckets; a successful login refills
+    # the username bucket, so only repeated failures lock an account out.
+    for key, spec in ((f"login:ip:{ip}", LOGIN_IP_BUCKET), (user_key, LOGIN_USER_BUCKET)):
+        allowed, retry_after = await limiter.consume_async(key, spec)
+        if not allowed:
+            LOGIN_ATTEMPTS.inc(result="rate_limited")
+            raise_rate_limited(retry_after, "Too many login attempts, try again later")
     
-    if not user or not verify_password(user_data.password, user.hashed_password):
+    user = await run_in_threadpool(
+        lambda: db.query(User).filter(User.username == user_data.username).first()
+    )
+    
+    valid, new_hash = await verify_password_async(user_data.password, user.hashed_password if user else None)
+    if not user or not valid:
+        LOGIN_ATTEMPTS.inc(result="failure")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -61,30 +115,78 @@ def login(user_data: UserLogin, db: Session = Depends(get_db)):
             detail="User account is disabled"
         )
     
-    access_token = create_access_token(
-        data={
-            "sub": str(user.id),
-            "user_id": user.id,
-            "username": user.username,
-            "role": user.role
-        }
+    await limiter.reset_async(user_key)
+    if new_hash:
+        # Cost parameter changed since this password was hashed
+        user.hashed_password = new_hash
+        await run_in_threadpool(db.commit)
+    LOGIN_ATTEMPTS.inc(result="success")
+    
+    refresh_token = await run_in_threadpool(issue_refresh_token, db, user)
+    
+    return Token(
+        access_token=_access_token_for(user),
+        expires_in=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+        refresh_token=refresh_token
     )
+
+
+@router.post("/refresh", response_model=Token)
+def refresh(body: RefreshRequest, db: Session = Depends(get_db)):
+    # No password hashing here: a valid refresh token is exchanged for a new pair
+    try:
+        user, refresh_token = rotate_refresh_token(db, body.refresh_token)
+    except RefreshTokenError as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=str(e),
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     
-    return Token(access_token=access_token)
+    return Token(
+        access_token=_access_token_for(user),
+        expires_in=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+        refresh_token=refresh_token
+    )
 
 
-@router.get("/me", response_model=UserResponse)
-def get_current_user_info(
+@router.get("/me", response_model=UserResponse, dependencies=[Depends(cache_policy(PRIVATE_REVALIDATE))])
+async def get_current_user_info(user: CachedUser = Depends(get_current_user_record)):
+    return user
+
+
+@router.put("/me/preferences", response_model=UserResponse)
+def update_transcription_preferences(
+    preferences: TranscriptionPreferences,
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    user_id = current_user.get("user_id")
-    user = db.query(User).filter(User.id == user_id).first()
-    
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
+    try:
+        language = normalize_language(preferences.transcription_language)
+        model = validate_model(preferences.whisper_model)
+        # Same rule select_model() applies at upload time, so a saved pair never fails there
+        check_model_language(model, language)
+    except ModelSelectionError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     
+    user = db.query(User).filter(User.id == current_user.get("user_id")).first()
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    user.transcription_language = language
+    user.whisper_model = model
+    db.commit()
+    db.refresh(user)
     return user
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+def logout(
+    body: Optional[RefreshRequest] = None,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    revoke_token(credentials.credentials)
+    if body is not None:
+        revoke_refresh_token(db, body.refresh_token, user_id=current_user.get("user_id"))
+    return None
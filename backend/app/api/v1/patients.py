@@ -5,8 +5,9 @@ from app.db.database import get_db
 from app.models.patient import Patient
 from app.schemas.patient import PatientCreate, PatientUpdate, PatientResponse
 from app.core.security import get_current_user
+from app.utils.profiler import AttributedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=AttributedRoute)
 
 
 @router.get("", response_model=List[PatientResponse])
@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.v1 import auth, patients, visits, audio, ai
+from app.api.v1 import auth, patients, visits, audio, ai, admin
 
 api_router = APIRouter()
 
@@ -8,3 +8,4 @@ api_router.include_router(patients.router, prefix="/patients", tags=["Patients"]
 api_router.include_router(visits.router, prefix="/visits", tags=["Visits"])
 api_router.include_router(audio.router, prefix="/audio", tags=["Audio"])
 api_router.include_router(ai.router, prefix="/ai", tags=["AI Services"])
+api_router.include_router(admin.router, prefix="/admin", tags=["Admin"])
@@ -6,8 +6,9 @@ from app.models.visit import Visit
 from app.models.patient import Patient
 from app.schemas.visit import VisitCreate, VisitUpdate, VisitResponse
 from app.core.security import get_current_user
+from app.utils.profiler import AttributedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=AttributedRoute)
 
 
 @router.get("", response_model=List[VisitResponse])
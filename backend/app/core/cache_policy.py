@@ -0,0 +1,102 @@
+import hashlib
+from dataclasses import dataclass, field
+from typing import Tuple
+
+from fastapi import Request, Response
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """
+    Declarative HTTP caching policy for a route.
+
+    Routes without a policy get NO_STORE, which is the only safe default for
+    endpoints returning patient data.
+    """
+    max_age: int = 0
+    public: bool = False
+    no_store: bool = False
+    no_cache: bool = False
+    must_revalidate: bool = False
+    immutable: bool = False
+    etag: bool = False
+    vary: Tuple[str, ...] = field(default_factory=tuple)
+
+    def header_value(self) -> str:
+        if self.no_store:
+            return "no-cache, no-store, must-revalidate"
+        directives = ["public" if self.public else "private"]
+        if self.no_cache:
+            directives.append("no-cache")
+        directives.append(f"max-age={self.max_age}")
+        if self.must_revalidate:
+            directives.append("must-revalidate")
+        if self.immutable:
+            directives.append("immutable")
+        return ", ".join(directives)
+
+
+NO_STORE = CachePolicy(no_store=True)
+
+# Per-user data that may be reused by the browser only after revalidation
+PRIVATE_REVALIDATE = CachePolicy(no_cache=True, etag=True, vary=("Authorization",))
+
+# Write-once objects such as UUID-named audio uploads
+PRIVATE_IMMUTABLE = CachePolicy(max_age=31536000, immutable=True, vary=("Authorization",))
+
+# Non-sensitive reference data (API metadata, docs)
+PUBLIC_REFERENCE = CachePolicy(public=True, max_age=3600, etag=True)
+
+
+def cache_policy(policy: CachePolicy):
+    """
+    Route dependency declaring the caching policy, e.g.
+    `@router.get(..., dependencies=[Depends(cache_policy(PRIVATE_REVALIDATE))])`.
+    """
+    async def set_policy(request: Request):
+        request.state.cache_policy = policy
+    return set_policy
+
+
+def get_request_policy(request: Request) -> CachePolicy:
+    return getattr(request.state, "cache_policy", NO_STORE)
+
+
+# The request middleware hashes bodies up to this size for routes with etag=True;
+# larger or unsized (streamed) bodies are passed through, not buffered
+ETAG_MAX_BODY_BYTES = 1024 * 1024
+
+
+def compute_etag(body: bytes) -> str:
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def _cacheable_status(status_code: int) -> bool:
+    return 200 <= status_code < 300 or status_code == 304
+
+
+def apply_cache_headers(request: Request, response: Response, policy: CachePolicy) -> None:
+    if not _cacheable_status(response.status_code):
+        # The policy describes the route's content, not its errors: a 401 or 404
+        # (often raised before auth even ran) must never be kept by a cache
+        response.headers["Cache-Control"] = NO_STORE.header_value()
+        response.headers["Pragma"] = "no-cache"
+        return
+    # Headers a route set explicitly (e.g. range responses) take precedence
+    response.headers.setdefault("Cache-Control", policy.header_value())
+    if policy.no_store:
+        response.headers.setdefault("Pragma", "no-cache")
+    if policy.vary:
+        existing = [v.strip() for v in response.headers.get("Vary", "").split(",") if v.strip()]
+        for value in policy.vary:
+            if value not in existing:
+                existing.append(value)
+        response.headers["Vary"] = ", ".join(existing)
+
+
+def if_none_match_hit(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in tags or etag.removeprefix("W/") in tags
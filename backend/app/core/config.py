@@ -16,14 +16,160 @@ class Settings(BaseSettings):
     SECRET_KEY: str = os.getenv("SESSION_SECRET", "your-secret-key-change-in-production")
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # Refresh tokens slide forward on every use but a session never outlives REFRESH_SESSION_MAX_DAYS
+    REFRESH_TOKEN_EXPIRE_HOURS: int = 24
+    REFRESH_SESSION_MAX_DAYS: int = 14
+    # A token presented again this soon after its rotation (two tabs refreshing together,
+    # a retry after a dropped response) gets a sibling token instead of revoking the session
+    REFRESH_TOKEN_REUSE_GRACE_SECONDS: int = 30
+    # Verified token -> claims LRU; entries never outlive the token's own exp
+    TOKEN_CACHE_SIZE: int = 10000
+    
+    # Per-process user row cache behind /auth/me and role checks; entries are
+    # dropped on any User update/delete, the TTL only bounds cross-worker staleness
+    USER_CACHE_SIZE: int = 5000
+    USER_CACHE_TTL_SECONDS: int = 30
+    
+    # Raising BCRYPT_ROUNDS rehashes each stored password on its next successful login
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    # bcrypt runs in its own small pool; logins beyond MAX_PENDING get a 503 instead of queueing
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 32
+    
+    # "memory" (per process) or "redis" (shared by every worker, needs REDIS_URL).
+    # STATE_BACKEND covers token revocations, /metrics and slow-request captures.
+    STATE_BACKEND: str = os.getenv("STATE_BACKEND", "memory")
+    STATE_SYNC_SECONDS: float = 1.0
+    RATE_LIMIT_BACKEND: str = os.getenv("RATE_LIMIT_BACKEND", os.getenv("STATE_BACKEND", "memory"))
+    REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    LOGIN_RATE_LIMIT_IP_BURST: int = 20
+    LOGIN_RATE_LIMIT_IP_PER_MINUTE: float = 10.0
+    LOGIN_RATE_LIMIT_USER_BURST: int = 5
+    LOGIN_RATE_LIMIT_USER_PER_MINUTE: float = 1.0
+    # Reverse proxies (IPs or CIDRs, comma separated) whose X-Forwarded-For is believed,
+    # so per-IP limits see real clients instead of one shared proxy address
+    TRUSTED_PROXIES: str = os.getenv("TRUSTED_PROXIES", "")
     
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
+    # Point at any OpenAI-compatible server (e.g. benchmarks/fake_llm_server.py)
+    OPENAI_BASE_URL: str = os.getenv("OPENAI_BASE_URL", "")
+    LLM_MODEL: str = os.getenv("LLM_MODEL", "gpt-4o-mini")
+    # LLM gateway: each attempt times out after TIMEOUT_SECONDS, the whole call (retries
+    # and fallback included) after DEADLINE_SECONDS
+    LLM_TIMEOUT_SECONDS: float = 20.0
+    LLM_DEADLINE_SECONDS: float = 45.0
+    LLM_MAX_RETRIES: int = 2
+    LLM_BACKOFF_BASE_MS: int = 250
+    LLM_BACKOFF_MAX_MS: int = 4000
+    # Race a second identical request once an attempt outlives the route's recent p95
+    LLM_HEDGE_ENABLED: bool = os.getenv("LLM_HEDGE_ENABLED", "false").lower() == "true"
+    LLM_HEDGE_MIN_DELAY_MS: int = 500
+    # Consecutive failures that open a route's circuit, and how long it stays open
+    LLM_BREAKER_FAILURES: int = 5
+    LLM_BREAKER_RESET_SECONDS: int = 30
+    LLM_MAX_CONCURRENCY: int = 16
+    # How SOAP/prescription replies are constrained: "json_schema" (strict schema),
+    # "json_object" (any JSON, for servers without schema support) or "off"
+    LLM_STRUCTURED_OUTPUT: str = os.getenv("LLM_STRUCTURED_OUTPUT", "json_schema")
+    # Identical concurrent LLM calls share one upstream request; the answer is reused for TTL seconds
+    LLM_COALESCE_TTL_SECONDS: float = 10.0
+    LLM_COALESCE_MAX_ENTRIES: int = 256
+    # Second route tried when the primary fails or its circuit is open: another model,
+    # a local OpenAI-compatible server (Ollama, vLLM) or benchmarks/fake_llm_server.py
+    LLM_FALLBACK_MODEL: str = os.getenv("LLM_FALLBACK_MODEL", "")
+    LLM_FALLBACK_BASE_URL: str = os.getenv("LLM_FALLBACK_BASE_URL", "")
+    LLM_FALLBACK_API_KEY: str = os.getenv("LLM_FALLBACK_API_KEY", "")
+    # Cleaned transcripts over this many tokens are summarized in ~CHUNK_TOKENS pieces
+    # (CONCURRENCY at a time) before the SOAP prompt is built
+    SOAP_TRANSCRIPT_TOKEN_BUDGET: int = int(os.getenv("SOAP_TRANSCRIPT_TOKEN_BUDGET", "6000"))
+    SOAP_SUMMARY_CHUNK_TOKENS: int = 2000
+    SOAP_SUMMARY_CONCURRENCY: int = 4
+    # Prompt templates live in app/prompts/<name>/v<N>.*.txt; the newest version of each
+    # is used unless pinned here, e.g. "soap=v1,prescription=v1"
+    PROMPT_VERSIONS: str = os.getenv("PROMPT_VERSIONS", "")
+    
+    WHISPER_MODEL: str = os.getenv("WHISPER_MODEL", "tiny")
+    # Models users and requests may pick (each one chosen stays loaded per worker)
+    WHISPER_ALLOWED_MODELS: str = os.getenv("WHISPER_ALLOWED_MODELS", "tiny,tiny.en,base,base.en")
+    # English audio up to ENGLISH_MAX_SECONDS goes to this English-only model (e.g.
+    # "tiny.en"); opt-in, since it is a second model kept loaded in every worker
+    WHISPER_ENGLISH_MODEL: str = os.getenv("WHISPER_ENGLISH_MODEL", "")
+    WHISPER_ENGLISH_MAX_SECONDS: int = 1800
+    # Clinic-wide language hint for users without their own ("" = detect per recording)
+    CLINIC_LANGUAGE: str = os.getenv("CLINIC_LANGUAGE", "")
+    # "default" (fp32) or "int8" (dynamic int8 quantization of Linear layers, CPU only)
+    WHISPER_CPU_PROFILE: str = os.getenv("WHISPER_CPU_PROFILE", "default")
+    # Skip silence before Whisper: frames VAD_THRESHOLD_DB above the noise floor are
+    # speech, pauses shorter than VAD_MIN_SILENCE_MS are kept. Audio that never
+    # rises above VAD_SILENCE_DBFS is the only audio not sent to Whisper at all.
+    VAD_ENABLED: bool = os.getenv("VAD_ENABLED", "true").lower() == "true"
+    VAD_THRESHOLD_DB: float = 12.0
+    VAD_MIN_SILENCE_MS: int = 500
+    VAD_SILENCE_DBFS: float = -60.0
+    # Recordings longer than PARALLEL_MIN_SECONDS are cut at pauses into ~CHUNK_SECONDS
+    # pieces and transcribed by this many spawned processes (0/1 = off)
+    TRANSCRIBE_PARALLEL_PROCESSES: int = int(os.getenv("TRANSCRIBE_PARALLEL_PROCESSES", "0"))
+    TRANSCRIBE_PARALLEL_MIN_SECONDS: int = 600
+    TRANSCRIBE_CHUNK_SECONDS: int = 180
+    # Includes the child loading its model on first use
+    TRANSCRIBE_CHUNK_TIMEOUT_SECONDS: float = 900.0
+    # >1 micro-batches 30 s windows from concurrent requests (waiting at most BATCH_WAIT_MS to fill a batch)
+    WHISPER_BATCH_SIZE: int = int(os.getenv("WHISPER_BATCH_SIZE", "1"))
+    WHISPER_BATCH_WAIT_MS: int = int(os.getenv("WHISPER_BATCH_WAIT_MS", "50"))
+    # A window still undecoded after this long (queue wait included) fails its transcription
+    WHISPER_BATCH_WINDOW_TIMEOUT_SECONDS: float = 300.0
+    WHISPER_TORCH_COMPILE: bool = os.getenv("WHISPER_TORCH_COMPILE", "false").lower() == "true"
+    
+    # Production launcher (gunicorn.conf.py): workers fork from a master that has
+    # already loaded the app and Whisper weights. TORCH_NUM_THREADS=0 splits CPUs evenly.
+    # More than one worker needs STATE_BACKEND=redis and RATE_LIMIT_BACKEND=redis.
+    WEB_CONCURRENCY: int = int(os.getenv("WEB_CONCURRENCY", "1"))
+    TORCH_NUM_THREADS: int = int(os.getenv("TORCH_NUM_THREADS", "0"))
+    WORKER_MEMORY_REPORT_SECONDS: int = 60
+    
+    # "local" keeps objects under STORAGE_LOCAL_ROOT; "s3" talks to any
+    # S3-compatible endpoint (AWS, MinIO, ...) so every node sees the same files.
+    STORAGE_BACKEND: str = os.getenv("STORAGE_BACKEND", "local")
+    STORAGE_LOCAL_ROOT: str = "storage"
+    STORAGE_AUDIO_PREFIX: str = "audio"
+    STORAGE_PRESCRIPTIONS_PREFIX: str = "prescriptions"
+    STORAGE_TMP_AUDIO_PREFIX: str = "tmp/audio"
+    STORAGE_PRESIGN_EXPIRE_SECONDS: int = 900
+    
+    S3_BUCKET: str = os.getenv("S3_BUCKET", "")
+    S3_ENDPOINT_URL: str = os.getenv("S3_ENDPOINT_URL", "")
+    S3_REGION: str = os.getenv("S3_REGION", "us-east-1")
+    S3_ACCESS_KEY_ID: str = os.getenv("S3_ACCESS_KEY_ID", "")
+    S3_SECRET_ACCESS_KEY: str = os.getenv("S3_SECRET_ACCESS_KEY", "")
     
-    STORAGE_AUDIO_PATH: str = "storage/audio"
-    STORAGE_PRESCRIPTIONS_PATH: str = "storage/prescriptions"
     VITE_API_BASE_URL: str = ""
 
     
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    # Comma-separated "logger=LEVEL" overrides, e.g. "ai_medical_scribe.access=WARNING,sqlalchemy.engine=INFO"
+    LOG_LEVELS: str = os.getenv("LOG_LEVELS", "")
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "json")  # json | text
+    LOG_QUEUE_SIZE: int = 10000
+    # Fraction of successful, fast access-log records to keep; errors and slow requests are always kept
+    LOG_ACCESS_SAMPLE_RATE: float = float(os.getenv("LOG_ACCESS_SAMPLE_RATE", "1.0"))
+    LOG_SLOW_REQUEST_MS: int = 1000
+    
+    # Bearer token Prometheus scrapes /metrics with; admins can also read it with their login token
+    METRICS_TOKEN: str = os.getenv("METRICS_TOKEN", "")
+    
+    # Tracing: "none", "file" (OTLP/JSON lines) or "otlp" (OTLP/HTTP JSON to a collector)
+    TRACE_EXPORTER: str = os.getenv("TRACE_EXPORTER", "none")
+    TRACE_EXPORT_PATH: str = "traces.jsonl"
+    OTEL_EXPORTER_OTLP_ENDPOINT: str = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "http://localhost:4318")
+    OTEL_SERVICE_NAME: str = os.getenv("OTEL_SERVICE_NAME", "ai-medical-scribe")
+    TRACE_SAMPLE_RATIO: float = float(os.getenv("TRACE_SAMPLE_RATIO", "1.0"))
+    
+    # Requests slower than this get stack samples captured; the slowest N are kept
+    SLOW_REQUEST_THRESHOLD_MS: int = int(os.getenv("SLOW_REQUEST_THRESHOLD_MS", "2000"))
+    SLOW_REQUEST_KEEP: int = 20
+    PROFILER_SAMPLE_INTERVAL_MS: int = 10
+    PROFILER_MAX_SECONDS: int = 60
+    
     CORS_ORIGINS: str = os.getenv("CORS_ORIGINS", "*")
     CORS_ALLOW_CREDENTIALS: bool = False
     
@@ -46,6 +192,34 @@ class Settings(BaseSettings):
         if not self.DATABASE_URL:
             errors.append("DATABASE_URL environment variable is required")
         
+        if self.STORAGE_BACKEND not in ("local", "s3"):
+            errors.append("STORAGE_BACKEND must be either 'local' or 's3'")
+        elif self.STORAGE_BACKEND == "s3" and not self.S3_BUCKET:
+            errors.append("S3_BUCKET environment variable is required when STORAGE_BACKEND=s3")
+        
+        if self.WHISPER_CPU_PROFILE not in ("default", "int8"):
+            errors.append("WHISPER_CPU_PROFILE must be either 'default' or 'int8'")
+        
+        # Imported here: model_selection reads these settings at import time
+        from app.services.model_selection import ModelSelectionError, normalize_language
+        try:
+            normalize_language(self.CLINIC_LANGUAGE)
+        except ModelSelectionError:
+            errors.append(f"CLINIC_LANGUAGE {self.CLINIC_LANGUAGE!r} is not a language Whisper supports")
+        
+        if self.LLM_STRUCTURED_OUTPUT not in ("json_schema", "json_object", "off"):
+            errors.append("LLM_STRUCTURED_OUTPUT must be 'json_schema', 'json_object' or 'off'")
+        
+        if self.RATE_LIMIT_BACKEND not in ("memory", "redis"):
+            errors.append("RATE_LIMIT_BACKEND must be either 'memory' or 'redis'")
+        
+        if self.STATE_BACKEND not in ("memory", "redis"):
+            errors.append("STATE_BACKEND must be either 'memory' or 'redis'")
+        
+        if self.WEB_CONCURRENCY > 1 and (self.STATE_BACKEND != "redis" or self.RATE_LIMIT_BACKEND != "redis"):
+            # Revocations, login limits and /metrics would otherwise differ per worker
+            errors.append("WEB_CONCURRENCY > 1 requires STATE_BACKEND=redis and RATE_LIMIT_BACKEND=redis")
+        
         if errors:
             for error in errors:
                 print(f"CRITICAL: {error}", file=sys.stderr)
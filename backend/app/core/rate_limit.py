@@ -0,0 +1,195 @@
+import ipaddress
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Tuple, Union
+
+from fastapi import HTTPException, Request, status
+
+from app.core.config import settings
+from app.utils.profiler import run_in_threadpool
+
+
+@dataclass(frozen=True)
+class BucketSpec:
+    """A token bucket holding up to `capacity` tokens, refilled at `refill_per_second`."""
+    capacity: float
+    refill_per_second: float
+
+    @classmethod
+    def per_minute(cls, capacity: int, per_minute: float) -> "BucketSpec":
+        return cls(capacity=float(capacity), refill_per_second=per_minute / 60.0)
+
+
+class RateLimitBackend(ABC):
+    """
+    Stores token buckets. `consume` takes `cost` tokens if available and
+    returns (allowed, retry_after_seconds). Async handlers use the `_async`
+    variants, which never block the event loop on network I/O.
+    """
+
+    @abstractmethod
+    def consume(self, key: str, spec: BucketSpec, cost: float = 1.0) -> Tuple[bool, float]:
+        ...
+
+    @abstractmethod
+    def reset(self, key: str) -> None:
+        ...
+
+    async def consume_async(self, key: str, spec: BucketSpec, cost: float = 1.0) -> Tuple[bool, float]:
+        return await run_in_threadpool(self.consume, key, spec, cost)
+
+    async def reset_async(self, key: str) -> None:
+        await run_in_threadpool(self.reset, key)
+
+
+def _retry_after(tokens: float, spec: BucketSpec, cost: float) -> float:
+    if spec.refill_per_second <= 0:
+        return float("inf")
+    return max(cost - tokens, 0.0) / spec.refill_per_second
+
+
+# ============================================================
+# IN-MEMORY BACKEND
+# ============================================================
+class InMemoryRateLimitBackend(RateLimitBackend):
+    """Per-process buckets; the least recently used keys are evicted past `max_keys`."""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key: str, spec: BucketSpec, cost: float = 1.0) -> Tuple[bool, float]:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (spec.capacity, now))
+            tokens = min(spec.capacity, tokens + (now - updated) * spec.refill_per_second)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else _retry_after(tokens, spec, cost)
+
+    def reset(self, key: str) -> None:
+        with self._lock:
+            self._buckets.pop(key, None)
+
+    # A dict update under a lock: cheaper inline than a threadpool hop
+    async def consume_async(self, key: str, spec: BucketSpec, cost: float = 1.0) -> Tuple[bool, float]:
+        return self.consume(key, spec, cost)
+
+    async def reset_async(self, key: str) -> None:
+        self.reset(key)
+
+
+# ============================================================
+# REDIS BACKEND
+# ============================================================
+# Refill and consume atomically on the server so every worker shares one bucket
+_REDIS_TOKEN_BUCKET = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local now = tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(now - updated, 0) * rate)
+local allowed = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+if rate > 0 then
+    redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+end
+return {allowed, tostring(tokens)}
+"""
+
+
+class RedisRateLimitBackend(RateLimitBackend):
+    """Buckets shared by every worker and node through Redis."""
+
+    def __init__(self, url: str, prefix: str = "ratelimit:"):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis requires the 'redis' package")
+
+        self.prefix = prefix
+        self.client = redis.Redis.from_url(url)
+        self._script = self.client.register_script(_REDIS_TOKEN_BUCKET)
+
+    def consume(self, key: str, spec: BucketSpec, cost: float = 1.0) -> Tuple[bool, float]:
+        allowed, tokens = self._script(
+            keys=[self.prefix + key],
+            args=[spec.capacity, spec.refill_per_second, cost, time.time()],
+        )
+        allowed = bool(int(allowed))
+        return allowed, 0.0 if allowed else _retry_after(float(tokens), spec, cost)
+
+    def reset(self, key: str) -> None:
+        self.client.delete(self.prefix + key)
+
+
+@lru_cache()
+def get_rate_limiter() -> RateLimitBackend:
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        return RedisRateLimitBackend(settings.REDIS_URL)
+    return InMemoryRateLimitBackend()
+
+
+# ============================================================
+# CLIENT ADDRESS
+# ============================================================
+_Network = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+
+@lru_cache()
+def _trusted_proxies() -> List[_Network]:
+    return [
+        ipaddress.ip_network(item.strip(), strict=False)
+        for item in settings.TRUSTED_PROXIES.split(",")
+        if item.strip()
+    ]
+
+
+def _is_trusted_proxy(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in _trusted_proxies())
+
+
+def client_ip(request: Request) -> str:
+    """
+    The address to rate-limit on. Behind a proxy listed in TRUSTED_PROXIES it
+    is the right-most X-Forwarded-For hop that is not one of those proxies
+    (earlier hops are client supplied); otherwise the socket peer.
+    """
+    peer = request.client.host if request.client else "unknown"
+    if not _is_trusted_proxy(peer):
+        return peer
+    hops = [hop.strip() for hop in request.headers.get("x-forwarded-for", "").split(",") if hop.strip()]
+    for hop in reversed(hops):
+        if not _is_trusted_proxy(hop):
+            return hop
+    return hops[0] if hops else peer
+
+
+def raise_rate_limited(retry_after: float, detail: str = "Too many requests, try again later"):
+    raise HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=detail,
+        headers={"Retry-After": str(max(math.ceil(min(retry_after, 3600)), 1))},
+    )
@@ -1,13 +1,40 @@
+import asyncio
+import contextvars
+import hashlib
+import hmac
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional, Union
+from typing import Dict, Optional, Tuple, Union
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy.orm import Session
 from app.core.config import settings
+from app.core.shared_state import get_redis, register_sync, shared_state_enabled
+from app.db.database import get_db
+from app.services.user_cache import CachedUser, load_user_uncached, user_cache
+from app.utils.metrics import Counter, Gauge, QUEUE_DEPTH, stage_timer
+from app.utils.profiler import attributed, run_in_threadpool
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
+
+TOKEN_CACHE_REQUESTS = Counter(
+    "scribe_token_cache_requests_total",
+    "Verified-token cache lookups by result",
+    ["result"],
+)
+TOKEN_CACHE_GAUGE = Gauge(
+    "scribe_token_cache",
+    "Verified-token cache size and hit rate",
+    ["stat"],
+)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -18,13 +45,61 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+# ============================================================
+# PASSWORD HASHING POOL
+# ============================================================
+# bcrypt burns 100-300 ms of CPU per call. Running it in a small dedicated pool
+# keeps a burst of login attempts from starving the shared request threadpool.
+_password_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt"
+)
+_password_jobs_pending = 0
+
+
+# Unknown usernames are checked against this so they cost as much as a wrong password.
+# Hashed once at import (in the gunicorn master with preload), never on the event loop.
+_DUMMY_HASH = pwd_context.hash(uuid.uuid4().hex)
+
+
+async def _run_password_job(fn, *args):
+    global _password_jobs_pending
+    if _password_jobs_pending >= settings.PASSWORD_HASH_MAX_PENDING:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Login service is busy, try again shortly",
+            headers={"Retry-After": "1"},
+        )
+    _password_jobs_pending += 1
+    try:
+        with QUEUE_DEPTH.track_inprogress(queue="bcrypt"), stage_timer("password_hash"):
+            ctx = contextvars.copy_context()
+            return await asyncio.get_running_loop().run_in_executor(_password_executor, ctx.run, attributed(fn), *args)
+    finally:
+        _password_jobs_pending -= 1
+
+
+async def verify_password_async(plain_password: str, hashed_password: Optional[str]) -> Tuple[bool, Optional[str]]:
+    """
+    Verifies in the bcrypt pool. Returns (valid, new_hash); new_hash is set when
+    the stored hash uses outdated parameters and should be saved in its place.
+    """
+    if not hashed_password:
+        await _run_password_job(pwd_context.verify, plain_password, _DUMMY_HASH)
+        return False, None
+    return await _run_password_job(pwd_context.verify_and_update, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await _run_password_job(pwd_context.hash, password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
@@ -37,9 +112,144 @@ def decode_token(token: str) -> Optional[dict]:
         return None
 
 
+def _token_digest(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class RevocationList:
+    """
+    Revoked token IDs (jti, or the token digest for tokens without one),
+    each kept only until the token would have expired anyway.
+    """
+
+    def __init__(self):
+        self._revoked: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def revoke(self, token_id: str, expires_at: float) -> None:
+        now = time.time()
+        with self._lock:
+            self._revoked[token_id] = expires_at
+            for key in [k for k, exp in self._revoked.items() if exp <= now]:
+                del self._revoked[key]
+
+    def is_revoked(self, token_id: Optional[str]) -> bool:
+        return token_id is not None and token_id in self._revoked
+
+
+class SharedRevocationList(RevocationList):
+    """
+    RevocationList mirrored through a Redis sorted set (member = token id,
+    score = expiry), so a logout on one worker reaches every other worker
+    within STATE_SYNC_SECONDS. Lookups stay local.
+    """
+
+    KEY = "revoked_tokens"
+
+    def revoke(self, token_id: str, expires_at: float) -> None:
+        super().revoke(token_id, expires_at)
+        get_redis().zadd(self.KEY, {token_id: expires_at})
+
+    def sync(self) -> None:
+        now = time.time()
+        client = get_redis()
+        client.zremrangebyscore(self.KEY, "-inf", now)
+        entries = client.zrangebyscore(self.KEY, now, "+inf", withscores=True)
+        with self._lock:
+            for token_id, expires_at in entries:
+                self._revoked[token_id.decode() if isinstance(token_id, bytes) else token_id] = expires_at
+
+
+class TokenClaimsCache:
+    """
+    Bounded LRU of token digest -> verified claims, so repeated requests with
+    the same bearer token skip signature verification until the token expires.
+    """
+
+    def __init__(self, maxsize: int, revocations: RevocationList):
+        self.maxsize = maxsize
+        self.revocations = revocations
+        self._entries: "OrderedDict[str, Tuple[dict, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, digest: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None:
+                claims, expires_at = entry
+                if expires_at > time.time() and not self._revoked(digest, claims):
+                    self._entries.move_to_end(digest)
+                    self.hits += 1
+                    TOKEN_CACHE_REQUESTS.inc(result="hit")
+                    return claims
+                del self._entries[digest]
+            self.misses += 1
+        TOKEN_CACHE_REQUESTS.inc(result="miss")
+        return None
+
+    def put(self, digest: str, claims: dict) -> None:
+        expires_at = claims.get("exp")
+        if not isinstance(expires_at, (int, float)):
+            return
+        with self._lock:
+            self._entries[digest] = (claims, float(expires_at))
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def discard(self, digest: str) -> None:
+        with self._lock:
+            self._entries.pop(digest, None)
+
+    def _revoked(self, digest: str, claims: dict) -> bool:
+        return self.revocations.is_revoked(claims.get("jti")) or self.revocations.is_revoked(digest)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+if shared_state_enabled():
+    revoked_tokens: RevocationList = SharedRevocationList()
+    register_sync(revoked_tokens.sync)
+else:
+    revoked_tokens = RevocationList()
+token_cache = TokenClaimsCache(settings.TOKEN_CACHE_SIZE, revoked_tokens)
+TOKEN_CACHE_GAUGE.set_function(lambda: len(token_cache), stat="size")
+TOKEN_CACHE_GAUGE.set_function(token_cache.hit_rate, stat="hit_rate")
+
+
+def decode_token_cached(token: str) -> Optional[dict]:
+    """decode_token() behind the verified-claims cache; honours exp and revocations."""
+    digest = _token_digest(token)
+    claims = token_cache.get(digest)
+    if claims is None:
+        claims = decode_token(token)
+        if claims is None or token_cache._revoked(digest, claims):
+            return None
+        token_cache.put(digest, claims)
+    # Callers get their own copy so they cannot mutate the cached claims
+    return dict(claims)
+
+
+def revoke_token(token: str) -> bool:
+    claims = decode_token(token)
+    if claims is None:
+        return False
+    digest = _token_digest(token)
+    revoked_tokens.revoke(claims.get("jti") or digest, float(claims.get("exp", time.time())))
+    token_cache.discard(digest)
+    return True
+
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     token = credentials.credentials
-    payload = decode_token(token)
+    payload = decode_token_cached(token)
     if payload is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -49,13 +259,96 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     return payload
 
 
+async def get_current_user_record(
+    request: Request,
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+) -> CachedUser:
+    """
+    The authenticated user's current row (via the short-TTL user cache).
+    FastAPI resolves it once per request however many dependencies ask for it;
+    it is also left on request.state.user.
+    """
+    user = await _active_user(db, current_user.get("user_id"))
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found or disabled",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    request.state.user = user
+    return user
+
+
+async def get_optional_user_record(
+    request: Request,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    db: Session = Depends(get_db)
+) -> Optional[CachedUser]:
+    """
+    Like get_current_user_record for endpoints that are still open to
+    anonymous callers: the user when a valid bearer token is sent, else None.
+    """
+    if credentials is None:
+        return None
+    payload = decode_token_cached(credentials.credentials)
+    user = await _active_user(db, payload.get("user_id")) if payload else None
+    request.state.user = user
+    return user
+
+
+async def _active_user(db: Session, user_id: Optional[int]) -> Optional[CachedUser]:
+    if user_id is None:
+        return None
+    # Hits are answered on the loop; only the query goes to the threadpool
+    user = user_cache.get(user_id)
+    if user is None:
+        user = await run_in_threadpool(load_user_uncached, db, user_id)
+    return user if user is not None and user.is_active else None
+
+
 def require_roles(allowed_roles: list):
-    async def role_checker(current_user: dict = Depends(get_current_user)):
-        user_role = current_user.get("role")
-        if user_role not in allowed_roles:
+    async def role_checker(
+        current_user: dict = Depends(get_current_user),
+        user: CachedUser = Depends(get_current_user_record)
+    ):
+        # Check the stored role, not the token claim, so role changes apply before the token expires
+        if user.role not in allowed_roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Insufficient permissions"
             )
-        return current_user
+        return {**current_user, "role": user.role}
     return role_checker
+
+
+async def require_metrics_access(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    db: Session = Depends(get_db)
+):
+    """
+    Guards /metrics: the METRICS_TOKEN scrape token (so Prometheus does not
+    need an expiring login), or an admin's access token.
+    """
+    if credentials is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    token = credentials.credentials
+    if settings.METRICS_TOKEN and hmac.compare_digest(token.encode(), settings.METRICS_TOKEN.encode()):
+        return
+    payload = decode_token_cached(token)
+    user = await _active_user(db, payload.get("user_id")) if payload else None
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid authentication credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    if user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Insufficient permissions"
+        )
@@ -0,0 +1,64 @@
+import os
+import socket
+import threading
+import time
+from functools import lru_cache
+from typing import Callable, List, Optional
+
+from app.core.config import settings
+
+# Per-process state (token revocations, metrics, slow-request captures) is mirrored
+# through Redis when STATE_BACKEND=redis, so every gunicorn worker and node agrees.
+_sync_tasks: List[Callable[[], None]] = []
+_sync_thread: Optional[threading.Thread] = None
+
+
+def shared_state_enabled() -> bool:
+    return settings.STATE_BACKEND == "redis"
+
+
+def worker_id() -> str:
+    # Evaluated per call: the gunicorn master imports the app before forking
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+@lru_cache()
+def get_redis():
+    try:
+        import redis
+    except ImportError:
+        raise RuntimeError("STATE_BACKEND=redis requires the 'redis' package")
+    # redis-py's pool notices the fork and opens fresh connections in each worker
+    return redis.Redis.from_url(settings.REDIS_URL, socket_timeout=5)
+
+
+def register_sync(fn: Callable[[], None]) -> None:
+    """Runs `fn` every STATE_SYNC_SECONDS on the worker's sync thread."""
+    _sync_tasks.append(fn)
+
+
+def run_state_sync() -> None:
+    for fn in list(_sync_tasks):
+        try:
+            fn()
+        except Exception as e:
+            # Imported here: the logger reports to metrics, which registers with this module
+            from app.utils.logger import get_logger
+            get_logger(__name__).warning("Shared state sync %s failed: %s", fn.__qualname__, e)
+
+
+def start_state_sync() -> None:
+    """Starts this worker's sync thread; call after the fork (the app startup event)."""
+    global _sync_thread
+    if not shared_state_enabled() or (_sync_thread is not None and _sync_thread.is_alive()):
+        return
+    # One pass up front, so a new worker knows existing revocations before serving
+    run_state_sync()
+    _sync_thread = threading.Thread(target=_sync_loop, name="state-sync", daemon=True)
+    _sync_thread.start()
+
+
+def _sync_loop() -> None:
+    while True:
+        time.sleep(settings.STATE_SYNC_SECONDS)
+        run_state_sync()
@@ -1,7 +1,10 @@
-from sqlalchemy import create_engine
+import time
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.utils.metrics import STAGE_LATENCY
+from app.utils.tracing import start_span, KIND_CLIENT
 
 engine = create_engine(settings.DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -9,6 +12,32 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 
+@event.listens_for(engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    query_span = start_span(
+        "db.query",
+        kind=KIND_CLIENT,
+        attributes={"db.system": engine.dialect.name, "db.statement": statement[:1000]}
+    )
+    conn.info.setdefault("query_start", []).append((time.perf_counter(), query_span))
+
+
+@event.listens_for(engine, "after_cursor_execute")
+def _record_query_time(conn, cursor, statement, parameters, context, executemany):
+    start, query_span = conn.info["query_start"].pop()
+    STAGE_LATENCY.observe(time.perf_counter() - start, stage="db_query")
+    query_span.end()
+
+
+@event.listens_for(engine, "handle_error")
+def _record_query_error(exception_context):
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start"):
+        _, query_span = conn.info["query_start"].pop()
+        query_span.record_exception(exception_context.original_exception)
+        query_span.end()
+
+
 def get_db():
     db = SessionLocal()
     try:
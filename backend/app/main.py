@@ -1,22 +1,33 @@
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, HTTPException, status, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, PlainTextResponse, RedirectResponse
+from starlette.datastructures import MutableHeaders
+from typing import Optional
 import time
-import os
 import sys
+import uuid
 from app.api.v1.router import api_router
 from app.core.config import settings
+from app.core.cache_policy import (
+    ETAG_MAX_BODY_BYTES, PUBLIC_REFERENCE, cache_policy, get_request_policy, apply_cache_headers,
+    compute_etag, if_none_match_hit
+)
+from app.core.security import require_metrics_access
+from app.core.shared_state import start_state_sync
 from app.db.database import engine, Base
-from app.utils.logger import logger
+from app.services.storage_service import get_storage, verify_storage_signature
+from app.services.prompt_registry import get_prompt_registry
+from app.utils.logger import logger, access_logger, request_id_var, stop_logging, log_queue_depth
+from app.utils.tracing import span, KIND_SERVER, flush_traces
+from app.utils.profiler import AttributedRoute, run_in_threadpool, slow_request_monitor
+from app.utils.metrics import REQUEST_LATENCY, REQUESTS_IN_FLIGHT, QUEUE_DEPTH, render_prometheus
+from app.utils.storage_response import storage_response
+from app.utils.process_memory import register_memory_metrics
 
 if not settings.validate_required():
     logger.error("Configuration validation failed. Exiting.")
     sys.exit(1)
 
-os.makedirs("storage/audio", exist_ok=True)
-os.makedirs("storage/prescriptions", exist_ok=True)
-
 app = FastAPI(
     title=settings.APP_NAME,
     version=settings.APP_VERSION,
@@ -24,6 +35,7 @@ app = FastAPI(
     docs_url="/docs",
     redoc_url="/redoc"
 )
+app.router.route_class = AttributedRoute
 
 if settings.is_cors_wildcard:
     app.add_middleware(
@@ -46,23 +58,82 @@ else:
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
     start_time = time.time()
+    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    token = request_id_var.set(request_id)
+    monitor_key = slow_request_monitor.start(request_id, request.method, request.url.path)
+    status_code = 500
     
-    response = await call_next(request)
+    try:
+        with span(
+            f"{request.method} {request.url.path}",
+            kind=KIND_SERVER,
+            attributes={"http.method": request.method, "http.target": request.url.path, "request.id": request_id},
+            traceparent=request.headers.get("traceparent")
+        ) as request_span, REQUESTS_IN_FLIGHT.track_inprogress():
+            response = await call_next(request)
+            # Label by route template (not raw path) to keep metric and span-name cardinality bounded
+            route_path = getattr(request.scope.get("route"), "path", "unmatched")
+            request_span.name = f"{request.method} {route_path}"
+            request_span.set_attribute("http.route", route_path)
+            request_span.set_attribute("http.status_code", response.status_code)
+            status_code = response.status_code
+    finally:
+        slow_request_monitor.finish(monitor_key, status_code)
+        request_id_var.reset(token)
     
     process_time = time.time() - start_time
-    logger.info(
-        f"{request.method} {request.url.path} - {response.status_code} - {process_time:.3f}s"
+    REQUEST_LATENCY.observe(
+        process_time,
+        method=request.method,
+        route=route_path,
+        status=response.status_code
     )
-    
     response.headers["X-Process-Time"] = str(process_time)
-    response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
+    response.headers["X-Request-ID"] = request_id
+    response.headers["traceparent"] = request_span.traceparent
+    
+    policy = get_request_policy(request)
+    content_length = response.headers.get("content-length", "")
+    if (
+        policy.etag
+        and request.method in ("GET", "HEAD")
+        and response.status_code == 200
+        and "etag" not in response.headers
+        # Only small bodies of known size; streams (PDFs, audio) set their own ETag
+        and content_length.isdigit()
+        and int(content_length) <= ETAG_MAX_BODY_BYTES
+    ):
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        etag = compute_etag(body)
+        # Raw headers keep repeated fields (Set-Cookie, Vary) that a dict would merge
+        headers = MutableHeaders(raw=list(response.raw_headers))
+        headers["ETag"] = etag
+        if if_none_match_hit(request, etag):
+            del headers["content-length"]
+            response = Response(status_code=304, headers=headers)
+        else:
+            response = Response(content=body, status_code=response.status_code, headers=headers)
+    
+    apply_cache_headers(request, response, policy)
+    
+    access_logger.info(
+        "%s %s - %s - %.3fs",
+        request.method, request.url.path, response.status_code, process_time,
+        extra={
+            "request_id": request_id,
+            "method": request.method,
+            "path": request.url.path,
+            "status": response.status_code,
+            "duration_ms": round(process_time * 1000, 1),
+        }
+    )
     
     return response
 
 
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
-    logger.error(f"Unhandled exception: {str(exc)}")
+    logger.error("Unhandled exception: %s", exc, exc_info=exc)
     return JSONResponse(
         status_code=500,
         content={"detail": "Internal server error"}
@@ -71,10 +142,54 @@ async def global_exception_handler(request: Request, exc: Exception):
 
 app.include_router(api_router, prefix="/api/v1")
 
-app.mount("/storage", StaticFiles(directory="storage"), name="storage")
 
 
-@app.get("/")
+@app.api_route("/storage/{key:path}", methods=["GET", "HEAD"], include_in_schema=False)
+def serve_presigned_object(
+    request: Request,
+    key: str,
+    expires: Optional[int] = None,
+    signature: Optional[str] = None
+):
+    """
+    Serves objects of the local storage backend through presigned URLs.
+    S3-compatible backends hand out their own presigned URLs instead.
+    """
+    audio_prefix = f"{settings.STORAGE_AUDIO_PREFIX}/"
+    if expires is None and signature is None and key.startswith(audio_prefix) and "/" not in key[len(audio_prefix):]:
+        # Unsigned /storage/audio/<name> links predate the storage backend (and may still
+        # be held by clients); send them to the authenticated audio route
+        return RedirectResponse(
+            f"/api/v1/audio/files/{key[len(audio_prefix):]}",
+            status_code=status.HTTP_308_PERMANENT_REDIRECT
+        )
+    if expires is None or signature is None:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Invalid or expired storage link"
+        )
+    
+    try:
+        valid = verify_storage_signature(key, expires, signature)
+    except ValueError:
+        valid = False
+    if not valid:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Invalid or expired storage link"
+        )
+    
+    # Caches must not keep the object past the link's own expiry
+    max_age = max(expires - int(time.time()), 0)
+    return storage_response(
+        request,
+        get_storage(),
+        key,
+        cache_control=f"private, max-age={max_age}"
+    )
+
+
+@app.get("/", dependencies=[Depends(cache_policy(PUBLIC_REFERENCE))])
 async def root():
     return {
         "message": "Welcome to AI Medical Scribe API",
@@ -84,6 +199,17 @@ async def root():
     }
 
 
+@app.get("/metrics", include_in_schema=False, dependencies=[Depends(require_metrics_access)])
+async def metrics():
+    # With STATE_BACKEND=redis this gathers every worker's series over the network
+    body = await run_in_threadpool(render_prometheus)
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
+
+QUEUE_DEPTH.set_function(log_queue_depth, queue="log")
+register_memory_metrics()
+
+
 @app.get("/health")
 async def health_check():
     return {
@@ -93,18 +219,24 @@ async def health_check():
 
 
 def init_db():
-    from app.models import User, Patient, Visit
+    from app.models import User, Patient, Visit, RefreshToken
     Base.metadata.create_all(bind=engine)
     logger.info("Database tables created")
 
 
 @app.on_event("startup")
 async def startup_event():
-    logger.info(f"Starting {settings.APP_NAME} v{settings.APP_VERSION}")
+    logger.info("Starting %s v%s", settings.APP_NAME, settings.APP_VERSION)
     init_db()
+    # Fail at boot, not on the first visit, on a missing template or bad PROMPT_VERSIONS pin
+    get_prompt_registry()
+    # Runs in each forked worker: mirror revocations, metrics and slow requests via Redis
+    start_state_sync()
     logger.info("Application startup complete")
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("Application shutdown")
+    flush_traces()
+    stop_logging()
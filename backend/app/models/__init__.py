@@ -1,5 +1,6 @@
 from app.models.user import User
 from app.models.patient import Patient
 from app.models.visit import Visit
+from app.models.refresh_token import RefreshToken
 
-__all__ = ["User", "Patient", "Visit"]
+__all__ = ["User", "Patient", "Visit", "RefreshToken"]
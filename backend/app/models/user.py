@@ -20,5 +20,8 @@ class User(Base):
     full_name = Column(String(255), nullable=True)
     role = Column(String(50), default=UserRole.DOCTOR.value)
     is_active = Column(Integer, default=1)
+    # Transcription defaults; NULL falls back to the clinic settings
+    transcription_language = Column(String(20), nullable=True)
+    whisper_model = Column(String(50), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -14,6 +14,8 @@ class Visit(Base):
     prescription_text = Column(Text, nullable=True)
     audio_file_url = Column(String(500), nullable=True)
     doctor_notes = Column(Text, nullable=True)
+    # {"soap": "v1", "prescription": "v1", ...}: prompt templates the AI output came from
+    prompt_versions = Column(JSON, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -6,9 +6,31 @@ class TranscriptionRequest(BaseModel):
     audio_file_url: str
 
 
+class TranscriptSegments(BaseModel):
+    """Columnar: index i of every list describes segment i."""
+    start: List[float]
+    end: List[float]
+    text: List[str]
+    avg_logprob: List[float]
+    no_speech_prob: List[float]
+
+
+class TranscriptWords(BaseModel):
+    """Columnar: `segment` is the index of the segment each word belongs to."""
+    segment: List[int]
+    start: List[float]
+    end: List[float]
+    word: List[str]
+    probability: List[float]
+
+
 class TranscriptionResponse(BaseModel):
     transcription: str
     duration: Optional[float] = None
+    language: Optional[str] = None
+    model: Optional[str] = None
+    segments: Optional[TranscriptSegments] = None
+    words: Optional[TranscriptWords] = None
 
 
 class SOAPNote(BaseModel):
@@ -20,6 +42,8 @@ class SOAPNote(BaseModel):
 
 class SOAPRequest(BaseModel):
     transcription: str
+    # When set, the prompt versions used are recorded on this visit
+    visit_id: Optional[int] = None
 
 
 class SOAPResponse(BaseModel):
@@ -34,10 +58,18 @@ class Medication(BaseModel):
     instructions: Optional[str] = None
 
 
+class PrescriptionDraft(BaseModel):
+    """What the LLM is asked to produce; prescription_text is rendered from it locally."""
+    medications: List[Medication]
+    advice: List[str]
+    follow_up: Optional[str] = None
+
+
 class PrescriptionRequest(BaseModel):
     patient_id: Optional [int] = None
     soap_assessment: str
     patient_info: Optional[Dict[str, Any]] = None
+    visit_id: Optional[int] = None
 
 
 class PrescriptionResponse(BaseModel):
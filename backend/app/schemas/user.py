@@ -24,14 +24,28 @@ class UserResponse(UserBase):
     role: str
     is_active: int
     created_at: Optional[datetime] = None
+    transcription_language: Optional[str] = None
+    whisper_model: Optional[str] = None
 
     class Config:
         from_attributes = True
 
 
+class TranscriptionPreferences(BaseModel):
+    """None clears the value so the clinic default applies again."""
+    transcription_language: Optional[str] = None
+    whisper_model: Optional[str] = None
+
+
 class Token(BaseModel):
     access_token: str
     token_type: str = "bearer"
+    expires_in: Optional[int] = None
+    refresh_token: Optional[str] = None
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 
 class TokenData(BaseModel):
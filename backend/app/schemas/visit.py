@@ -27,6 +27,7 @@ class VisitUpdate(BaseModel):
 
 class VisitResponse(VisitBase):
     id: int
+    prompt_versions: Optional[Dict[str, str]] = None
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
 
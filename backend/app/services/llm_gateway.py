@@ -0,0 +1,448 @@
+import contextvars
+import hashlib
+import json
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeout
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import openai
+from openai import OpenAI
+from app.core.config import settings
+from app.utils.logger import get_logger
+from app.utils.metrics import Counter, Gauge, Histogram
+from app.utils.profiler import attributed
+from app.utils.tracing import span, KIND_CLIENT
+
+logger = get_logger(__name__)
+
+LLM_REQUESTS = Counter(
+    "scribe_llm_requests_total",
+    "Upstream LLM attempts by route and outcome (ok, error, retry, circuit_open)",
+    ["route", "outcome"],
+)
+LLM_LATENCY = Histogram(
+    "scribe_llm_latency_seconds",
+    "Latency of successful upstream LLM attempts",
+    ["route"],
+)
+LLM_HEDGES = Counter(
+    "scribe_llm_hedges_total",
+    "Hedged LLM requests launched, how many answered first, and how many were skipped because the LLM pool was busy",
+    ["outcome"],
+)
+LLM_COALESCED = Counter(
+    "scribe_llm_coalesced_total",
+    "LLM calls answered without an upstream request of their own (joined an in-flight call, or recent result)",
+    ["result"],
+)
+LLM_CIRCUIT = Gauge(
+    "scribe_llm_circuit_state",
+    "Circuit breaker state per LLM route (0 closed, 1 open, 2 half-open)",
+    ["route"],
+)
+
+
+class LLMError(RuntimeError):
+    """An LLM route failed after its retries."""
+
+
+class LLMRequestError(LLMError):
+    """The provider rejected the request itself (4xx other than 408/409/429); retrying or falling back cannot help."""
+
+
+class LLMUnavailableError(LLMError):
+    """No route produced an answer before the deadline."""
+
+
+@dataclass
+class LLMResponse:
+    content: str
+    model: str
+    route: str
+    latency_seconds: float
+    hedged: bool = False
+
+
+def _is_retryable(error: Exception) -> bool:
+    # TimeoutError: the attempt's own deadline passed before an answer (or while queued)
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError, TimeoutError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in (408, 409, 429) or error.status_code >= 500
+    return False
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+# ============================================================
+# CIRCUIT BREAKER / LATENCY TRACKING
+# ============================================================
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls for
+    `reset_seconds`; then lets a single probe through (half-open) whose
+    outcome closes or re-opens it.
+    """
+
+    STATES = {"closed": 0, "open": 1, "half_open": 2}
+
+    def __init__(self, name: str, failure_threshold: int, reset_seconds: float):
+        self.name = name
+        self.failure_threshold = max(failure_threshold, 1)
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        LLM_CIRCUIT.set(0, route=name)
+
+    def _set_state(self, state: str) -> None:
+        if state != self.state:
+            logger.warning("LLM route %s circuit %s -> %s", self.name, self.state, state)
+        self.state = state
+        LLM_CIRCUIT.set(self.STATES[state], route=self.name)
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_seconds:
+                self._set_state("half_open")
+                self._probe_in_flight = False
+            if self.state == "half_open" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._probe_in_flight = False
+            self._set_state("closed")
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self.state == "half_open" or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._set_state("open")
+
+
+class LatencyTracker:
+    """Recent successful latencies of one route, for the hedging delay."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples: deque = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)]
+
+
+# ============================================================
+# REQUEST COALESCING
+# ============================================================
+class SingleFlight:
+    """
+    Concurrent calls with the same key share one in-flight Future, and a
+    finished result is reused for `ttl_seconds` (0 = share in-flight calls
+    only). Failures are handed to every waiter but never cached. Per process:
+    duplicates landing on different workers still each call upstream.
+    """
+
+    def __init__(self, ttl_seconds: float, maxsize: int):
+        self.ttl_seconds = ttl_seconds
+        self.maxsize = maxsize
+        self._inflight: Dict[str, Future] = {}
+        self._results: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            entry = self._results.get(key)
+            if entry is not None:
+                if entry[1] > time.monotonic():
+                    LLM_COALESCED.inc(result="cached")
+                    return entry[0]
+                del self._results[key]
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+
+        if not leader:
+            LLM_COALESCED.inc(result="joined")
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            # Cache before leaving the in-flight map so no caller slips through in between
+            if self.ttl_seconds > 0:
+                self._results[key] = (result, time.monotonic() + self.ttl_seconds)
+                self._results.move_to_end(key)
+                while len(self._results) > self.maxsize:
+                    self._results.popitem(last=False)
+            del self._inflight[key]
+        future.set_result(result)
+        return result
+
+
+# ============================================================
+# GATEWAY
+# ============================================================
+@dataclass
+class LLMRoute:
+    name: str
+    model: str
+    client: OpenAI
+    breaker: CircuitBreaker
+    latencies: LatencyTracker
+
+
+# Hedged attempts run here so the caller can wait on whichever answers first
+_llm_executor = ThreadPoolExecutor(max_workers=settings.LLM_MAX_CONCURRENCY, thread_name_prefix="llm")
+_llm_pending = 0  # submitted and not yet finished, queued or running
+_llm_pending_lock = threading.Lock()
+
+
+def _llm_submit(fn: Callable[..., Any], *args: Any) -> Future:
+    global _llm_pending
+    with _llm_pending_lock:
+        _llm_pending += 1
+    future = _llm_executor.submit(contextvars.copy_context().run, attributed(fn), *args)
+    future.add_done_callback(_llm_finished)
+    return future
+
+
+def _llm_finished(_future: Future) -> None:
+    global _llm_pending
+    with _llm_pending_lock:
+        _llm_pending -= 1
+
+
+def _llm_pool_has_room(threads: int) -> bool:
+    return _llm_pending + threads <= settings.LLM_MAX_CONCURRENCY
+
+
+class LLMGateway:
+    """
+    Chat completions over an ordered list of routes (primary, then fallback).
+
+    Every call has an overall deadline. Within it, each route gets retries on
+    timeouts, 429 and 5xx with full-jitter exponential backoff (honouring
+    Retry-After); a route whose circuit is open is skipped. With hedging on,
+    an attempt still running after the route's recent p95 latency is raced
+    by a second identical request. Identical concurrent calls (double clicks,
+    client retries) share a single upstream request.
+    """
+
+    def __init__(self, routes: List[LLMRoute]):
+        self.routes = routes
+        self._single_flight = SingleFlight(settings.LLM_COALESCE_TTL_SECONDS, settings.LLM_COALESCE_MAX_ENTRIES)
+
+    def _request_key(self, request: Dict[str, Any]) -> str:
+        payload = {"models": [route.model for route in self.routes], **request}
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+    def chat(
+        self,
+        messages: List[Dict[str, Any]],
+        temperature: float = 0.2,
+        max_tokens: Optional[int] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+        deadline_seconds: Optional[float] = None,
+        purpose: str = "chat",
+    ) -> LLMResponse:
+        request: Dict[str, Any] = {"messages": messages, "temperature": temperature}
+        if max_tokens is not None:
+            request["max_tokens"] = max_tokens
+        if response_format is not None:
+            request["response_format"] = response_format
+        return self._single_flight.do(
+            self._request_key(request), lambda: self._dispatch(request, deadline_seconds, purpose)
+        )
+
+    def _dispatch(self, request: Dict[str, Any], deadline_seconds: Optional[float], purpose: str) -> LLMResponse:
+        deadline = time.monotonic() + (deadline_seconds or settings.LLM_DEADLINE_SECONDS)
+
+        last_error: Optional[Exception] = None
+        for route in self.routes:
+            if time.monotonic() >= deadline:
+                break
+            if not route.breaker.allow():
+                LLM_REQUESTS.inc(route=route.name, outcome="circuit_open")
+                continue
+            try:
+                return self._call_with_retries(route, request, deadline, purpose)
+            except LLMRequestError:
+                raise
+            except LLMError as e:
+                last_error = e
+                logger.warning("LLM route %s failed, trying next route: %s", route.name, e)
+        raise LLMUnavailableError(f"No LLM route answered in time: {last_error or 'all circuits open'}")
+
+    def _call_with_retries(self, route: LLMRoute, request: Dict[str, Any], deadline: float, purpose: str) -> LLMResponse:
+        last_error: Optional[Exception] = None
+        for attempt in range(settings.LLM_MAX_RETRIES + 1):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                return self._attempt(route, request, min(remaining, settings.LLM_TIMEOUT_SECONDS), purpose)
+            except Exception as e:
+                LLM_REQUESTS.inc(route=route.name, outcome="error")
+                if not _is_retryable(e):
+                    if isinstance(e, openai.APIStatusError):
+                        # The provider is up and answering; it just refused this request
+                        route.breaker.record_success()
+                        raise LLMRequestError(f"{route.name}: {e}") from e
+                    route.breaker.record_failure()
+                    raise
+                last_error = e
+                route.breaker.record_failure()
+                if attempt == settings.LLM_MAX_RETRIES or route.breaker.state == "open":
+                    break
+                backoff = min(settings.LLM_BACKOFF_BASE_MS * 2 ** attempt, settings.LLM_BACKOFF_MAX_MS) / 1000.0
+                delay = max(random.uniform(0, backoff), _retry_after(e) or 0.0)
+                if time.monotonic() + delay >= deadline:
+                    break
+                LLM_REQUESTS.inc(route=route.name, outcome="retry")
+                time.sleep(delay)
+        raise LLMError(f"{route.name}: {last_error or 'deadline exceeded'}") from last_error
+
+    def _hedge_delay(self, route: LLMRoute, timeout: float) -> Optional[float]:
+        if not settings.LLM_HEDGE_ENABLED:
+            return None
+        p95 = route.latencies.percentile(95)
+        if p95 is None:
+            return None
+        delay = max(p95, settings.LLM_HEDGE_MIN_DELAY_MS / 1000.0)
+        return delay if delay < timeout else None
+
+    def _attempt(self, route: LLMRoute, request: Dict[str, Any], timeout: float, purpose: str) -> LLMResponse:
+        expires = time.monotonic() + timeout
+        hedge_after = self._hedge_delay(route, timeout)
+        if hedge_after is not None and not _llm_pool_has_room(2):
+            # A hedge on a busy pool only queues behind other calls and adds load
+            LLM_HEDGES.inc(outcome="skipped")
+            hedge_after = None
+        if hedge_after is None:
+            return self._send(route, request, timeout, purpose)
+
+        first = _llm_submit(self._send_until, route, request, expires, purpose)
+        try:
+            return first.result(timeout=hedge_after)
+        except FutureTimeout:
+            pass
+        pending, second = {first}, None
+        if _llm_pool_has_room(1):
+            LLM_HEDGES.inc(outcome="launched")
+            second = _llm_submit(self._send_until, route, request, expires, purpose, True)
+            pending.add(second)
+        else:
+            LLM_HEDGES.inc(outcome="skipped")
+        # First success wins; the loser's HTTP call cannot be cancelled and is simply ignored
+        error: Optional[BaseException] = None
+        while pending:
+            remaining = expires - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is second:
+                        LLM_HEDGES.inc(outcome="won")
+                    return future.result()
+                error = future.exception()
+        if error is not None and not pending:
+            raise error
+        raise TimeoutError(f"{route.name}: no answer within {timeout:.1f}s")
+
+    def _send_until(self, route: LLMRoute, request: Dict[str, Any], expires: float, purpose: str, hedged: bool = False) -> LLMResponse:
+        # Time spent waiting for a pool thread comes out of the attempt's timeout
+        remaining = expires - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError(f"{route.name}: attempt expired while queued for the LLM pool")
+        return self._send(route, request, remaining, purpose, hedged)
+
+    def _send(self, route: LLMRoute, request: Dict[str, Any], timeout: float, purpose: str, hedged: bool = False) -> LLMResponse:
+        started = time.monotonic()
+        attributes = {"llm.model": route.model, "llm.route": route.name, "llm.purpose": purpose, "llm.hedged": hedged}
+        with span("openai.chat.completions", kind=KIND_CLIENT, attributes=attributes):
+            response = route.client.with_options(timeout=timeout).chat.completions.create(model=route.model, **request)
+        elapsed = time.monotonic() - started
+        route.latencies.add(elapsed)
+        route.breaker.record_success()
+        LLM_LATENCY.observe(elapsed, route=route.name)
+        LLM_REQUESTS.inc(route=route.name, outcome="ok")
+        return LLMResponse(
+            content=response.choices[0].message.content or "",
+            model=response.model or route.model,
+            route=route.name,
+            latency_seconds=elapsed,
+            hedged=hedged,
+        )
+
+
+def _route(name: str, model: str, base_url: Optional[str], api_key: str) -> LLMRoute:
+    # Retries and timeouts are the gateway's job; the SDK's own would multiply them
+    client = OpenAI(api_key=api_key, base_url=base_url or None, max_retries=0, timeout=settings.LLM_TIMEOUT_SECONDS)
+    return LLMRoute(
+        name=name,
+        model=model,
+        client=client,
+        breaker=CircuitBreaker(name, settings.LLM_BREAKER_FAILURES, settings.LLM_BREAKER_RESET_SECONDS),
+        latencies=LatencyTracker(),
+    )
+
+
+@lru_cache()
+def get_llm_gateway() -> LLMGateway:
+    """
+    Primary route: LLM_MODEL on OPENAI_BASE_URL (or api.openai.com). Optional
+    fallback: LLM_FALLBACK_MODEL and/or LLM_FALLBACK_BASE_URL, e.g. a local
+    Ollama/vLLM server or benchmarks/fake_llm_server.py in tests.
+    """
+    routes = []
+    if settings.OPENAI_API_KEY:
+        routes.append(_route("primary", settings.LLM_MODEL, settings.OPENAI_BASE_URL, settings.OPENAI_API_KEY))
+    if settings.LLM_FALLBACK_MODEL or settings.LLM_FALLBACK_BASE_URL:
+        routes.append(_route(
+            "fallback",
+            settings.LLM_FALLBACK_MODEL or settings.LLM_MODEL,
+            settings.LLM_FALLBACK_BASE_URL or settings.OPENAI_BASE_URL,
+            # Local servers usually accept any key, but the SDK insists on one
+            settings.LLM_FALLBACK_API_KEY or settings.OPENAI_API_KEY or "local",
+        ))
+    if not routes:
+        raise ValueError("OPENAI_API_KEY is not configured")
+    return LLMGateway(routes)
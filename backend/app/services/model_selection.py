@@ -0,0 +1,100 @@
+from typing import List, Optional, Tuple
+from whisper.tokenizer import LANGUAGES, TO_LANGUAGE_CODE
+from app.core.config import settings
+from app.services.user_cache import CachedUser
+
+# Sizes that ship an English-only ".en" variant
+ENGLISH_ONLY_SIZES = ("tiny", "base", "small", "medium")
+
+
+class ModelSelectionError(ValueError):
+    """The requested language or Whisper model (or the pair) cannot be used."""
+
+
+def normalize_language(language: Optional[str]) -> Optional[str]:
+    """
+    "en", "EN" or "english" -> "en". None, "" and "auto" mean let Whisper
+    detect the language. Raises ModelSelectionError for anything Whisper cannot decode.
+    """
+    if language is None:
+        return None
+    key = language.strip().lower()
+    if key in ("", "auto"):
+        return None
+    if key in LANGUAGES:
+        return key
+    if key in TO_LANGUAGE_CODE:
+        return TO_LANGUAGE_CODE[key]
+    raise ModelSelectionError(f"Unsupported transcription language: {language}")
+
+
+def english_model() -> Optional[str]:
+    """
+    The English fast-path model, WHISPER_ENGLISH_MODEL. Opt-in: it is a second
+    set of weights in every worker, so unset (or "off") disables it.
+    """
+    configured = settings.WHISPER_ENGLISH_MODEL.strip()
+    if not configured or configured.lower() == "off":
+        return None
+    return configured
+
+
+def allowed_models() -> List[str]:
+    # Every model picked here stays loaded in each worker, so the set is closed
+    names = [m.strip() for m in settings.WHISPER_ALLOWED_MODELS.split(",") if m.strip()]
+    for name in (settings.WHISPER_MODEL, english_model()):
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def validate_model(model: Optional[str]) -> Optional[str]:
+    if model and model not in allowed_models():
+        raise ModelSelectionError(f"Unsupported Whisper model: {model}. Choose one of: {', '.join(allowed_models())}")
+    return model or None
+
+
+def check_model_language(model: Optional[str], language: Optional[str]) -> Optional[str]:
+    """
+    The language to decode `model` with: English-only ".en" models force "en"
+    and reject any other language.
+    """
+    if model and model.endswith(".en"):
+        if language not in (None, "en"):
+            raise ModelSelectionError(f"Whisper model {model} only transcribes English")
+        return "en"
+    return language
+
+
+def transcription_preferences(
+    user: Optional[CachedUser],
+    language: Optional[str] = None,
+    model: Optional[str] = None,
+) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Resolves (language, model) for one request: per-request override, then the
+    user's saved default, then the clinic default. model None means
+    select_model() decides once the duration is known.
+    """
+    if language is None:
+        language = (user.transcription_language if user else None) or settings.CLINIC_LANGUAGE
+    model = validate_model(model)
+    # A saved model dropped from WHISPER_ALLOWED_MODELS since is ignored rather than failing every upload
+    if model is None and user is not None and user.whisper_model in allowed_models():
+        model = user.whisper_model
+    return normalize_language(language), model
+
+
+def select_model(language: Optional[str], model: Optional[str], audio_seconds: float) -> Tuple[str, Optional[str]]:
+    """
+    Returns (model, language) for the recording. An explicit model always
+    wins; otherwise known-English audio up to WHISPER_ENGLISH_MAX_SECONDS goes
+    to the English-only model, and everything else to WHISPER_MODEL.
+    """
+    if model:
+        return model, check_model_language(model, language)
+
+    fast_path = english_model()
+    if language == "en" and fast_path and audio_seconds <= settings.WHISPER_ENGLISH_MAX_SECONDS:
+        return fast_path, language
+    return settings.WHISPER_MODEL, language
@@ -1,12 +1,16 @@
-import os
-from datetime import datetime
+import hashlib
+import io
+import json
+from datetime import date, datetime
 from typing import Dict, Any, Optional
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, HRFlowable
-from app.core.config import settings
+from app.services.storage_service import get_storage, prescription_key
+from app.utils.metrics import stage_timer
+from app.utils.tracing import span
 
 
 CLINIC_INFO = {
@@ -18,24 +22,59 @@ CLINIC_INFO = {
 }
 
 
+def _pdf_filename(
+    visit_id: int,
+    patient_info: Dict[str, Any],
+    prescription_data: Dict[str, Any],
+    doctor_info: Optional[Dict[str, Any]],
+) -> str:
+    # Rendering is deterministic (invariant=1) apart from the printed date, so
+    # these inputs plus today's date identify the PDF's bytes
+    payload = json.dumps(
+        [patient_info, prescription_data, doctor_info or {}, date.today().isoformat()],
+        sort_keys=True,
+        default=str,
+    )
+    return f"prescription_{visit_id}_{hashlib.sha256(payload.encode()).hexdigest()[:16]}.pdf"
+
+
+def ensure_prescription_pdf(
+    visit_id: int,
+    patient_info: Dict[str, Any],
+    prescription_data: Dict[str, Any],
+    doctor_info: Optional[Dict[str, Any]] = None
+) -> str:
+    """
+    Storage key of the prescription PDF, rendered only if no PDF for the same
+    inputs was stored today.
+    """
+    key = prescription_key(_pdf_filename(visit_id, patient_info, prescription_data, doctor_info))
+    if get_storage().exists(key):
+        return key
+    return generate_prescription_pdf(visit_id, patient_info, prescription_data, doctor_info)
+
+
 def generate_prescription_pdf(
     visit_id: int,
     patient_info: Dict[str, Any],
     prescription_data: Dict[str, Any],
     doctor_info: Optional[Dict[str, Any]] = None
 ) -> str:
-    os.makedirs(settings.STORAGE_PRESCRIPTIONS_PATH, exist_ok=True)
-    
-    filename = f"prescription_{visit_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-    file_path = os.path.join(settings.STORAGE_PRESCRIPTIONS_PATH, filename)
+    """
+    Renders the prescription PDF and stores it, returning the storage key.
+    """
+    filename = _pdf_filename(visit_id, patient_info, prescription_data, doctor_info)
+    buffer = io.BytesIO()
     
     doc = SimpleDocTemplate(
-        file_path,
+        buffer,
         pagesize=letter,
         rightMargin=0.75*inch,
         leftMargin=0.75*inch,
         topMargin=0.5*inch,
-        bottomMargin=0.5*inch
+        bottomMargin=0.5*inch,
+        # Deterministic output (no random document ID/timestamps) so identical prescriptions get identical ETags
+        invariant=1
     )
     
     styles = getSampleStyleSheet()
@@ -180,6 +219,10 @@ def generate_prescription_pdf(
         ParagraphStyle('Disclaimer', parent=styles['Normal'], fontSize=8, textColor=colors.grey, alignment=1)
     ))
     
-    doc.build(elements)
+    with span("reportlab.build", attributes={"visit.id": visit_id}), stage_timer("reportlab_build"):
+        doc.build(elements)
+    
+    buffer.seek(0)
+    stored = get_storage().put(prescription_key(filename), buffer, content_type="application/pdf")
     
-    return file_path
+    return stored.key
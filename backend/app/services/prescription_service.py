@@ -1,14 +1,8 @@
-import json
 from typing import Dict, Any, List, Optional
-from openai import OpenAI
-from app.core.config import settings
-
-
-def get_openai_client():
-    api_key = settings.OPENAI_API_KEY
-    if not api_key:
-        raise ValueError("OPENAI_API_KEY is not configured")
-    return OpenAI(api_key=api_key)
+from app.schemas.ai import PrescriptionDraft
+from app.services.llm_gateway import get_llm_gateway
+from app.services.prompt_registry import get_prompt
+from app.services.structured_output import generate_structured
 
 
 def generate_prescription(
@@ -16,7 +10,7 @@ def generate_prescription(
     patient_info: Optional[Dict[str, Any]] = None
 ) -> Dict[str, Any]:
 
-    client = get_openai_client()
+    gateway = get_llm_gateway()
 
     # Dummy patient info for demo mode
     if not patient_info:
@@ -27,79 +21,25 @@ def generate_prescription(
             "medical_history": "Not available"
         }
 
-    patient_context = f"""
-Patient Information:
-- Name: {patient_info.get("name")}
-- Age: {patient_info.get("age")}
-- Gender: {patient_info.get("gender")}
-- Medical History: {patient_info.get("medical_history")}
-"""
-
-    system_prompt = """
-You are an expert medical prescribing assistant.
-Generate SAFE and BASIC clinical recommendations.
-
-RULES:
-- Only suggest common over-the-counter or standard medications.
-- Never include antibiotics or controlled substances unless clearly justified.
-- Keep doses standard.
-- Keep explanations simple.
-- If assessment is unclear, still provide general supportive care.
-
-Return output EXACTLY in the following JSON format (IMPORTANT):
-
-{
-  "medications": [
-    {
-      "name": "",
-      "dosage": "",
-      "frequency": "",
-      "duration": "",
-      "instructions": ""
-    }
-  ],
-  "advice": ["", ""],
-  "follow_up": ""
-}
-
-Do NOT include extra text outside JSON.
-"""
-
-    user_prompt = f"""
-SOAP ASSESSMENT:
-{soap_assessment}
-
-{patient_context}
-
-Now generate the prescription JSON.
-"""
-
-    # ----------- FREE MODEL VERSION (SAFE FOR DEVELOPMENT) -----------
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",     # FREE & SAFE
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt},
-        ],
-        temperature=0.2
+    # ----------- LLM_MODEL via the gateway, schema-constrained -----------
+    draft = generate_structured(
+        gateway,
+        # Static system prompt first (provider prompt cache prefix), patient and assessment last
+        messages=get_prompt("prescription").messages(
+            name=patient_info.get("name"),
+            age=patient_info.get("age"),
+            gender=patient_info.get("gender"),
+            medical_history=patient_info.get("medical_history"),
+            soap_assessment=soap_assessment,
+        ),
+        model=PrescriptionDraft,
+        temperature=0.2,
+        purpose="prescription"
     )
 
-    raw = response.choices[0].message.content.strip()
-
-    # Try to extract JSON
-    try:
-        data = json.loads(raw)
-    except Exception:
-        # Fallback safety to prevent crashes
-        data = {
-            "medications": [],
-            "advice": ["Rest, hydration, and monitor symptoms."],
-            "follow_up": "Follow up in 3 days or if symptoms worsen."
-        }
-
-    medications = data.get("medications", [])
-    advice = data.get("advice", [])
-    follow_up = data.get("follow_up", "Follow up as needed.")
+    medications = [med.model_dump() for med in draft.medications]
+    advice = draft.advice
+    follow_up = draft.follow_up or "Follow up as needed."
 
     prescription_text = format_prescription_text(medications, advice, follow_up)
 
@@ -111,23 +51,6 @@ Now generate the prescription JSON.
     }
 
 
-# -------------- OLD ADVANCED STRUCTURED OUTPUT (KEEP FOR LATER) --------------
-"""
-# Uncomment when switching to paid model:
-
-response = client.chat.completions.create(
-    model="gpt-4o",
-    messages=[...],
-    response_format={
-        "type": "json_schema",
-        "json_schema": { ... }
-    }
-)
-data = response.output_json
-"""
-# -----------------------------------------------------------------------------
-
-
 def format_prescription_text(
     medications: List[Dict[str, str]],
     advice: List[str],
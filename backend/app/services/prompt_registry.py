@@ -0,0 +1,119 @@
+import os
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+from app.core.config import settings
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+PROMPTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "prompts")
+
+# app/prompts/<name>/v<N>.system.txt and v<N>.user.txt
+_TEMPLATE_FILE = re.compile(r"^(v\d+)\.system\.txt$")
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    """
+    One version of a prompt. The system part is sent byte-for-byte on every
+    call so it forms a stable prefix that provider-side prompt caching can
+    reuse; everything that varies per request goes through the user template,
+    which comes last.
+    """
+    name: str
+    version: str
+    system: str
+    user: str
+
+    def messages(self, **variables: Any) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": self.system},
+            {"role": "user", "content": self.user.format(**variables)},
+        ]
+
+
+def _read(path: str) -> str:
+    with open(path, encoding="utf-8") as f:
+        return f.read().strip()
+
+
+def _version_key(version: str) -> int:
+    return int(version[1:])
+
+
+def _parse_pins(value: str) -> Dict[str, str]:
+    # "soap=v1,prescription=v2"
+    pins = {}
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        name, sep, version = item.partition("=")
+        if not sep or not name.strip() or not version.strip():
+            raise ValueError(f"Invalid PROMPT_VERSIONS entry: {item.strip()!r} (expected name=version)")
+        pins[name.strip()] = version.strip()
+    return pins
+
+
+class PromptRegistry:
+    def __init__(self, templates: Dict[str, Dict[str, PromptTemplate]], pins: Optional[Dict[str, str]] = None):
+        self._templates = templates
+        self._active: Dict[str, PromptTemplate] = {}
+        pins = pins or {}
+        for name, pinned in pins.items():
+            if pinned not in templates.get(name, {}):
+                raise ValueError(f"PROMPT_VERSIONS pins unknown prompt version {name}@{pinned}")
+        for name, versions in templates.items():
+            # Newest version unless PROMPT_VERSIONS pins an older one (rollback, A/B by deployment)
+            version = pins.get(name) or max(versions, key=_version_key)
+            self._active[name] = versions[version]
+
+    @classmethod
+    def load(cls, directory: str = PROMPTS_DIR, pins: Optional[Dict[str, str]] = None) -> "PromptRegistry":
+        templates: Dict[str, Dict[str, PromptTemplate]] = {}
+        for name in sorted(os.listdir(directory)):
+            folder = os.path.join(directory, name)
+            if not os.path.isdir(folder) or name.startswith(("_", ".")):
+                continue
+            for filename in sorted(os.listdir(folder)):
+                match = _TEMPLATE_FILE.match(filename)
+                if not match:
+                    continue
+                version = match.group(1)
+                user_path = os.path.join(folder, f"{version}.user.txt")
+                if not os.path.exists(user_path):
+                    raise ValueError(f"Prompt {name}@{version} has no {version}.user.txt")
+                templates.setdefault(name, {})[version] = PromptTemplate(
+                    name=name,
+                    version=version,
+                    system=_read(os.path.join(folder, filename)),
+                    user=_read(user_path),
+                )
+        return cls(templates, pins)
+
+    def get(self, name: str, version: Optional[str] = None) -> PromptTemplate:
+        if version is None:
+            if name not in self._active:
+                raise KeyError(f"Unknown prompt: {name}")
+            return self._active[name]
+        try:
+            return self._templates[name][version]
+        except KeyError:
+            raise KeyError(f"Unknown prompt version: {name}@{version}")
+
+    def active_versions(self, *names: str) -> Dict[str, str]:
+        """{name: version} in effect, e.g. for recording on a Visit."""
+        return {name: self.get(name).version for name in (names or self._active)}
+
+
+@lru_cache()
+def get_prompt_registry() -> PromptRegistry:
+    # Read from disk once per process; templates never change under a running worker
+    registry = PromptRegistry.load(pins=_parse_pins(settings.PROMPT_VERSIONS))
+    logger.info("Loaded prompts: %s", ", ".join(f"{n}@{v}" for n, v in registry.active_versions().items()))
+    return registry
+
+
+def get_prompt(name: str) -> PromptTemplate:
+    return get_prompt_registry().get(name)
@@ -1,89 +1,43 @@
-import json
-from openai import OpenAI
+from typing import Tuple
 from app.core.config import settings
-
-
-def get_openai_client():
-    api_key = settings.OPENAI_API_KEY
-    if not api_key:
-        raise ValueError("OPENAI_API_KEY is not configured")
-    return OpenAI(api_key=api_key)
-
-
-def generate_soap_note(transcription: str) -> dict:
+from app.schemas.ai import SOAPNote
+from app.services.llm_gateway import get_llm_gateway
+from app.services.prompt_registry import get_prompt
+from app.services.structured_output import generate_structured
+from app.services.transcript_compaction import compact_transcript
+from app.utils.metrics import stage_timer
+
+
+def summarize_transcript_chunk(chunk: str, part: int, parts: int) -> str:
+    """Map step for long consults: one chunk of the transcript -> clinical notes."""
+    with stage_timer("llm_summary_call"):
+        response = get_llm_gateway().chat(
+            messages=get_prompt("transcript_summary").messages(part=part, parts=parts, chunk=chunk),
+            temperature=0.0,
+            max_tokens=max(settings.SOAP_SUMMARY_CHUNK_TOKENS // 4, 256),
+            purpose="summary"
+        )
+    return response.content
+
+
+def generate_soap_note(transcription: str) -> Tuple[dict, int]:
     """
     SOAP Note generator using free-tier model.
     Strong JSON forcing + inference-friendly clinical logic.
+    Returns the note and how many rounds summarized the transcript first (0 = none).
     """
 
-    client = get_openai_client()
-
-    system_prompt = """
-You are a clinical documentation AI. Convert patient conversation text
-into a **complete SOAP note in VALID JSON format only**.
-
-RULES:
-- ALWAYS return valid JSON. No explanations, no extra text.
-- The JSON MUST contain:
-  {
-    "subjective": "",
-    "objective": "",
-    "assessment": "",
-    "plan": ""
-  }
-
-- SUBJECTIVE:
-  Summarize patient complaints and history using clinical wording.
-
-- OBJECTIVE:
-  If the transcript has no vitals/exam findings, write:
-  "No objective findings provided."
-
-- ASSESSMENT:
-  * Provide a reasonable clinical impression based on symptoms.
-  * If patient says “fever for 3 days”, infer a likely diagnosis such as:
-      - "Acute febrile illness"
-      - "Likely viral fever"
-  * Never leave blank.
-
-- PLAN:
-  * Provide general medical guidance based on symptoms.
-  * May include tests, rest, hydration, give names of commonly available OTC medicines if appropriate.
-
-STRICT RULE:
-- The response MUST be only JSON and nothing else.
-"""
-
-    user_prompt = f"""
-Create the SOAP note in JSON.
-
-TRANSCRIPT:
-{transcription}
-
-Return ONLY JSON. No markdown. No comments.
-"""
-
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt}
-        ],
-        temperature=0.2
+    gateway = get_llm_gateway()
+
+    # Fillers, repeats and Whisper artifacts only cost tokens; overlong consults
+    # are summarized part by part first so the prompt stays within budget
+    compacted = compact_transcript(transcription, summarize_transcript_chunk, model=settings.LLM_MODEL)
+    soap = generate_structured(
+        gateway,
+        # Static system prompt first (provider prompt cache prefix), the transcript last
+        messages=get_prompt("soap").messages(transcript=compacted.text),
+        model=SOAPNote,
+        temperature=0.2,
+        purpose="soap"
     )
-
-    raw = response.choices[0].message.content.strip()
-
-    # Extra safety: ensure the string contains JSON only
-    try:
-        soap = json.loads(raw)
-    except Exception:
-        raise ValueError(f"AI returned invalid JSON:\n{raw}")
-
-    # Ensure all fields exist
-    return {
-        "subjective": soap.get("subjective", "Missing"),
-        "objective": soap.get("objective", "Missing"),
-        "assessment": soap.get("assessment", "Missing"),
-        "plan": soap.get("plan", "Missing"),
-    }
+    return soap.model_dump(), compacted.reduce_rounds
@@ -0,0 +1,333 @@
+import hashlib
+import hmac
+from abc import ABC, abstractmethod
+import io
+import mimetypes
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import BinaryIO, Iterator, List, Optional, Union
+from urllib.parse import quote, urlencode
+
+from app.core.config import settings
+
+CHUNK_SIZE = 64 * 1024
+
+
+@dataclass
+class StoredObject:
+    key: str
+    size: int
+    etag: str
+    content_type: str
+    last_modified: float
+
+
+def _normalize_key(key: str) -> str:
+    key = key.replace("\\", "/").lstrip("/")
+    parts = [part for part in key.split("/") if part not in ("", ".")]
+    if not parts or ".." in parts:
+        raise ValueError(f"Invalid storage key: {key!r}")
+    return "/".join(parts)
+
+
+def _guess_content_type(key: str) -> str:
+    return mimetypes.guess_type(key)[0] or "application/octet-stream"
+
+
+def _as_stream(data: Union[bytes, BinaryIO]) -> BinaryIO:
+    if isinstance(data, (bytes, bytearray)):
+        return io.BytesIO(data)
+    return data
+
+
+def sign_storage_key(key: str, expires: int) -> str:
+    message = f"{key}:{expires}".encode()
+    return hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()
+
+
+def verify_storage_signature(key: str, expires: int, signature: str) -> bool:
+    if expires < int(time.time()):
+        return False
+    return hmac.compare_digest(sign_storage_key(_normalize_key(key), expires), signature)
+
+
+class StorageBackend(ABC):
+    """
+    Minimal object-store interface shared by every backend.
+    Keys are forward-slash paths such as "audio/<uuid>.webm".
+    """
+
+    @abstractmethod
+    def put(self, key: str, data: Union[bytes, BinaryIO], content_type: Optional[str] = None) -> StoredObject:
+        ...
+
+    @abstractmethod
+    def stream(self, key: str, start: int = 0, end: Optional[int] = None, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        """Yield the bytes of `key` from `start` to `end` (inclusive)."""
+
+    @abstractmethod
+    def stat(self, key: str) -> StoredObject:
+        ...
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    def list(self, prefix: str = "") -> List[StoredObject]:
+        ...
+
+    @abstractmethod
+    def presigned_url(self, key: str, expires_in: Optional[int] = None) -> str:
+        ...
+
+    @abstractmethod
+    def local_path(self, key: str):
+        """Context manager exposing the object as a local file (e.g. for ffmpeg/Whisper)."""
+
+    def read(self, key: str) -> bytes:
+        return b"".join(self.stream(key))
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.stat(key)
+            return True
+        except FileNotFoundError:
+            return False
+
+
+# ============================================================
+# LOCAL DISK BACKEND
+# ============================================================
+class LocalStorageBackend(StorageBackend):
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, *_normalize_key(key).split("/"))
+
+    def put(self, key, data, content_type=None):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        source = _as_stream(data)
+
+        # Write next to the target and rename so readers never see partial files
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                shutil.copyfileobj(source, f, CHUNK_SIZE)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return self.stat(key)
+
+    def stream(self, key, start=0, end=None, chunk_size=CHUNK_SIZE):
+        path = self._path(key)
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"Object not found: {key}")
+        with open(path, "rb") as f:
+            f.seek(start)
+            remaining = None if end is None else end - start + 1
+            while remaining is None or remaining > 0:
+                chunk = f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+    def stat(self, key):
+        path = self._path(key)
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"Object not found: {key}")
+        st = os.stat(path)
+        return StoredObject(
+            key=_normalize_key(key),
+            size=st.st_size,
+            etag=f'"{st.st_size:x}-{st.st_mtime_ns:x}"',
+            content_type=_guess_content_type(key),
+            last_modified=st.st_mtime,
+        )
+
+    def delete(self, key):
+        path = self._path(key)
+        if os.path.isfile(path):
+            os.remove(path)
+
+    def list(self, prefix=""):
+        base = self._path(prefix) if prefix.strip("/") else self.root
+        if not os.path.isdir(base):
+            return []
+        objects = []
+        for dirpath, _, filenames in os.walk(base):
+            for filename in filenames:
+                if filename.startswith("."):
+                    continue
+                rel = os.path.relpath(os.path.join(dirpath, filename), self.root)
+                objects.append(self.stat(rel.replace(os.sep, "/")))
+        return objects
+
+    def presigned_url(self, key, expires_in=None):
+        key = _normalize_key(key)
+        expires = int(time.time()) + (expires_in or settings.STORAGE_PRESIGN_EXPIRE_SECONDS)
+        query = urlencode({"expires": expires, "signature": sign_storage_key(key, expires)})
+        return f"/storage/{quote(key)}?{query}"
+
+    @contextmanager
+    def local_path(self, key):
+        path = self._path(key)
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"Object not found: {key}")
+        yield path
+
+
+# ============================================================
+# S3-COMPATIBLE BACKEND (AWS S3, MinIO, ...)
+# ============================================================
+class S3StorageBackend(StorageBackend):
+    def __init__(
+        self,
+        bucket: str,
+        endpoint_url: Optional[str] = None,
+        region: Optional[str] = None,
+        access_key_id: Optional[str] = None,
+        secret_access_key: Optional[str] = None,
+    ):
+        try:
+            import boto3
+            from botocore.config import Config
+        except ImportError:
+            raise RuntimeError("STORAGE_BACKEND=s3 requires the 'boto3' package")
+
+        self.bucket = bucket
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url or None,
+            region_name=region or None,
+            aws_access_key_id=access_key_id or None,
+            aws_secret_access_key=secret_access_key or None,
+            # Path-style addressing keeps MinIO and other self-hosted stand-ins happy
+            config=Config(signature_version="s3v4", s3={"addressing_style": "path"}),
+        )
+
+    def _not_found(self, error) -> bool:
+        code = str(error.response.get("Error", {}).get("Code", ""))
+        return code in ("404", "NoSuchKey", "NotFound")
+
+    def put(self, key, data, content_type=None):
+        key = _normalize_key(key)
+        self.client.upload_fileobj(
+            _as_stream(data),
+            self.bucket,
+            key,
+            ExtraArgs={"ContentType": content_type or _guess_content_type(key)},
+        )
+        return self.stat(key)
+
+    def stream(self, key, start=0, end=None, chunk_size=CHUNK_SIZE):
+        from botocore.exceptions import ClientError
+
+        key = _normalize_key(key)
+        params = {"Bucket": self.bucket, "Key": key}
+        if start or end is not None:
+            params["Range"] = f"bytes={start}-{'' if end is None else end}"
+        try:
+            body = self.client.get_object(**params)["Body"]
+        except ClientError as e:
+            if self._not_found(e):
+                raise FileNotFoundError(f"Object not found: {key}")
+            raise
+        try:
+            for chunk in body.iter_chunks(chunk_size):
+                yield chunk
+        finally:
+            body.close()
+
+    def stat(self, key):
+        from botocore.exceptions import ClientError
+
+        key = _normalize_key(key)
+        try:
+            head = self.client.head_object(Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            if self._not_found(e):
+                raise FileNotFoundError(f"Object not found: {key}")
+            raise
+        return StoredObject(
+            key=key,
+            size=head["ContentLength"],
+            etag=head["ETag"],
+            content_type=head.get("ContentType") or _guess_content_type(key),
+            last_modified=head["LastModified"].timestamp(),
+        )
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=_normalize_key(key))
+
+    def list(self, prefix=""):
+        prefix = prefix.strip("/")
+        paginator = self.client.get_paginator("list_objects_v2")
+        objects = []
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=f"{prefix}/" if prefix else ""):
+            for item in page.get("Contents", []):
+                objects.append(StoredObject(
+                    key=item["Key"],
+                    size=item["Size"],
+                    etag=item["ETag"],
+                    content_type=_guess_content_type(item["Key"]),
+                    last_modified=item["LastModified"].timestamp(),
+                ))
+        return objects
+
+    def presigned_url(self, key, expires_in=None):
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": _normalize_key(key)},
+            ExpiresIn=expires_in or settings.STORAGE_PRESIGN_EXPIRE_SECONDS,
+        )
+
+    @contextmanager
+    def local_path(self, key):
+        suffix = os.path.splitext(key)[1]
+        fd, tmp_path = tempfile.mkstemp(suffix=suffix, prefix="scribe-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in self.stream(key):
+                    f.write(chunk)
+            yield tmp_path
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+@lru_cache()
+def get_storage() -> StorageBackend:
+    if settings.STORAGE_BACKEND == "s3":
+        return S3StorageBackend(
+            bucket=settings.S3_BUCKET,
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            region=settings.S3_REGION,
+            access_key_id=settings.S3_ACCESS_KEY_ID,
+            secret_access_key=settings.S3_SECRET_ACCESS_KEY,
+        )
+    return LocalStorageBackend(settings.STORAGE_LOCAL_ROOT)
+
+
+def audio_key(filename: str) -> str:
+    return f"{settings.STORAGE_AUDIO_PREFIX}/{filename}"
+
+
+def prescription_key(filename: str) -> str:
+    return f"{settings.STORAGE_PRESCRIPTIONS_PREFIX}/{filename}"
+
+
+def tmp_audio_key(filename: str) -> str:
+    return f"{settings.STORAGE_TMP_AUDIO_PREFIX}/{filename}"
@@ -0,0 +1,148 @@
+import re
+from typing import Any, Dict, List, Optional, Type, TypeVar
+from pydantic import BaseModel, ValidationError
+from app.core.config import settings
+from app.services.llm_gateway import LLMGateway
+from app.utils.logger import get_logger
+from app.utils.metrics import Counter, stage_timer
+
+logger = get_logger(__name__)
+
+STRUCTURED_OUTPUT = Counter(
+    "scribe_llm_structured_output_total",
+    "Structured LLM replies by schema and outcome (ok, repaired, failed)",
+    ["schema", "result"],
+)
+
+T = TypeVar("T", bound=BaseModel)
+
+_FENCE = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL | re.IGNORECASE)
+
+
+class StructuredOutputError(ValueError):
+    """The model's reply did not validate against the schema, even after a repair attempt."""
+
+
+# ============================================================
+# SCHEMA / EXTRACTION
+# ============================================================
+def _strict(schema: Any) -> Any:
+    # Strict json_schema mode wants every property required and no extras;
+    # optional fields stay nullable through their anyOf [..., null]
+    if isinstance(schema, dict):
+        schema = {
+            k: ({name: _strict(sub) for name, sub in v.items()} if k in ("properties", "$defs") else _strict(v))
+            for k, v in schema.items()
+            if k not in ("title", "default")
+        }
+        if schema.get("type") == "object" and "properties" in schema:
+            schema["required"] = list(schema["properties"])
+            schema["additionalProperties"] = False
+        return schema
+    if isinstance(schema, list):
+        return [_strict(item) for item in schema]
+    return schema
+
+
+def response_format_for(model: Type[BaseModel]) -> Optional[Dict[str, Any]]:
+    """response_format for LLM_STRUCTURED_OUTPUT: json_schema, json_object, or none ("off")."""
+    mode = settings.LLM_STRUCTURED_OUTPUT
+    if mode == "json_schema":
+        return {
+            "type": "json_schema",
+            "json_schema": {"name": model.__name__, "strict": True, "schema": _strict(model.model_json_schema())},
+        }
+    if mode == "json_object":
+        return {"type": "json_object"}
+    return None
+
+
+def extract_json(raw: str) -> str:
+    """
+    The first JSON object in a reply, without the markdown fences or chatty
+    text around it that models add when they are not schema-constrained.
+    """
+    text = raw.strip()
+    if text.startswith("{") and text.endswith("}"):
+        return text
+    fenced = _FENCE.search(text)
+    if fenced:
+        text = fenced.group(1).strip()
+    start = text.find("{")
+    if start < 0:
+        raise StructuredOutputError("No JSON object in model reply")
+
+    depth, in_string, escaped = 0, False, False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    # Unbalanced (reply cut off): let the validator say where
+    return text[start:]
+
+
+def parse_structured(raw: str, model: Type[T]) -> T:
+    # model_validate_json parses with pydantic-core's jiter: no intermediate dict
+    return model.model_validate_json(extract_json(raw))
+
+
+# ============================================================
+# GENERATION WITH ONE REPAIR ROUND
+# ============================================================
+def generate_structured(
+    gateway: LLMGateway,
+    messages: List[Dict[str, Any]],
+    model: Type[T],
+    temperature: float = 0.2,
+    purpose: str = "chat",
+) -> T:
+    """
+    Asks for a reply matching `model`'s schema and validates it. An invalid
+    reply gets one repair turn (the bad reply plus the validation error)
+    instead of a full re-generation; a second failure raises
+    StructuredOutputError.
+    """
+    response_format = response_format_for(model)
+    with stage_timer("llm_call"):
+        response = gateway.chat(messages, temperature=temperature, response_format=response_format, purpose=purpose)
+    try:
+        with stage_timer("json_parse"):
+            result = parse_structured(response.content, model)
+        STRUCTURED_OUTPUT.inc(schema=model.__name__, result="ok")
+        return result
+    except (ValidationError, StructuredOutputError) as e:
+        error = e
+    logger.warning("Invalid %s from LLM, asking for a repair: %s", model.__name__, str(error)[:300])
+
+    repair_messages = messages + [
+        {"role": "assistant", "content": response.content},
+        {"role": "user", "content": (
+            f"That reply is not valid JSON for the required schema:\n{str(error)[:1000]}\n"
+            "Reply with only the corrected JSON object."
+        )},
+    ]
+    with stage_timer("llm_repair_call"):
+        response = gateway.chat(
+            repair_messages, temperature=0.0, response_format=response_format, purpose=f"{purpose}_repair"
+        )
+    try:
+        with stage_timer("json_parse"):
+            result = parse_structured(response.content, model)
+    except (ValidationError, StructuredOutputError) as e:
+        STRUCTURED_OUTPUT.inc(schema=model.__name__, result="failed")
+        raise StructuredOutputError(f"AI returned invalid {model.__name__} JSON: {str(e)[:500]}") from e
+    STRUCTURED_OUTPUT.inc(schema=model.__name__, result="repaired")
+    return result
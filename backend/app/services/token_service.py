@@ -0,0 +1,164 @@
+import hashlib
+import secrets
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.refresh_token import RefreshToken
+from app.models.user import User
+from app.utils.logger import get_logger
+from app.utils.metrics import Counter
+
+logger = get_logger(__name__)
+
+REFRESH_EVENTS = Counter(
+    "scribe_refresh_tokens_total",
+    "Refresh token operations by outcome",
+    ["result"],
+)
+
+
+class RefreshTokenError(Exception):
+    """The refresh token is unknown, expired, revoked or was replayed."""
+
+
+def _hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _aware(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def _new_token(
+    db: Session,
+    user_id: int,
+    family_id: str,
+    session_expires_at: datetime,
+) -> Tuple[RefreshToken, str]:
+    raw = secrets.token_urlsafe(48)
+    # Sliding window: each rotation extends the idle expiry, capped by the session's absolute limit
+    expires_at = min(_now() + timedelta(hours=settings.REFRESH_TOKEN_EXPIRE_HOURS), session_expires_at)
+    record = RefreshToken(
+        user_id=user_id,
+        token_hash=_hash_token(raw),
+        family_id=family_id,
+        expires_at=expires_at,
+        session_expires_at=session_expires_at,
+    )
+    db.add(record)
+    db.flush()
+    return record, raw
+
+
+def issue_refresh_token(db: Session, user: User) -> str:
+    """Starts a new session (token family) for `user` and returns the raw refresh token."""
+    session_expires_at = _now() + timedelta(days=settings.REFRESH_SESSION_MAX_DAYS)
+    _, raw = _new_token(db, user.id, uuid.uuid4().hex, session_expires_at)
+    db.commit()
+    REFRESH_EVENTS.inc(result="issued")
+    return raw
+
+
+def _revoke_family(db: Session, family_id: str, reason: str) -> None:
+    db.query(RefreshToken).filter(
+        RefreshToken.family_id == family_id,
+        RefreshToken.revoked_at.is_(None),
+    ).update({RefreshToken.revoked_at: _now(), RefreshToken.revoked_reason: reason}, synchronize_session=False)
+
+
+def _within_reuse_grace(record: RefreshToken) -> bool:
+    return _now() - _aware(record.revoked_at) <= timedelta(seconds=settings.REFRESH_TOKEN_REUSE_GRACE_SECONDS)
+
+
+def rotate_refresh_token(db: Session, raw_token: str) -> Tuple[User, str]:
+    """
+    Exchanges a refresh token for a new one in the same family.
+
+    A token rotated within the last REFRESH_TOKEN_REUSE_GRACE_SECONDS (two
+    tabs refreshing at once, a retry after a lost response) gets a sibling
+    token, as long as its session is still live. Presenting a rotated token
+    after that means it leaked (or was replayed), so the whole family is
+    revoked and the user must log in again. Tokens ended by logout are just
+    rejected.
+    """
+    record = (
+        db.query(RefreshToken)
+        .filter(RefreshToken.token_hash == _hash_token(raw_token))
+        # Serialises concurrent refreshes of the same token
+        .with_for_update()
+        .first()
+    )
+    if record is None:
+        REFRESH_EVENTS.inc(result="unknown")
+        raise RefreshTokenError("Invalid refresh token")
+
+    if record.revoked_at is not None:
+        # Only a rotated token of a still-live session can be stolen-and-replayed;
+        # after logout (or a detected reuse) there is nothing left to take over
+        if record.revoked_reason == "rotated" and _family_active(db, record.family_id):
+            if _within_reuse_grace(record):
+                return _rotate(db, record, result="rotated_in_grace")
+            _revoke_family(db, record.family_id, "reuse_detected")
+            db.commit()
+            REFRESH_EVENTS.inc(result="reuse_detected")
+            logger.warning(
+                "Refresh token reuse detected; revoked family %s for user %s", record.family_id, record.user_id
+            )
+            raise RefreshTokenError("Refresh token has been revoked")
+        db.rollback()
+        REFRESH_EVENTS.inc(result="revoked")
+        raise RefreshTokenError("Refresh token has been revoked")
+
+    if _aware(record.expires_at) <= _now():
+        db.rollback()
+        REFRESH_EVENTS.inc(result="expired")
+        raise RefreshTokenError("Refresh token has expired")
+
+    return _rotate(db, record, result="rotated")
+
+
+def _family_active(db: Session, family_id: str) -> bool:
+    # The successor (or a sibling) is still live: logout or a detected reuse ends the grace too
+    return db.query(RefreshToken.id).filter(
+        RefreshToken.family_id == family_id,
+        RefreshToken.revoked_at.is_(None),
+        RefreshToken.expires_at > _now(),
+    ).first() is not None
+
+
+def _rotate(db: Session, record: RefreshToken, result: str) -> Tuple[User, str]:
+    user = db.query(User).filter(User.id == record.user_id).first()
+    if user is None or not user.is_active:
+        _revoke_family(db, record.family_id, "inactive_user")
+        db.commit()
+        REFRESH_EVENTS.inc(result="inactive_user")
+        raise RefreshTokenError("User account is disabled")
+
+    replacement, raw = _new_token(db, record.user_id, record.family_id, _aware(record.session_expires_at))
+    if record.revoked_at is None:
+        record.revoked_at = _now()
+        record.revoked_reason = "rotated"
+        record.replaced_by_id = replacement.id
+    db.commit()
+    REFRESH_EVENTS.inc(result=result)
+    return user, raw
+
+
+def revoke_refresh_token(db: Session, raw_token: str, user_id: Optional[int] = None) -> bool:
+    """Ends the session `raw_token` belongs to (logout). Returns False if it is unknown."""
+    query = db.query(RefreshToken).filter(RefreshToken.token_hash == _hash_token(raw_token))
+    if user_id is not None:
+        query = query.filter(RefreshToken.user_id == user_id)
+    record = query.first()
+    if record is None:
+        return False
+    _revoke_family(db, record.family_id, "logout")
+    db.commit()
+    REFRESH_EVENTS.inc(result="logged_out")
+    return True
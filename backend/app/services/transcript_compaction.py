@@ -0,0 +1,192 @@
+import contextvars
+import re
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, List
+import tiktoken
+from app.core.config import settings
+from app.utils.logger import get_logger
+from app.utils.metrics import Histogram, stage_timer
+from app.utils.profiler import attributed
+from app.utils.tracing import span
+
+logger = get_logger(__name__)
+
+TRANSCRIPT_TOKENS = Histogram(
+    "scribe_soap_transcript_tokens",
+    "Transcript size in prompt tokens before and after compaction",
+    ["stage"],
+    buckets=(250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000),
+)
+
+# Map-reduce rounds before giving up and sending what is left
+MAX_REDUCE_ROUNDS = 3
+
+
+@lru_cache(maxsize=8)
+def _encoding(model: str) -> tiktoken.Encoding:
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        # Unknown or self-hosted model name: the gpt-4o tokenizer is a close enough estimate
+        return tiktoken.get_encoding("o200k_base")
+
+
+def count_tokens(text: str, model: str = "gpt-4o-mini") -> int:
+    return len(_encoding(model).encode(text, disallowed_special=()))
+
+
+# ============================================================
+# CLEANUP
+# ============================================================
+# Non-speech tags Whisper emits on noise or silence, and music notes. Only these
+# known tags: bracketed clinical text such as "(PRN)" or "[sic]" is speech.
+_ARTIFACTS = re.compile(
+    r"[\[(]\s*(?:blank[_ ]audio|no speech|music(?: playing)?|applause|laugh(?:s|ing|ter)|silence"
+    r"|inaudible|(?:background )?noise|cough(?:s|ing)?)\s*[\])]|♪+",
+    re.IGNORECASE,
+)
+# Phrases Whisper hallucinates on silent stretches (learned from subtitled video)
+_HALLUCINATIONS = re.compile(
+    r"\b(?:thanks? (?:you )?for watching|please subscribe[^.!?]*|subtitles by[^.!?]*)[.!?]?",
+    re.IGNORECASE,
+)
+# Pure fillers, lowercase but for a sentence-initial capital, so abbreviations
+# ("ER", "UH") survive; "uh-huh" / "mm-hmm" are answers and are kept
+_FILLERS = re.compile(r"(?:,\s*)?(?<![\w-])(?:[Uu]m+|[Uu]h+|[Ee]rm+)(?![\w-]),?")
+# "th- the" -> "the"
+_STUTTER = re.compile(r"\b([a-z]{1,3})-\s+(?=\1)", re.IGNORECASE)
+# "I I I think" -> "I think". A word said twice is only a stutter for words that are
+# never doubled on purpose ("she had had", "that that" are grammatical)
+_REPEATED_WORD = re.compile(r"\b([a-z']+)((?:[\s,]+\1\b)+)", re.IGNORECASE)
+_STUTTER_WORDS = frozenset(("i", "i'm", "a", "an", "the", "and", "to", "my", "it", "it's", "we", "you"))
+# The same sentence this many times in a row is a Whisper repetition loop; a
+# sentence said twice (an instruction read back) is kept
+_LOOP_REPEATS = 3
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def _normalized(sentence: str) -> str:
+    return re.sub(r"[^a-z0-9]+", " ", sentence.lower()).strip()
+
+
+def _collapse_repeat(match: "re.Match") -> str:
+    word, repeats = match.group(1), len(re.findall(r"[a-z']+", match.group(2), re.IGNORECASE))
+    if repeats >= 2 or word.lower() in _STUTTER_WORDS:
+        return word
+    return match.group(0)
+
+
+def clean_transcript(text: str) -> str:
+    """
+    Strips Whisper artifacts, filler words, stutters and immediate word
+    repetitions, then collapses Whisper repetition loops (the same sentence
+    _LOOP_REPEATS or more times in a row) to one sentence.
+    """
+    text = _ARTIFACTS.sub(" ", text)
+    text = _HALLUCINATIONS.sub(" ", text)
+    text = _FILLERS.sub("", text)
+    text = _STUTTER.sub("", text)
+    text = _REPEATED_WORD.sub(_collapse_repeat, text)
+    text = re.sub(r"\s+", " ", text)
+    text = re.sub(r"\s+([,.!?])", r"\1", text)
+    # Punctuation left stranded by removed fillers ("dry. Um... uh." -> "dry.")
+    text = re.sub(r"([.!?])(?:\s*[.,!?])+", r"\1", text)
+
+    runs: List[List] = []  # [normalized key, sentence, times in a row]
+    for sentence in _SENTENCE_END.split(text.strip()):
+        sentence = sentence.strip(" ,")
+        key = _normalized(sentence)
+        if not key:
+            continue
+        if runs and runs[-1][0] == key:
+            runs[-1][2] += 1
+        else:
+            runs.append([key, sentence[0].upper() + sentence[1:], 1])
+    sentences: List[str] = []
+    for _, sentence, count in runs:
+        sentences.extend([sentence] * (1 if count >= _LOOP_REPEATS else count))
+    return " ".join(sentences)
+
+
+# ============================================================
+# MAP-REDUCE SUMMARIZATION
+# ============================================================
+_summary_executor = ThreadPoolExecutor(
+    max_workers=settings.SOAP_SUMMARY_CONCURRENCY, thread_name_prefix="soap-summary"
+)
+
+
+def split_into_chunks(text: str, max_tokens: int, model: str = "gpt-4o-mini") -> List[str]:
+    """Packs whole sentences into chunks of at most max_tokens; a longer single sentence is cut by tokens."""
+    encoding = _encoding(model)
+    chunks: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+    for sentence in _SENTENCE_END.split(text):
+        tokens = len(encoding.encode(sentence, disallowed_special=()))
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append(" ".join(current))
+            current, current_tokens = [], 0
+        if tokens > max_tokens:
+            ids = encoding.encode(sentence, disallowed_special=())
+            chunks.extend(encoding.decode(ids[i:i + max_tokens]) for i in range(0, len(ids), max_tokens))
+            continue
+        current.append(sentence)
+        current_tokens += tokens
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+@dataclass
+class CompactedTranscript:
+    text: str
+    raw_tokens: int
+    tokens: int
+    reduce_rounds: int = 0
+
+
+def compact_transcript(
+    text: str,
+    summarize: Callable[[str, int, int], str],
+    budget: int = 0,
+    model: str = "gpt-4o-mini",
+) -> CompactedTranscript:
+    """
+    Cleans the transcript and, while it is still over `budget` tokens, maps
+    `summarize(chunk, part, parts)` over ~SOAP_SUMMARY_CHUNK_TOKENS chunks in
+    parallel and joins the summaries in order. The caller's final prompt is
+    the reduce step.
+    """
+    budget = budget or settings.SOAP_TRANSCRIPT_TOKEN_BUDGET
+    raw_tokens = count_tokens(text, model)
+    TRANSCRIPT_TOKENS.observe(raw_tokens, stage="raw")
+
+    with span("transcript.compact") as compact_span:
+        with stage_timer("transcript_clean"):
+            text = clean_transcript(text)
+        tokens = count_tokens(text, model)
+        TRANSCRIPT_TOKENS.observe(tokens, stage="cleaned")
+
+        rounds = 0
+        while tokens > budget and rounds < MAX_REDUCE_ROUNDS:
+            rounds += 1
+            chunks = split_into_chunks(text, settings.SOAP_SUMMARY_CHUNK_TOKENS, model)
+            with stage_timer("transcript_summarize"):
+                futures = [
+                    _summary_executor.submit(contextvars.copy_context().run, attributed(summarize), chunk, i + 1, len(chunks))
+                    for i, chunk in enumerate(chunks)
+                ]
+                text = "\n\n".join(future.result().strip() for future in futures)
+            tokens = count_tokens(text, model)
+        if tokens > budget:
+            logger.warning("Transcript still %d tokens after %d summarization rounds (budget %d)", tokens, rounds, budget)
+        if rounds:
+            TRANSCRIPT_TOKENS.observe(tokens, stage="summarized")
+
+        compact_span.set_attribute("transcript.raw_tokens", raw_tokens)
+        compact_span.set_attribute("transcript.tokens", tokens)
+        compact_span.set_attribute("transcript.reduce_rounds", rounds)
+    return CompactedTranscript(text=text, raw_tokens=raw_tokens, tokens=tokens, reduce_rounds=rounds)
@@ -1,33 +1,381 @@
+import multiprocessing
 import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+import torch
 import whisper
 #from openai import OpenAI  # Uncomment when using GPT-4o
 from app.core.config import settings
+from app.utils.logger import get_logger
+from app.utils.metrics import Counter, QUEUE_DEPTH, stage_timer
+from app.utils.tracing import span
+from app.services.whisper_batcher import WhisperBatchScheduler
+from app.services.model_selection import ModelSelectionError, english_model, select_model
+from app.services.vad_service import (
+    AudioChunk, CompactAudio, SpeechRegion, compact_speech, detect_speech, split_at_pauses
+)
+
+logger = get_logger(__name__)
+
+TRANSCRIPTIONS = Counter(
+    "scribe_transcriptions_total",
+    "Transcriptions by Whisper model and language hint (auto = detected)",
+    ["model", "language"],
+)
 
 # ============================================================
 # LOCAL WHISPER SETUP
 # ============================================================
-# Load a small Whisper model for fast dev/demo. Change to larger models for more accuracy.
-whisper_model = whisper.load_model("tiny")  # options: tiny, base, small, medium, large
+def configure_torch_threads(num_threads: int = 0) -> int:
+    """
+    Sets torch's intra-op thread count for this process. 0 splits the CPUs
+    evenly between WEB_CONCURRENCY workers so they do not oversubscribe cores.
+    """
+    if num_threads <= 0:
+        num_threads = max((os.cpu_count() or 1) // max(settings.WEB_CONCURRENCY, 1), 1)
+    torch.set_num_threads(num_threads)
+    return num_threads
+
+
+def quantize_linear_int8(model: whisper.Whisper) -> whisper.Whisper:
+    """
+    Dynamic int8 quantization of every Linear layer (weights int8, activations
+    quantized on the fly). Convolutions and the tied token-embedding projection
+    stay fp32.
+    """
+    # whisper.model.Linear only adds a dtype cast in forward(); quantize_dynamic
+    # matches exact types, so turn them back into plain nn.Linear first
+    for module in model.modules():
+        if type(module) is whisper.model.Linear:
+            module.__class__ = torch.nn.Linear
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+
+def load_whisper_model(name: str, cpu_profile: str = "default", compile_encoder: bool = False) -> whisper.Whisper:
+    """
+    cpu_profile "default" is the stock fp32 model; "int8" applies dynamic
+    int8 quantization of the Linear layers (CPU only).
+    """
+    model = whisper.load_model(name, device="cpu" if cpu_profile == "int8" else None)
+    if cpu_profile == "int8":
+        model = quantize_linear_int8(model)
+    if compile_encoder:
+        # The encoder always sees a fixed 30 s mel window, so it compiles once; the
+        # decoder's growing kv-cache shapes would keep recompiling
+        model.encoder = torch.compile(model.encoder)
+    return model.eval()
+
+
+if settings.TORCH_NUM_THREADS > 0:
+    configure_torch_threads(settings.TORCH_NUM_THREADS)
+
+# ============================================================
+# MODEL REGISTRY
+# ============================================================
+@dataclass
+class LoadedModel:
+    """A Whisper model with the lock (and, when batching, the scheduler) that serialises its use."""
+    name: str
+    model: whisper.Whisper
+    # Whisper installs per-call hooks on the model, so only one transcription may use it at a time
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    # With WHISPER_BATCH_SIZE > 1, concurrent requests share batched decoder passes
+    scheduler: Optional[WhisperBatchScheduler] = None
+
+
+_models: Dict[str, LoadedModel] = {}
+_models_lock = threading.Lock()
+
+
+def get_model(name: Optional[str] = None) -> LoadedModel:
+    """Loads each model once per process on first use and keeps it."""
+    name = name or settings.WHISPER_MODEL
+    loaded = _models.get(name)
+    if loaded is not None:
+        return loaded
+    with _models_lock:
+        if name not in _models:
+            logger.info("Loading Whisper model %s", name)
+            model = load_whisper_model(
+                name, cpu_profile=settings.WHISPER_CPU_PROFILE, compile_encoder=settings.WHISPER_TORCH_COMPILE
+            )
+            loaded = LoadedModel(name=name, model=model)
+            if settings.WHISPER_BATCH_SIZE > 1:
+                loaded.scheduler = WhisperBatchScheduler(
+                    model,
+                    loaded.lock,
+                    settings.WHISPER_BATCH_SIZE,
+                    settings.WHISPER_BATCH_WAIT_MS,
+                    settings.WHISPER_BATCH_WINDOW_TIMEOUT_SECONDS,
+                )
+            _models[name] = loaded
+        return _models[name]
+
+
+# Load the default and English fast-path models up front, so gunicorn workers share
+# their weights copy-on-write. Change WHISPER_MODEL to larger models for more accuracy.
+get_model(settings.WHISPER_MODEL)  # options: tiny, base, small, medium, large
+if english_model():
+    get_model(english_model())
+
+if settings.WHISPER_BATCH_SIZE > 1:
+    QUEUE_DEPTH.set_function(
+        lambda: sum(m.scheduler.pending for m in list(_models.values()) if m.scheduler), queue="whisper_batch"
+    )
+
+
+def _run_whisper(audio, word_timestamps: bool = False, model_name: Optional[str] = None, language: Optional[str] = None) -> dict:
+    loaded = get_model(model_name)
+    # Word alignment needs the model's cross-attention per sequence, so it takes the sequential path
+    if loaded.scheduler is not None and not word_timestamps:
+        return loaded.scheduler.transcribe(audio, language)
+    
+    with QUEUE_DEPTH.track_inprogress(queue="transcription"):
+        loaded.lock.acquire()
+    try:
+        # fp16 is GPU-only; say so explicitly instead of relying on Whisper's fallback warning.
+        # A known language skips Whisper's detection pass over the first window.
+        return loaded.model.transcribe(
+            audio,
+            fp16=loaded.model.device.type != "cpu",
+            word_timestamps=word_timestamps,
+            language=language,
+        )
+    finally:
+        loaded.lock.release()
+
+
+def _remap_timestamps(result: dict, compact: CompactAudio) -> dict:
+    for segment in result.get("segments", []):
+        segment["start"] = compact.to_original(segment["start"])
+        segment["end"] = compact.to_original(segment["end"])
+        for word in segment.get("words") or []:
+            word["start"] = compact.to_original(word["start"])
+            word["end"] = compact.to_original(word["end"])
+    return result
+
+
+def _transcribe_speech_only(
+    audio,
+    word_timestamps: bool = False,
+    model_name: Optional[str] = None,
+    language: Optional[str] = None,
+    regions: Optional[List[SpeechRegion]] = None,
+) -> dict:
+    """
+    Runs Whisper over the detected speech only, so compute follows the amount
+    of talking rather than the length of the recording, and silent stretches
+    cannot produce hallucinated segments. Timestamps refer to the original audio.
+    `regions` skips detection when the caller already ran it on a longer recording.
+    """
+    with span("vad.detect") as vad_span, stage_timer("vad"):
+        if regions is None:
+            regions = detect_speech(audio)
+        compact = compact_speech(audio, regions)
+        vad_span.set_attribute("audio.seconds", len(audio) / whisper.audio.SAMPLE_RATE)
+        vad_span.set_attribute("audio.speech_seconds", sum(r.seconds for r in regions))
+    if not regions:
+        return {"text": "", "segments": [], "language": language}
+    
+    with span("whisper.transcribe", attributes={"audio.seconds": len(compact.audio) / whisper.audio.SAMPLE_RATE}), stage_timer("whisper_inference"):
+        result = _run_whisper(compact.audio, word_timestamps, model_name, language)
+    return _remap_timestamps(result, compact)
+
+
+# ============================================================
+# PARALLEL LONG-AUDIO TRANSCRIPTION
+# ============================================================
+# Long recordings are cut at pauses and the chunks transcribed by a pool of
+# spawned processes. They start from a fresh interpreter rather than a fork of
+# this threaded worker, whose locks (metrics, logging, trace export) could be
+# held mid-fork, so each child loads its own copy of the Whisper weights.
+_chunk_pool: Optional[ProcessPoolExecutor] = None
+_chunk_pool_lock = threading.Lock()
+
+
+def _init_chunk_worker(num_threads: int) -> None:
+    # Importing this module (to unpickle the initializer) already loaded the models
+    configure_torch_threads(num_threads)
+
+
+def _chunk_regions(regions: List[SpeechRegion], chunk: AudioChunk) -> List[SpeechRegion]:
+    """The recording's speech regions clipped to `chunk`, relative to its start."""
+    return [
+        SpeechRegion(max(r.start, chunk.start) - chunk.start, min(r.end, chunk.end) - chunk.start)
+        for r in regions
+        if r.end > chunk.start and r.start < chunk.end
+    ]
+
+
+def _transcribe_chunk(
+    samples,
+    word_timestamps: bool = False,
+    model_name: Optional[str] = None,
+    language: Optional[str] = None,
+    regions: Optional[List[SpeechRegion]] = None,
+) -> dict:
+    if settings.VAD_ENABLED:
+        # Regions come from the whole recording: a chunk cut between pauses is
+        # nearly all speech and has no noise floor of its own to measure
+        return _transcribe_speech_only(samples, word_timestamps, model_name, language, regions)
+    return _run_whisper(samples, word_timestamps, model_name, language)
+
+
+def _get_chunk_pool() -> ProcessPoolExecutor:
+    global _chunk_pool
+    with _chunk_pool_lock:
+        if _chunk_pool is not None:
+            return _chunk_pool
+        processes = settings.TRANSCRIBE_PARALLEL_PROCESSES
+        _chunk_pool = ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_chunk_worker,
+            initargs=(max((os.cpu_count() or 1) // processes, 1),),
+        )
+        return _chunk_pool
+
+
+def _reset_chunk_pool() -> None:
+    global _chunk_pool
+    with _chunk_pool_lock:
+        if _chunk_pool is not None:
+            # shutdown() leaves a stuck child running; stop the children explicitly
+            processes = list((_chunk_pool._processes or {}).values())
+            _chunk_pool.shutdown(wait=False, cancel_futures=True)
+            for process in processes:
+                process.terminate()
+        _chunk_pool = None
 
-def transcribe_audio_local(file_path: str) -> dict:
+
+def _merge_chunks(chunks: List[AudioChunk], results: List[dict]) -> dict:
+    """Shifts chunk-relative timestamps onto the recording and drops the overlap each chunk does not own."""
+    sample_rate = whisper.audio.SAMPLE_RATE
+    segments = []
+    for chunk, result in zip(chunks, results):
+        offset = chunk.start / sample_rate
+        keep_start, keep_end = chunk.keep_start / sample_rate, chunk.keep_end / sample_rate
+        for segment in result.get("segments", []):
+            segment["start"] += offset
+            segment["end"] += offset
+            for word in segment.get("words") or []:
+                word["start"] += offset
+                word["end"] += offset
+            if keep_start <= (segment["start"] + segment["end"]) / 2 < keep_end:
+                segments.append(segment)
+    languages = [r.get("language") for r in results if r.get("language")]
+    return {
+        "text": "".join(segment["text"] for segment in segments),
+        "segments": segments,
+        "language": max(set(languages), key=languages.count) if languages else None,
+    }
+
+
+def _transcribe_parallel(audio, word_timestamps: bool = False, model_name: Optional[str] = None, language: Optional[str] = None) -> dict:
+    with span("vad.split") as split_span:
+        regions = detect_speech(audio)
+        chunks = split_at_pauses(regions, len(audio), settings.TRANSCRIBE_CHUNK_SECONDS)
+        split_span.set_attribute("transcription.chunks", len(chunks))
+    
+    with span("whisper.transcribe_parallel", attributes={"audio.seconds": len(audio) / whisper.audio.SAMPLE_RATE}), stage_timer("whisper_inference"):
+        try:
+            pool = _get_chunk_pool()
+            futures = [
+                pool.submit(
+                    _transcribe_chunk, audio[chunk.start:chunk.end], word_timestamps, model_name, language,
+                    _chunk_regions(regions, chunk),
+                )
+                for chunk in chunks
+            ]
+            # Chunks run side by side, so each wait is bounded by one chunk's budget
+            results = [future.result(timeout=settings.TRANSCRIBE_CHUNK_TIMEOUT_SECONDS) for future in futures]
+        except (BrokenProcessPool, FutureTimeout):
+            # A child died (e.g. OOM-killed) or hung; start a fresh pool for the next request
+            _reset_chunk_pool()
+            raise
+    return _merge_chunks(chunks, results)
+
+
+def _use_parallel(audio) -> bool:
+    return (
+        settings.TRANSCRIBE_PARALLEL_PROCESSES > 1
+        and len(audio) >= settings.TRANSCRIBE_PARALLEL_MIN_SECONDS * whisper.audio.SAMPLE_RATE
+    )
+
+
+def _columnar(segments: List[dict], word_timestamps: bool) -> dict:
+    """
+    Segments (and words) as parallel arrays instead of a list of objects:
+    much smaller JSON, and easy to filter or seek by index on the client.
+    """
+    columns = {
+        "start": [round(s["start"], 2) for s in segments],
+        "end": [round(s["end"], 2) for s in segments],
+        "text": [s["text"].strip() for s in segments],
+        "avg_logprob": [round(s.get("avg_logprob", 0.0), 3) for s in segments],
+        "no_speech_prob": [round(s.get("no_speech_prob", 0.0), 3) for s in segments],
+    }
+    words = None
+    if word_timestamps:
+        words = {"segment": [], "start": [], "end": [], "word": [], "probability": []}
+        for index, segment in enumerate(segments):
+            for word in segment.get("words") or []:
+                words["segment"].append(index)
+                words["start"].append(round(word["start"], 2))
+                words["end"].append(round(word["end"], 2))
+                words["word"].append(word["word"])
+                words["probability"].append(round(word.get("probability", 0.0), 3))
+    return {"segments": columns, "words": words}
+
+
+def transcribe_audio_local(
+    file_path: str,
+    word_timestamps: bool = False,
+    language: Optional[str] = None,
+    model: Optional[str] = None,
+) -> dict:
     """
     Transcribes audio using local Whisper model.
+    Returns text, language, duration (seconds), the Whisper model used and
+    columnar segments; with word_timestamps also per-word timings.
+    language (ISO code) skips detection; model None lets select_model() pick
+    by language and duration.
     """
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"Audio file not found: {file_path}")
     
     try:
-        result = whisper_model.transcribe(file_path)
+        # ffmpeg decode + resample to 16 kHz mono
+        with span("whisper.decode"), stage_timer("whisper_decode"):
+            audio = whisper.load_audio(file_path)
         
-        print(f"Whisper transcription result: {result}")  # Debug log
+        duration = len(audio) / whisper.audio.SAMPLE_RATE
+        model, language = select_model(language, model, duration)
+        TRANSCRIPTIONS.inc(model=model, language=language or "auto")
+        
+        if _use_parallel(audio):
+            result = _transcribe_parallel(audio, word_timestamps, model, language)
+        elif settings.VAD_ENABLED:
+            result = _transcribe_speech_only(audio, word_timestamps, model, language)
+        else:
+            with span("whisper.transcribe", attributes={"audio.seconds": duration}), stage_timer("whisper_inference"):
+                result = _run_whisper(audio, word_timestamps, model, language)
+        logger.debug("Whisper transcription result: %s", result)
         
         return {
             "text": result["text"],
-            "language": result.get("language")
+            "language": result.get("language") or language,
+            "duration": round(duration, 2),
+            "model": model,
+            **_columnar(result.get("segments", []), word_timestamps)
         }
-        
-        
-        
+    except ModelSelectionError:
+        # Bad language/model combination: the caller's fault, not a transcription failure
+        raise
     except Exception as e:
         raise RuntimeError(f"Whisper transcription failed: {str(e)}")
 
@@ -65,10 +413,15 @@ def transcribe_audio_openai(file_path: str) -> dict:
 # ============================================================
 # WRAPPER FUNCTION (USED BY ROUTER)
 # ============================================================
-def transcribe_audio_from_url(audio_path: str) -> dict:
+def transcribe_audio_from_url(
+    audio_path: str,
+    word_timestamps: bool = False,
+    language: Optional[str] = None,
+    model: Optional[str] = None,
+) -> dict:
     """
     Currently uses local Whisper for dev/demo.
     To use OpenAI GPT-4o, replace the return call with transcribe_audio_openai(audio_path)
     """
-    return transcribe_audio_local(audio_path)
+    return transcribe_audio_local(audio_path, word_timestamps, language, model)
     # return transcribe_audio_openai(audio_path)  # Uncomment for production
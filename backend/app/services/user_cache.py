@@ -0,0 +1,137 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from app.core.config import settings
+from app.models.user import User
+from app.utils.metrics import Counter
+
+USER_CACHE_REQUESTS = Counter(
+    "scribe_user_cache_requests_total",
+    "User record cache lookups by result",
+    ["result"],
+)
+
+
+@dataclass(frozen=True)
+class CachedUser:
+    """Detached, read-only snapshot of a User row (safe to share across sessions and threads)."""
+    id: int
+    email: str
+    username: str
+    full_name: Optional[str]
+    role: str
+    is_active: int
+    created_at: Optional[datetime]
+    transcription_language: Optional[str] = None
+    whisper_model: Optional[str] = None
+
+    @classmethod
+    def from_model(cls, user: User) -> "CachedUser":
+        return cls(
+            id=user.id,
+            email=user.email,
+            username=user.username,
+            full_name=user.full_name,
+            role=user.role,
+            is_active=user.is_active,
+            created_at=user.created_at,
+            transcription_language=user.transcription_language,
+            whisper_model=user.whisper_model,
+        )
+
+
+class UserCache:
+    """Short-TTL LRU of user_id -> CachedUser, invalidated whenever a User row changes."""
+
+    def __init__(self, maxsize: int, ttl_seconds: float):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[int, Tuple[CachedUser, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> Optional[CachedUser]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                user, expires_at = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(user_id)
+                    USER_CACHE_REQUESTS.inc(result="hit")
+                    return user
+                del self._entries[user_id]
+        USER_CACHE_REQUESTS.inc(result="miss")
+        return None
+
+    def put(self, user: CachedUser) -> None:
+        with self._lock:
+            self._entries[user.id] = (user, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: Optional[int]) -> None:
+        if user_id is None:
+            return
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+user_cache = UserCache(settings.USER_CACHE_SIZE, settings.USER_CACHE_TTL_SECONDS)
+
+
+def load_user(db: Session, user_id: int) -> Optional[CachedUser]:
+    cached = user_cache.get(user_id)
+    if cached is not None:
+        return cached
+    return load_user_uncached(db, user_id)
+
+
+def load_user_uncached(db: Session, user_id: int) -> Optional[CachedUser]:
+    """Reads the row and caches it; for callers that already counted their cache miss."""
+    user = db.query(User).filter(User.id == user_id).first()
+    if user is None:
+        return None
+    cached = CachedUser.from_model(user)
+    user_cache.put(cached)
+    return cached
+
+
+# ============================================================
+# INVALIDATION
+# ============================================================
+# Drop the entry as soon as the change is flushed, and again after commit so a
+# concurrent request cannot re-cache the pre-commit row for a whole TTL.
+# Bulk query.update()/delete() on users bypasses these hooks; the TTL bounds that.
+_PENDING_KEY = "user_cache_invalidate"
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_user(mapper, connection, target):
+    user_cache.invalidate(target.id)
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_PENDING_KEY, set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    for user_id in session.info.pop(_PENDING_KEY, ()):
+        user_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session):
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,182 @@
+import bisect
+import math
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+import numpy as np
+from app.core.config import settings
+
+SAMPLE_RATE = 16000
+
+
+@dataclass(frozen=True)
+class SpeechRegion:
+    """A stretch of speech, in samples of the 16 kHz input."""
+    start: int
+    end: int
+
+    @property
+    def seconds(self) -> float:
+        return (self.end - self.start) / SAMPLE_RATE
+
+
+@dataclass
+class CompactAudio:
+    """
+    Speech regions concatenated back to back. `timeline` holds one
+    (compact_start, original_start, length) tuple in seconds per region so
+    timestamps from the compact audio can be mapped back to the recording.
+    """
+    audio: np.ndarray
+    timeline: List[Tuple[float, float, float]]
+
+    def __post_init__(self):
+        self._starts = [piece[0] for piece in self.timeline]
+
+    def to_original(self, t: float) -> float:
+        if not self.timeline:
+            return t
+        i = max(bisect.bisect_right(self._starts, t) - 1, 0)
+        compact_start, original_start, length = self.timeline[i]
+        # Times inside the inserted gap snap to the end of the preceding region
+        return original_start + min(max(t - compact_start, 0.0), length)
+
+
+def _frame_db(audio: np.ndarray, frame: int) -> np.ndarray:
+    n_frames = len(audio) // frame
+    if n_frames == 0:
+        return np.zeros(0, dtype=np.float32)
+    frames = audio[: n_frames * frame].reshape(n_frames, frame)
+    rms = np.sqrt(np.mean(frames.astype(np.float32) ** 2, axis=1))
+    return 20 * np.log10(np.maximum(rms, 1e-10))
+
+
+def detect_speech(
+    audio: np.ndarray,
+    frame_ms: int = 30,
+    threshold_db: Optional[float] = None,
+    min_speech_ms: int = 250,
+    min_silence_ms: Optional[int] = None,
+    pad_ms: int = 200,
+    silence_dbfs: Optional[float] = None,
+) -> List[SpeechRegion]:
+    """
+    Energy-based voice activity detection.
+
+    A frame counts as speech when its level is `threshold_db` above the
+    recording's noise floor (10th percentile frame level) and above
+    `silence_dbfs`. Pauses shorter than `min_silence_ms` are bridged, blips
+    shorter than `min_speech_ms` dropped, and every region is padded by
+    `pad_ms` so word onsets and tails survive.
+
+    Only a recording that never rises above `silence_dbfs` yields no regions.
+    When too few frames are quiet to measure a noise floor (continuous speech,
+    steady background noise) the whole recording is returned.
+    """
+    threshold_db = settings.VAD_THRESHOLD_DB if threshold_db is None else threshold_db
+    min_silence_ms = settings.VAD_MIN_SILENCE_MS if min_silence_ms is None else min_silence_ms
+    silence_dbfs = settings.VAD_SILENCE_DBFS if silence_dbfs is None else silence_dbfs
+
+    frame = SAMPLE_RATE * frame_ms // 1000
+    levels = _frame_db(audio, frame)
+    if levels.size == 0 or float(levels.max()) <= silence_dbfs:
+        return []
+    whole = [SpeechRegion(0, len(audio))]
+
+    noise_floor = float(np.percentile(levels, 10))
+    if float(np.percentile(levels, 90)) - noise_floor < threshold_db:
+        # The quietest frames are as loud as the rest: there are no pauses to cut
+        return whole
+    voiced = levels > max(noise_floor + threshold_db, silence_dbfs)
+
+    regions: List[List[int]] = []
+    for index in np.flatnonzero(voiced):
+        if regions and index - regions[-1][1] <= min_silence_ms // frame_ms:
+            regions[-1][1] = index + 1
+        else:
+            regions.append([index, index + 1])
+
+    pad = pad_ms // frame_ms
+    min_frames = max(min_speech_ms // frame_ms, 1)
+    merged: List[SpeechRegion] = []
+    for start, end in regions:
+        if end - start < min_frames:
+            continue
+        start = max(start - pad, 0) * frame
+        end = min((end + pad) * frame, len(audio))
+        if merged and start <= merged[-1].end:
+            merged[-1] = SpeechRegion(merged[-1].start, max(int(end), merged[-1].end))
+        else:
+            merged.append(SpeechRegion(int(start), int(end)))
+    # Audible but nothing long enough to count: let Whisper decide rather than drop it
+    return merged or whole
+
+
+def compact_speech(audio: np.ndarray, regions: List[SpeechRegion], gap_ms: int = 300) -> CompactAudio:
+    """
+    Concatenates the speech regions with a short silence between them, so the
+    model still sees a sentence boundary where a long pause was cut out.
+    """
+    gap = np.zeros(SAMPLE_RATE * gap_ms // 1000, dtype=audio.dtype)
+    pieces, timeline = [], []
+    position = 0
+    for region in regions:
+        if pieces:
+            pieces.append(gap)
+            position += len(gap)
+        pieces.append(audio[region.start:region.end])
+        timeline.append((position / SAMPLE_RATE, region.start / SAMPLE_RATE, region.seconds))
+        position += region.end - region.start
+    compact = np.concatenate(pieces) if pieces else np.zeros(0, dtype=audio.dtype)
+    return CompactAudio(audio=compact, timeline=timeline)
+
+
+@dataclass(frozen=True)
+class AudioChunk:
+    """
+    A slice [start, end) of the recording (samples). Segments whose midpoint
+    falls in [keep_start, keep_end) belong to this chunk; the rest is overlap
+    that a neighbouring chunk owns.
+    """
+    start: int
+    end: int
+    keep_start: int
+    keep_end: int
+
+
+def split_at_pauses(
+    regions: List[SpeechRegion],
+    total_samples: int,
+    target_seconds: float,
+    overlap_seconds: float = 1.0,
+) -> List[AudioChunk]:
+    """
+    Cuts the recording into chunks of roughly `target_seconds`, always in the
+    middle of a pause between speech regions. A stretch with no usable pause
+    longer than twice the target is cut evenly instead, with `overlap_seconds`
+    shared between neighbours so words on the cut are heard by both.
+    """
+    target = int(target_seconds * SAMPLE_RATE)
+    half_overlap = int(overlap_seconds * SAMPLE_RATE) // 2
+
+    cuts, last = [], 0
+    for previous, following in zip(regions, regions[1:]):
+        pause = (previous.end + following.start) // 2
+        if pause - last >= target and total_samples - pause >= target // 2:
+            cuts.append(pause)
+            last = pause
+
+    chunks: List[AudioChunk] = []
+    boundaries = [0] + cuts + [total_samples]
+    for a, b in zip(boundaries, boundaries[1:]):
+        if b - a <= 2 * target:
+            chunks.append(AudioChunk(a, b, a, b))
+            continue
+        pieces = math.ceil((b - a) / target)
+        step = (b - a) / pieces
+        for k in range(pieces):
+            keep_start = a + int(k * step)
+            keep_end = b if k == pieces - 1 else a + int((k + 1) * step)
+            chunks.append(AudioChunk(
+                max(keep_start - half_overlap, a), min(keep_end + half_overlap, b), keep_start, keep_end
+            ))
+    return chunks
@@ -0,0 +1,245 @@
+import queue
+import threading
+import time
+import zlib
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeout
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import torch
+import whisper
+from whisper.audio import N_FRAMES, HOP_LENGTH, SAMPLE_RATE
+from app.utils.logger import get_logger
+from app.utils.metrics import Histogram, stage_timer
+
+logger = get_logger(__name__)
+
+BATCH_SIZE = Histogram(
+    "scribe_whisper_batch_size",
+    "30-second windows decoded together per Whisper forward pass",
+    buckets=(1, 2, 4, 8, 16, 32),
+)
+
+# Same fallback policy as whisper.transcribe(): retry a window at a higher
+# temperature when the output looks like a repetition loop or is very unlikely
+TEMPERATURES = (0.0, 0.2, 0.4, 0.6, 0.8, 1.0)
+COMPRESSION_RATIO_THRESHOLD = 2.4
+LOGPROB_THRESHOLD = -1.0
+NO_SPEECH_THRESHOLD = 0.6
+TIME_PRECISION = 0.02  # seconds per timestamp token
+
+
+@dataclass
+class _WindowJob:
+    mel: torch.Tensor
+    language: Optional[str]
+    temperature: float
+    future: Future = field(default_factory=Future)
+    submitted: float = field(default_factory=time.monotonic)
+
+
+def _compression_ratio(text: str) -> float:
+    data = text.encode("utf-8")
+    return len(data) / len(zlib.compress(data)) if data else 0.0
+
+
+class WhisperBatchScheduler:
+    """
+    Micro-batches 30-second mel windows from concurrent transcriptions.
+
+    Each caller walks its own audio window by window (so Whisper's
+    timestamp-based seeking still works); a background thread collects the
+    windows of every in-flight request until `max_batch_size` are waiting or
+    the oldest has waited `max_wait_ms`, decodes them in one batched
+    encoder/decoder pass and hands each result back to its caller.
+    """
+
+    def __init__(
+        self,
+        model: whisper.Whisper,
+        lock: threading.Lock,
+        max_batch_size: int,
+        max_wait_ms: int,
+        window_timeout_s: float = 300.0,
+    ):
+        self.model = model
+        self.lock = lock
+        self.max_batch_size = max(max_batch_size, 1)
+        self.max_wait = max_wait_ms / 1000.0
+        self.window_timeout = window_timeout_s
+        self._tokenizer = whisper.tokenizer.get_tokenizer(
+            model.is_multilingual, num_languages=model.num_languages, task="transcribe"
+        )
+        self._queue: "queue.Queue[_WindowJob]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self.batches_decoded = 0
+        self.windows_decoded = 0
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def _ensure_started(self) -> None:
+        # Started lazily so forked workers get their own thread
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="whisper-batcher", daemon=True)
+                self._thread.start()
+
+    def submit(self, mel: torch.Tensor, language: Optional[str], temperature: float = 0.0) -> Future:
+        self._ensure_started()
+        job = _WindowJob(mel=mel, language=language, temperature=temperature)
+        self._queue.put(job)
+        return job.future
+
+    # ============================================================
+    # BATCH LOOP
+    # ============================================================
+    def _collect(self) -> List[_WindowJob]:
+        batch = [self._queue.get()]
+        deadline = batch[0].submitted + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        # Drops windows whose caller already gave up (cancelled after its timeout)
+        return [job for job in batch if job.future.set_running_or_notify_cancel()]
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            try:
+                # One DecodingOptions per forward pass, so group by what it fixes
+                groups: Dict[Tuple[Optional[str], float], List[_WindowJob]] = {}
+                for job in batch:
+                    groups.setdefault((job.language, job.temperature), []).append(job)
+                for (language, temperature), jobs in groups.items():
+                    self._decode(jobs, language, temperature)
+            except Exception as e:
+                # Keep the thread alive: a dead batcher would hang every later transcription
+                logger.exception("Whisper batch loop failed")
+                for job in batch:
+                    if not job.future.done():
+                        job.future.set_exception(e)
+
+    def _decode(self, jobs: List[_WindowJob], language: Optional[str], temperature: float) -> None:
+        options = whisper.DecodingOptions(
+            task="transcribe",
+            language=language,
+            temperature=temperature,
+            fp16=self.model.device.type != "cpu",
+        )
+        mels = torch.stack([job.mel for job in jobs]).to(self.model.device)
+        try:
+            BATCH_SIZE.observe(len(jobs))
+            with self.lock, stage_timer("whisper_batch_decode"):
+                results = whisper.decode(self.model, mels, options)
+        except Exception as e:
+            logger.exception("Batched Whisper decode failed")
+            for job in jobs:
+                job.future.set_exception(e)
+            return
+        self.batches_decoded += 1
+        self.windows_decoded += len(jobs)
+        for job, result in zip(jobs, results):
+            job.future.set_result(result)
+
+    # ============================================================
+    # PER-REQUEST WINDOW WALK
+    # ============================================================
+    def _decode_with_fallback(self, mel: torch.Tensor, language: Optional[str]):
+        result = None
+        for temperature in TEMPERATURES:
+            future = self.submit(mel, language, temperature)
+            try:
+                result = future.result(timeout=self.window_timeout)
+            except FutureTimeout:
+                future.cancel()
+                logger.error("Whisper window not decoded within %gs (%d waiting)", self.window_timeout, self.pending)
+                raise
+            if result.no_speech_prob > NO_SPEECH_THRESHOLD and result.avg_logprob < LOGPROB_THRESHOLD:
+                return result
+            if (
+                _compression_ratio(result.text) <= COMPRESSION_RATIO_THRESHOLD
+                and result.avg_logprob >= LOGPROB_THRESHOLD
+            ):
+                return result
+        return result
+
+    def _split_segments(self, tokens: List[int], offset: float, window_seconds: float) -> Tuple[List[dict], float]:
+        """
+        Turns `<|t0|> text <|t1|>` token runs into segments. Returns them with
+        how far (seconds) the window was consumed: up to the last closed
+        segment when trailing text was cut off by the window edge, else all of it.
+        """
+        tokenizer = self._tokenizer
+        timestamp_begin = tokenizer.timestamp_begin
+        segments, text_tokens = [], []
+        start = None
+        last_end = 0.0
+        for token in tokens:
+            if token >= timestamp_begin:
+                position = (token - timestamp_begin) * TIME_PRECISION
+                if start is None:
+                    start = position
+                else:
+                    if text_tokens:
+                        segments.append({
+                            "start": offset + start,
+                            "end": offset + position,
+                            "text": tokenizer.decode(text_tokens),
+                        })
+                        last_end = position
+                    start, text_tokens = None, []
+            elif token < tokenizer.eot:
+                text_tokens.append(token)
+
+        if text_tokens:
+            if last_end > 0:
+                # Unfinished segment at the window edge: re-decode it from the next window
+                return segments, last_end
+            segments.append({
+                "start": offset + (start or 0.0),
+                "end": offset + window_seconds,
+                "text": tokenizer.decode(text_tokens),
+            })
+        return segments, window_seconds
+
+    def transcribe(self, audio: np.ndarray, language: Optional[str] = None) -> dict:
+        """Drop-in for whisper_model.transcribe(audio): {"text", "segments", "language"}."""
+        mel = whisper.log_mel_spectrogram(audio, self.model.dims.n_mels)
+        content_frames = mel.shape[-1]
+
+        segments: List[dict] = []
+        seek = 0
+        while seek < content_frames:
+            segment_frames = min(N_FRAMES, content_frames - seek)
+            window = whisper.pad_or_trim(mel[:, seek:seek + segment_frames], N_FRAMES)
+            result = self._decode_with_fallback(window, language)
+            # The first window detects the language; later windows reuse it so they batch together
+            language = language or result.language
+
+            offset = seek * HOP_LENGTH / SAMPLE_RATE
+            window_seconds = segment_frames * HOP_LENGTH / SAMPLE_RATE
+            if result.no_speech_prob > NO_SPEECH_THRESHOLD and result.avg_logprob < LOGPROB_THRESHOLD:
+                seek += segment_frames
+                continue
+
+            window_segments, consumed = self._split_segments(result.tokens, offset, window_seconds)
+            for segment in window_segments:
+                segment.update(avg_logprob=result.avg_logprob, no_speech_prob=result.no_speech_prob)
+            segments.extend(window_segments)
+            advance = int(consumed * SAMPLE_RATE / HOP_LENGTH)
+            seek += advance if advance > 0 else segment_frames
+
+        return {
+            "text": "".join(segment["text"] for segment in segments),
+            "segments": segments,
+            "language": language,
+        }
@@ -1,23 +1,190 @@
+import atexit
+import contextvars
+import copy
+import json
 import logging
+import logging.handlers
+import queue
+import random
 import sys
-from datetime import datetime
+from datetime import datetime, timezone
+from typing import Dict, Optional
 
-def setup_logging():
-    logger = logging.getLogger("ai_medical_scribe")
-    logger.setLevel(logging.INFO)
-    
-    if not logger.handlers:
-        console_handler = logging.StreamHandler(sys.stdout)
-        console_handler.setLevel(logging.INFO)
-        
-        formatter = logging.Formatter(
+from app.core.config import settings
+from app.utils.metrics import LOG_RECORDS_DROPPED
+from app.utils.tracing import current_trace_ids
+
+ROOT_LOGGER_NAME = "ai_medical_scribe"
+ACCESS_LOGGER_NAME = f"{ROOT_LOGGER_NAME}.access"
+
+request_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has; anything else was passed through `extra=`
+_RESERVED_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_log_queue: Optional[queue.Queue] = None
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamps records with the current request and trace IDs (runs on the caller's thread)."""
+
+    def filter(self, record):
+        if not hasattr(record, "request_id"):
+            record.request_id = request_id_var.get()
+        if not hasattr(record, "trace_id"):
+            record.trace_id, record.span_id = current_trace_ids()
+        return True
+
+
+class AccessLogSampler(logging.Filter):
+    """Keeps a fraction of routine access records; errors and slow requests always pass."""
+
+    def __init__(self, rate: float, slow_ms: int):
+        super().__init__()
+        self.rate = rate
+        self.slow_ms = slow_ms
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        if getattr(record, "status", 0) >= 500 or getattr(record, "duration_ms", 0) >= self.slow_ms:
+            return True
+        return self.rate >= 1.0 or random.random() < self.rate
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and value is not None:
+                payload[key] = value
+        if record.exc_text:
+            payload["exc_info"] = record.exc_text
+        return json.dumps(payload, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__(
             '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
             datefmt='%Y-%m-%d %H:%M:%S'
         )
-        console_handler.setFormatter(formatter)
-        
-        logger.addHandler(console_handler)
-    
+
+    def format(self, record):
+        line = super().format(record)
+        context = [
+            f"{key}={getattr(record, key)}"
+            for key in ("request_id", "trace_id")
+            if getattr(record, key, None)
+        ]
+        return f"{line} [{' '.join(context)}]" if context else line
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to the background listener without ever blocking the request:
+    when the queue is full the record is dropped and counted in
+    scribe_log_records_dropped_total.
+    """
+
+    def prepare(self, record):
+        # Resolve the message and traceback here, where args and exc_info are still valid
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+
+def _parse_levels(spec: str) -> Dict[str, str]:
+    levels = {}
+    for item in spec.split(","):
+        if "=" in item:
+            name, level = item.split("=", 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging():
+    global _listener, _log_queue
+
+    logger = logging.getLogger(ROOT_LOGGER_NAME)
+    logger.setLevel(settings.LOG_LEVEL.upper())
+    logger.propagate = False
+
+    if not logger.handlers:
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setFormatter(JsonFormatter() if settings.LOG_FORMAT == "json" else TextFormatter())
+
+        _log_queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+        queue_handler = NonBlockingQueueHandler(_log_queue)
+        queue_handler.addFilter(RequestContextFilter())
+        logger.addHandler(queue_handler)
+
+        _listener = logging.handlers.QueueListener(_log_queue, console_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(stop_logging)
+
+        access_logger = logging.getLogger(ACCESS_LOGGER_NAME)
+        access_logger.addFilter(AccessLogSampler(settings.LOG_ACCESS_SAMPLE_RATE, settings.LOG_SLOW_REQUEST_MS))
+
+    for name, level in _parse_levels(settings.LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
+
     return logger
 
+
+def stop_logging():
+    """Flushes queued records; safe to call more than once."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def restart_logging_after_fork():
+    """
+    Gives a freshly forked worker its own queue and listener thread: the
+    parent's listener does not exist in the child, and the parent's queue lock
+    may have been held at the moment of the fork.
+    """
+    global _listener, _log_queue
+    if _listener is None:
+        return
+    handlers = _listener.handlers
+    _log_queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    for handler in logging.getLogger(ROOT_LOGGER_NAME).handlers:
+        if isinstance(handler, NonBlockingQueueHandler):
+            handler.queue = _log_queue
+    _listener = logging.handlers.QueueListener(_log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Returns a child of the app logger, e.g. "app.api.v1.ai" -> "ai_medical_scribe.api.v1.ai"."""
+    if name.startswith("app."):
+        name = name[len("app."):]
+    return logging.getLogger(f"{ROOT_LOGGER_NAME}.{name}")
+
+
+def log_queue_depth() -> int:
+    return _log_queue.qsize() if _log_queue is not None else 0
+
+
 logger = setup_logging()
+access_logger = logging.getLogger(ACCESS_LOGGER_NAME)
@@ -0,0 +1,267 @@
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from app.core.config import settings
+from app.core.shared_state import get_redis, register_sync, shared_state_enabled, worker_id
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+_REGISTRY: List["_Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric(ABC):
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _REGISTRY.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self._samples())
+        return lines
+
+    @abstractmethod
+    def _samples(self) -> List[str]:
+        ...
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._functions: Dict[Tuple[str, ...], Callable[[], float]] = {}
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, fn: Callable[[], float], **labels):
+        """Evaluate `fn` at scrape time instead of tracking the value eagerly."""
+        with self._lock:
+            self._functions[self._key(labels)] = fn
+
+    @contextmanager
+    def track_inprogress(self, **labels):
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def _samples(self):
+        with self._lock:
+            items = list(self._values.items())
+            functions = list(self._functions.items())
+        for key, fn in functions:
+            try:
+                items.append((key, float(fn())))
+            except Exception:
+                continue
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._counts: Dict[Tuple[str, ...], List[int]] = {}
+        self._sums: Dict[Tuple[str, ...], float] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * len(self.buckets)
+                self._sums[key] = 0.0
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._sums[key] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self):
+        lines = []
+        with self._lock:
+            items = [(k, list(c), self._sums[k]) for k, c in self._counts.items()]
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+def render_prometheus() -> str:
+    if shared_state_enabled():
+        return _render_all_workers()
+    lines = []
+    for metric in _REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ============================================================
+# MULTI-WORKER AGGREGATION
+# ============================================================
+# With STATE_BACKEND=redis every worker publishes its samples under its own key
+# (expiring shortly after the worker stops), and whichever worker serves the
+# scrape returns all of them, each series labelled worker="<host>:<pid>".
+_WORKER_KEY_PREFIX = "metrics:worker:"
+
+
+def _with_worker_label(line: str, worker: str) -> str:
+    head, _, value = line.rpartition(" ")
+    label = f'worker="{_escape(worker)}"'
+    head = head[:-1] + "," + label + "}" if head.endswith("}") else head + "{" + label + "}"
+    return f"{head} {value}"
+
+
+def publish_worker_metrics() -> None:
+    snapshot = [[m.name, m.documentation, m.type_name, m._samples()] for m in _REGISTRY]
+    get_redis().set(
+        _WORKER_KEY_PREFIX + worker_id(),
+        json.dumps(snapshot),
+        px=int(settings.STATE_SYNC_SECONDS * 3000),
+    )
+
+
+def _render_all_workers() -> str:
+    # Publish first so the scraping worker's own series are never a sync interval stale
+    publish_worker_metrics()
+    client = get_redis()
+    keys = sorted(client.scan_iter(match=_WORKER_KEY_PREFIX + "*"))
+    families: Dict[str, Tuple[str, str, List[str]]] = {}
+    for key, raw in zip(keys, client.mget(keys) if keys else []):
+        if raw is None:
+            continue
+        worker = key.decode()[len(_WORKER_KEY_PREFIX):]
+        for name, documentation, type_name, samples in json.loads(raw):
+            family = families.setdefault(name, (documentation, type_name, []))
+            family[2].extend(_with_worker_label(line, worker) for line in samples)
+    lines = []
+    for name, (documentation, type_name, samples) in families.items():
+        lines.append(f"# HELP {name} {documentation}")
+        lines.append(f"# TYPE {name} {type_name}")
+        lines.extend(samples)
+    return "\n".join(lines) + "\n"
+
+
+if shared_state_enabled():
+    register_sync(publish_worker_metrics)
+
+
+# ============================================================
+# APPLICATION METRICS
+# ============================================================
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template and status",
+    ["method", "route", "status"],
+)
+
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being served",
+)
+
+STAGE_LATENCY = Histogram(
+    "scribe_stage_duration_seconds",
+    "Latency of individual pipeline stages (whisper_decode, whisper_inference, llm_call, json_parse, reportlab_build, db_query)",
+    ["stage"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0),
+)
+
+QUEUE_DEPTH = Gauge(
+    "scribe_queue_depth",
+    "Work items waiting in internal queues",
+    ["queue"],
+)
+
+LOG_RECORDS_DROPPED = Counter(
+    "scribe_log_records_dropped_total",
+    "Log records discarded because the logging queue was full",
+)
+
+TRACE_SPANS_DROPPED = Counter(
+    "scribe_trace_spans_dropped_total",
+    "Finished spans never exported, by reason (buffer_full, export_failed)",
+    ["reason"],
+)
+
+
+def stage_timer(stage: str):
+    """Context manager recording the duration of a named pipeline stage."""
+    return STAGE_LATENCY.time(stage=stage)
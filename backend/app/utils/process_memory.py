@@ -0,0 +1,50 @@
+import os
+import resource
+import sys
+from typing import Dict, Union
+from app.utils.metrics import Gauge
+
+PROCESS_MEMORY = Gauge(
+    "scribe_process_memory_bytes",
+    "Memory of the worker process serving this scrape (pss/private exclude pages shared copy-on-write)",
+    ["kind"],
+)
+
+_SMAPS_FIELDS = {
+    "Rss": "rss",
+    "Pss": "pss",
+    "Shared_Clean": "shared",
+    "Shared_Dirty": "shared",
+    "Private_Clean": "private",
+    "Private_Dirty": "private",
+}
+
+
+def memory_usage(pid: Union[int, str] = "self") -> Dict[str, int]:
+    """
+    RSS, PSS, shared and private bytes for a process, from /proc/<pid>/smaps_rollup.
+    PSS splits shared pages between the processes mapping them, so summing it
+    over all workers gives the real footprint of a preforked server.
+    Falls back to peak RSS from getrusage where /proc is unavailable.
+    """
+    usage = {"rss": 0, "pss": 0, "shared": 0, "private": 0}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                name, _, rest = line.partition(":")
+                kind = _SMAPS_FIELDS.get(name)
+                if kind:
+                    usage[kind] += int(rest.split()[0]) * 1024
+        return usage
+    except (OSError, ValueError, IndexError):
+        if pid != "self" and pid != os.getpid():
+            raise
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    usage["rss"] = peak if sys.platform == "darwin" else peak * 1024
+    return usage
+
+
+def register_memory_metrics() -> None:
+    for kind in ("rss", "pss", "shared", "private"):
+        PROCESS_MEMORY.set_function(lambda kind=kind: memory_usage()[kind], kind=kind)
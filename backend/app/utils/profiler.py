@@ -0,0 +1,310 @@
+import asyncio
+import contextvars
+import functools
+import heapq
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Callable, Dict, List, Optional
+
+from fastapi.concurrency import run_in_threadpool as _run_in_threadpool
+from fastapi.routing import APIRoute
+
+from app.core.config import settings
+from app.core.shared_state import get_redis, register_sync, shared_state_enabled, worker_id
+
+# Server-generated key of the request the current context works for; copied into
+# every task and threadpool call made on its behalf
+_request_key: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("slow_request_key", default=None)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+def _folded_stack(frame, thread_name: str) -> str:
+    """Collapses a frame chain into flamegraph "folded" form: root;...;leaf."""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.append(thread_name)
+    return ";".join(reversed(labels))
+
+
+# Which request each thread is working for, recorded explicitly where work is handed
+# to it: pool threads while an attributed() call runs, the event loop per task
+_thread_requests: Dict[int, str] = {}
+_task_requests: Dict[asyncio.Task, str] = {}
+_loop_threads: Dict[int, asyncio.AbstractEventLoop] = {}
+
+
+def attributed(fn: Callable) -> Callable:
+    """
+    Wraps `fn` so the thread running it is attributed to the request of the
+    context it runs in (run_in_threadpool and copy_context().run both copy it).
+    """
+    if getattr(fn, "_request_attributed", False):
+        return fn
+
+    @functools.wraps(fn)
+    def run(*args, **kwargs):
+        key = _request_key.get()
+        if key is None:
+            return fn(*args, **kwargs)
+        ident = threading.get_ident()
+        outer = _thread_requests.get(ident)
+        _thread_requests[ident] = key
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            if outer is None:
+                _thread_requests.pop(ident, None)
+            else:
+                _thread_requests[ident] = outer
+
+    run._request_attributed = True
+    return run
+
+
+async def run_in_threadpool(func: Callable, *args, **kwargs):
+    """fastapi.concurrency.run_in_threadpool, attributing the pool thread to the calling request."""
+    return await _run_in_threadpool(attributed(func), *args, **kwargs)
+
+
+class AttributedRoute(APIRoute):
+    """APIRoute whose sync endpoints are attributed to their request in the threadpool."""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        if not asyncio.iscoroutinefunction(endpoint):
+            endpoint = attributed(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+
+def _task_factory(inner, loop, coro, **kwargs):
+    task = inner(loop, coro, **kwargs) if inner is not None else asyncio.Task(coro, loop=loop, **kwargs)
+    # Tasks inherit the context they are created in, and with it the request
+    context = kwargs.get("context")
+    key = context.get(_request_key) if context is not None else _request_key.get()
+    if key is not None:
+        _task_requests[task] = key
+        task.add_done_callback(_task_requests.pop)
+    return task
+
+
+def _attribute_loop_tasks() -> None:
+    loop = asyncio.get_running_loop()
+    ident = threading.get_ident()
+    if _loop_threads.get(ident) is not loop:
+        for stale in [i for i, other in _loop_threads.items() if other.is_closed()]:
+            del _loop_threads[stale]
+        loop.set_task_factory(functools.partial(_task_factory, loop.get_task_factory()))
+        _loop_threads[ident] = loop
+
+
+def _serving_request(ident: int) -> Optional[str]:
+    """The request key a thread is working for right now; None for idle threads and unrelated work."""
+    loop = _loop_threads.get(ident)
+    # Thread idents are reused once a thread exits, so a closed loop no longer owns its ident
+    if loop is not None and not loop.is_closed():
+        # The event loop works for whichever task it is stepping
+        task = asyncio.current_task(loop)
+        return _task_requests.get(task) if task is not None else None
+    return _thread_requests.get(ident)
+
+
+def sample_stacks() -> List[str]:
+    """Takes one stack sample of every other thread in the process."""
+    names = {t.ident: t.name for t in threading.enumerate()}
+    own = threading.get_ident()
+    stacks = []
+    for ident, frame in sys._current_frames().items():
+        if ident == own:
+            continue
+        stacks.append(_folded_stack(frame, names.get(ident, f"thread-{ident}")))
+    return stacks
+
+
+def folded_output(counts: Counter) -> str:
+    return "\n".join(f"{stack} {count}" for stack, count in counts.most_common()) + "\n"
+
+
+# ============================================================
+# ON-DEMAND SAMPLING PROFILER
+# ============================================================
+_profile_lock = threading.Lock()
+
+
+def run_sampling_profile(seconds: float, interval_ms: float) -> Optional[str]:
+    """
+    Samples every thread of this worker for `seconds` and returns folded
+    stacks (flamegraph.pl / speedscope / inferno compatible).
+    Returns None if another profile is already running.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        return None
+    try:
+        counts: Counter = Counter()
+        interval = interval_ms / 1000.0
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            counts.update(sample_stacks())
+            time.sleep(interval)
+        return folded_output(counts)
+    finally:
+        _profile_lock.release()
+
+
+# ============================================================
+# SLOW REQUEST CAPTURE
+# ============================================================
+class _InflightRequest:
+    __slots__ = ("key", "request_id", "method", "path", "started", "samples", "token", "task")
+
+    def __init__(self, key: str, request_id: str, method: str, path: str):
+        self.key = key
+        self.request_id = request_id
+        self.method = method
+        self.path = path
+        self.started = time.monotonic()
+        self.samples: Counter = Counter()
+
+
+class SlowRequestMonitor:
+    """
+    Watches in-flight requests from a background thread. Once a request runs
+    past the threshold, the threads currently serving it (the event loop while
+    it steps one of the request's tasks, pool threads while they run attributed
+    work for it) are sampled until it finishes; the slowest N
+    requests are kept for the admin API. With STATE_BACKEND=redis the list is
+    shared by all workers, so the admin API sees it whichever worker answers.
+    """
+
+    REDIS_KEY = "slow_requests"
+
+    def __init__(self, threshold_ms: int, keep: int, interval_ms: int, max_samples: int = 500):
+        self.threshold = threshold_ms / 1000.0
+        self.keep = keep
+        self.interval = interval_ms / 1000.0
+        self.max_samples = max_samples
+        self._inflight: Dict[str, _InflightRequest] = {}
+        self._slowest: List[tuple] = []
+        self._unpublished: List[dict] = []
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, request_id: str, method: str, path: str) -> str:
+        """
+        Starts tracking the request served in the current context. Returns the
+        key to pass to finish(); X-Request-ID is client supplied and only shown.
+        """
+        self._ensure_watchdog()
+        _attribute_loop_tasks()
+        key = uuid.uuid4().hex
+        record = _InflightRequest(key, request_id, method, path)
+        record.token = _request_key.set(key)
+        # The middleware's own task predates the key; tasks it creates from here on inherit it
+        record.task = asyncio.current_task()
+        _task_requests[record.task] = key
+        with self._lock:
+            self._inflight[key] = record
+        return key
+
+    def finish(self, key: str, status_code: int) -> None:
+        with self._lock:
+            record = self._inflight.pop(key, None)
+        if record is None:
+            return
+        _request_key.reset(record.token)
+        _task_requests.pop(record.task, None)
+        duration = time.monotonic() - record.started
+        if duration < self.threshold:
+            return
+
+        entry = {
+            "request_id": record.request_id,
+            "worker": worker_id(),
+            "method": record.method,
+            "path": record.path,
+            "status": status_code,
+            "duration_ms": round(duration * 1000, 1),
+            "captured_at": time.time(),
+            "sample_count": sum(record.samples.values()),
+            "folded_stacks": folded_output(record.samples) if record.samples else "",
+        }
+        with self._lock:
+            # Min-heap on duration keeps the N slowest; the counter breaks ties
+            item = (duration, time.monotonic_ns(), entry)
+            if len(self._slowest) < self.keep:
+                heapq.heappush(self._slowest, item)
+            elif duration > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, item)
+            if shared_state_enabled():
+                # Called on the event loop; the state-sync thread does the Redis write
+                self._unpublished.append(entry)
+
+    def publish(self) -> None:
+        with self._lock:
+            entries, self._unpublished = self._unpublished, []
+        if not entries:
+            return
+        client = get_redis()
+        client.zadd(self.REDIS_KEY, {json.dumps(entry): entry["duration_ms"] for entry in entries})
+        client.zremrangebyrank(self.REDIS_KEY, 0, -self.keep - 1)
+
+    def slowest(self) -> List[dict]:
+        if shared_state_enabled():
+            return [json.loads(raw) for raw in get_redis().zrevrange(self.REDIS_KEY, 0, self.keep - 1)]
+        with self._lock:
+            items = sorted(self._slowest, key=lambda item: item[0], reverse=True)
+        return [entry for _, _, entry in items]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._slowest = []
+            self._unpublished = []
+        if shared_state_enabled():
+            get_redis().delete(self.REDIS_KEY)
+
+    def _ensure_watchdog(self) -> None:
+        # Started lazily so each forked worker runs its own watchdog
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._watch, name="slow-request-watchdog", daemon=True)
+                self._thread.start()
+
+    def _watch(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            now = time.monotonic()
+            with self._lock:
+                slow = {
+                    key: r for key, r in self._inflight.items()
+                    if now - r.started >= self.threshold and sum(r.samples.values()) < self.max_samples
+                }
+            if not slow:
+                continue
+            names = {t.ident: t.name for t in threading.enumerate()}
+            own = threading.get_ident()
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                record = slow.get(_serving_request(ident))
+                if record is not None:
+                    record.samples[_folded_stack(frame, names.get(ident, f"thread-{ident}"))] += 1
+
+
+slow_request_monitor = SlowRequestMonitor(
+    threshold_ms=settings.SLOW_REQUEST_THRESHOLD_MS,
+    keep=settings.SLOW_REQUEST_KEEP,
+    interval_ms=settings.PROFILER_SAMPLE_INTERVAL_MS,
+)
+if shared_state_enabled():
+    register_sync(slow_request_monitor.publish)
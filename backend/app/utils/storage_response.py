@@ -0,0 +1,130 @@
+import re
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, Request, status
+from fastapi.responses import Response, StreamingResponse
+
+from app.services.storage_service import StorageBackend, StoredObject
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def parse_range_header(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parses a single-range "Range: bytes=..." header into inclusive (start, end).
+    Returns None when the header should be ignored (malformed or multi-range),
+    raises ValueError when the range cannot be satisfied.
+    """
+    match = _RANGE_RE.match(range_header.strip())
+    if not match:
+        return None
+
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if size == 0:
+        # No byte of an empty object can be addressed, suffix ranges included
+        raise ValueError("Range not satisfiable for an empty object")
+
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError("Empty suffix range")
+        return max(size - length, 0), size - 1
+
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError("Range not satisfiable")
+    return start, min(end, size - 1)
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in header.split(",")]
+    # If-None-Match uses weak comparison
+    return any(tag.removeprefix("W/") == etag.removeprefix("W/") for tag in candidates)
+
+
+def _not_modified(request: Request, stored: StoredObject) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, stored.etag)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(stored.last_modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def storage_response(
+    request: Request,
+    storage: StorageBackend,
+    key: str,
+    cache_control: Optional[str] = None,
+    filename: Optional[str] = None,
+    attachment: bool = False,
+) -> Response:
+    """
+    Serves a stored object with strong ETags, conditional GET and single
+    byte-range support so media players can seek without re-downloading.
+    `attachment` asks browsers to download `filename` rather than display it.
+    """
+    try:
+        stored = storage.stat(key)
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="File not found"
+        )
+
+    headers = {
+        "ETag": stored.etag,
+        "Last-Modified": formatdate(stored.last_modified, usegmt=True),
+        "Accept-Ranges": "bytes",
+    }
+    if cache_control:
+        headers["Cache-Control"] = cache_control
+    if filename:
+        disposition = "attachment" if attachment else "inline"
+        headers["Content-Disposition"] = f'{disposition}; filename="{filename}"'
+
+    if _not_modified(request, stored):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    byte_range = None
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    # If-Range requires a strong match; otherwise the full representation is sent
+    if range_header and (if_range is None or if_range.strip() == stored.etag):
+        try:
+            byte_range = parse_range_header(range_header, stored.size)
+        except ValueError:
+            return Response(
+                status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                headers={**headers, "Content-Range": f"bytes */{stored.size}"}
+            )
+
+    if byte_range is None:
+        headers["Content-Length"] = str(stored.size)
+        return StreamingResponse(
+            storage.stream(stored.key),
+            media_type=stored.content_type,
+            headers=headers
+        )
+
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{stored.size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        storage.stream(stored.key, start=start, end=end),
+        status_code=status.HTTP_206_PARTIAL_CONTENT,
+        media_type=stored.content_type,
+        headers=headers
+    )
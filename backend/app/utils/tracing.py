@@ -0,0 +1,260 @@
+import atexit
+import contextvars
+import json
+import os
+import queue
+import random
+import re
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.utils.metrics import TRACE_SPANS_DROPPED
+
+# OTLP span kinds
+KIND_INTERNAL = 1
+KIND_SERVER = 2
+KIND_CLIENT = 3
+
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+_TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """A single timed operation, shaped after the OpenTelemetry data model."""
+
+    def __init__(
+        self,
+        name: str,
+        trace_id: str,
+        parent_span_id: Optional[str] = None,
+        kind: int = KIND_INTERNAL,
+        sampled: bool = True,
+        attributes: Optional[Dict[str, Any]] = None,
+    ):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_span_id = parent_span_id
+        self.kind = kind
+        self.sampled = sampled
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.status_code = STATUS_OK
+        self.status_message = ""
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def record_exception(self, exc: BaseException) -> None:
+        self.status_code = STATUS_ERROR
+        self.status_message = f"{type(exc).__name__}: {exc}"
+
+    def end(self) -> None:
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        if self.sampled:
+            _exporter.submit(self)
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+
+def _parse_traceparent(header: Optional[str]) -> Optional[Tuple[str, str, bool]]:
+    if not header:
+        return None
+    match = _TRACEPARENT_RE.match(header.strip().lower())
+    if not match or match.group(1) == "0" * 32 or match.group(2) == "0" * 16:
+        return None
+    return match.group(1), match.group(2), int(match.group(3), 16) & 1 == 1
+
+
+def start_span(
+    name: str,
+    kind: int = KIND_INTERNAL,
+    attributes: Optional[Dict[str, Any]] = None,
+    traceparent: Optional[str] = None,
+) -> Span:
+    """
+    Starts a span without making it current; the caller must call `end()`.
+    The parent is the current span, or the remote parent from `traceparent`.
+    """
+    parent = _current_span.get()
+    if parent is not None:
+        return Span(name, parent.trace_id, parent.span_id, kind, parent.sampled, attributes)
+
+    remote = _parse_traceparent(traceparent)
+    if remote is not None:
+        trace_id, parent_id, sampled = remote
+        return Span(name, trace_id, parent_id, kind, sampled, attributes)
+
+    sampled = settings.TRACE_EXPORTER != "none" and random.random() < settings.TRACE_SAMPLE_RATIO
+    return Span(name, os.urandom(16).hex(), None, kind, sampled, attributes)
+
+
+@contextmanager
+def span(name: str, kind: int = KIND_INTERNAL, attributes: Optional[Dict[str, Any]] = None, traceparent: Optional[str] = None):
+    """Runs the block inside a new current span, marking it as failed on exceptions."""
+    current = start_span(name, kind, attributes, traceparent)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.record_exception(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        current.end()
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def current_trace_ids() -> Tuple[Optional[str], Optional[str]]:
+    current = _current_span.get()
+    if current is None:
+        return None, None
+    return current.trace_id, current.span_id
+
+
+# ============================================================
+# OTLP/JSON EXPORT
+# ============================================================
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_span(s: Span) -> Dict[str, Any]:
+    data = {
+        "traceId": s.trace_id,
+        "spanId": s.span_id,
+        "name": s.name,
+        "kind": s.kind,
+        "startTimeUnixNano": str(s.start_ns),
+        "endTimeUnixNano": str(s.end_ns),
+        "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in s.attributes.items()],
+        "status": {"code": s.status_code, "message": s.status_message} if s.status_message else {"code": s.status_code},
+    }
+    if s.parent_span_id:
+        data["parentSpanId"] = s.parent_span_id
+    return data
+
+
+def otlp_payload(spans: List[Span]) -> Dict[str, Any]:
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [
+                {"key": "service.name", "value": {"stringValue": settings.OTEL_SERVICE_NAME}},
+                {"key": "service.version", "value": {"stringValue": settings.APP_VERSION}},
+            ]},
+            "scopeSpans": [{
+                "scope": {"name": "ai_medical_scribe"},
+                "spans": [_otlp_span(s) for s in spans],
+            }],
+        }]
+    }
+
+
+class _BatchExporter:
+    """
+    Ships finished spans from a background thread so request threads never
+    wait on disk or the network. Spans are dropped when the buffer is full
+    or an export fails, and counted in scribe_trace_spans_dropped_total.
+    """
+
+    def __init__(self, max_queue: int = 4096, max_batch: int = 512, interval: float = 1.0):
+        self.queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self.max_batch = max_batch
+        self.interval = interval
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def submit(self, s: Span) -> None:
+        if settings.TRACE_EXPORTER == "none":
+            return
+        self._ensure_started()
+        try:
+            self.queue.put_nowait(s)
+        except queue.Full:
+            TRACE_SPANS_DROPPED.inc(reason="buffer_full")
+
+    def _ensure_started(self) -> None:
+        # Started lazily so forked workers get their own thread
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = self._drain(block=True)
+            if batch:
+                self._export(batch)
+
+    def _drain(self, block: bool) -> List[Span]:
+        batch = []
+        deadline = time.monotonic() + self.interval
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            if not block or timeout <= 0:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+                continue
+            try:
+                batch.append(self.queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _export(self, batch: List[Span]) -> None:
+        try:
+            payload = otlp_payload(batch)
+            if settings.TRACE_EXPORTER == "file":
+                with open(settings.TRACE_EXPORT_PATH, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(payload) + "\n")
+            elif settings.TRACE_EXPORTER == "otlp":
+                request = urllib.request.Request(
+                    settings.OTEL_EXPORTER_OTLP_ENDPOINT.rstrip("/") + "/v1/traces",
+                    data=json.dumps(payload).encode(),
+                    headers={"Content-Type": "application/json"},
+                    method="POST",
+                )
+                urllib.request.urlopen(request, timeout=5).close()
+        except Exception:
+            # Tracing must never take the service down; the batch is lost
+            TRACE_SPANS_DROPPED.inc(len(batch), reason="export_failed")
+
+    def flush(self) -> None:
+        batch = self._drain(block=False)
+        while batch:
+            self._export(batch)
+            batch = self._drain(block=False)
+
+
+_exporter = _BatchExporter()
+atexit.register(_exporter.flush)
+
+
+def flush_traces() -> None:
+    _exporter.flush()
@@ -0,0 +1,86 @@
+"""
+Diff two benchmark result files (load test or microbenchmarks) and flag regressions.
+
+    python -m benchmarks.compare benchmarks/results/old.json benchmarks/results/new.json --threshold 10
+
+Exits with status 1 when any stage percentile or the throughput regressed by
+more than the threshold (percent).
+"""
+import argparse
+import json
+import sys
+
+from benchmarks.runner import compare_to_baseline
+
+PERCENTILES = ("p50", "p95", "p99")
+
+
+def _change(old: float, new: float) -> float:
+    return (new - old) / old * 100.0 if old else 0.0
+
+
+def compare_load_tests(old: dict, new: dict, threshold: float) -> bool:
+    regressed = False
+    print(f"old: {old['environment']['git_revision']} {old.get('label', '')}  "
+          f"new: {new['environment']['git_revision']} {new.get('label', '')}\n")
+
+    throughput = _change(old["workflows_per_second"], new["workflows_per_second"])
+    flag = " REGRESSION" if throughput < -threshold else ""
+    regressed |= bool(flag)
+    print(f"workflows/s: {old['workflows_per_second']:.3f} -> {new['workflows_per_second']:.3f} ({throughput:+.1f}%){flag}\n")
+
+    print(f"{'stage':<18}" + "".join(f"{p + ' old':>11}{p + ' new':>11}{'Δ%':>8}" for p in PERCENTILES))
+    for stage, new_stats in new["stages"].items():
+        old_stats = old["stages"].get(stage, {})
+        if not old_stats.get("count") or not new_stats.get("count"):
+            continue
+        row = f"{stage:<18}"
+        stage_flag = ""
+        for p in PERCENTILES:
+            delta = _change(old_stats[p], new_stats[p])
+            if delta > threshold:
+                stage_flag = " REGRESSION"
+            row += f"{old_stats[p] * 1000:>11.1f}{new_stats[p] * 1000:>11.1f}{delta:>+8.1f}"
+        if new_stats.get("errors", 0) > old_stats.get("errors", 0):
+            stage_flag += f" (errors {old_stats.get('errors', 0)} -> {new_stats['errors']})"
+        regressed |= "REGRESSION" in stage_flag
+        print(row + stage_flag)
+    return regressed
+
+
+def compare_micro(old: dict, new: dict, threshold: float) -> bool:
+    rows = compare_to_baseline(new["benchmarks"], old["benchmarks"], threshold)
+    print(f"{'benchmark':<36}{'old µs':>12}{'new µs':>12}{'Δ%':>9}{'p-value':>10}  verdict")
+    for row in rows:
+        if row["verdict"] == "new":
+            continue
+        print(f"{row['name']:<36}{row['old_median'] * 1e6:>12.2f}{row['new_median'] * 1e6:>12.2f}"
+              f"{row['change_pct']:>+9.1f}{row['p_value']:>10.4f}  {row['verdict']}")
+    return any(row["verdict"] == "slower" for row in rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Allowed slowdown in percent")
+    args = parser.parse_args()
+
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    if old.get("kind") != new.get("kind"):
+        sys.exit(f"Cannot compare a {old.get('kind')} result with a {new.get('kind')} result")
+
+    if new.get("kind") == "micro":
+        regressed = compare_micro(old, new, args.threshold)
+    elif new.get("kind") != "load_test":
+        sys.exit(f"Comparing {new.get('kind')} results is not supported")
+    else:
+        regressed = compare_load_tests(old, new, args.threshold)
+    sys.exit(1 if regressed else 0)
+
+
+if __name__ == "__main__":
+    main()
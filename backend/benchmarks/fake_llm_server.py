@@ -0,0 +1,125 @@
+"""
+OpenAI-compatible stand-in for benchmarks and local testing.
+
+Serves POST /v1/chat/completions with canned SOAP / prescription JSON after a
+configurable delay, so load tests measure our pipeline rather than the
+upstream provider.
+
+    python -m benchmarks.fake_llm_server --port 8100 --latency-ms 800 --jitter-ms 200
+    OPENAI_BASE_URL=http://127.0.0.1:8100/v1 OPENAI_API_KEY=test uvicorn app.main:app
+"""
+import argparse
+import json
+import random
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SOAP_REPLY = {
+    "subjective": "Patient reports fever and sore throat for 3 days with mild headache.",
+    "objective": "No objective findings provided.",
+    "assessment": "Likely viral upper respiratory tract infection.",
+    "plan": "Rest, oral hydration, paracetamol as needed, return if symptoms worsen.",
+}
+
+PRESCRIPTION_REPLY = {
+    "medications": [
+        {
+            "name": "Paracetamol",
+            "dosage": "500 mg",
+            "frequency": "Every 6 hours as needed",
+            "duration": "3 days",
+            "instructions": "Take after food. Do not exceed 4 g per day.",
+        }
+    ],
+    "advice": ["Drink plenty of fluids.", "Get adequate rest."],
+    "follow_up": "Follow up in 3 days if fever persists.",
+}
+
+SUMMARY_REPLY = "Patient with 3 days of fever and sore throat; no red flags discussed."
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    latency_ms = 0.0
+    jitter_ms = 0.0
+    error_rate = 0.0
+    slow_rate = 0.0
+    slow_ms = 0.0
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+
+        delay = max(self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms), 0)
+        if random.random() < self.slow_rate:
+            delay += self.slow_ms
+        time.sleep(delay / 1000.0)
+
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            return self._reply(404, {"error": {"message": "Not found"}})
+        if random.random() < self.error_rate:
+            return self._reply(503, {"error": {"message": "Injected upstream failure"}})
+
+        prompt = " ".join(str(m.get("content", "")) for m in request.get("messages", [])).lower()
+        # The prescription prompt also mentions the SOAP assessment, so check it first
+        if "prescri" in prompt:
+            content = json.dumps(PRESCRIPTION_REPLY)
+        elif "soap" in prompt:
+            content = json.dumps(SOAP_REPLY)
+        else:
+            content = SUMMARY_REPLY
+
+        self._reply(200, {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "fake-model"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4,
+                      "total_tokens": (len(prompt) + len(content)) // 4},
+        })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency-ms", type=float, default=500.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 503")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="Fraction of requests delayed by --slow-ms extra")
+    parser.add_argument("--slow-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    FakeLLMHandler.latency_ms = args.latency_ms
+    FakeLLMHandler.jitter_ms = args.jitter_ms
+    FakeLLMHandler.error_rate = args.error_rate
+    FakeLLMHandler.slow_rate = args.slow_rate
+    FakeLLMHandler.slow_ms = args.slow_ms
+
+    server = ThreadingHTTPServer((args.host, args.port), FakeLLMHandler)
+    print(f"Fake LLM listening on http://{args.host}:{args.port}/v1 "
+          f"(latency {args.latency_ms}±{args.jitter_ms} ms, error rate {args.error_rate})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Tail latency and availability of the LLM gateway against a misbehaving upstream.
+
+    python -m benchmarks.llm_gateway --requests 200 --slow-rate 0.05 --slow-ms 3000
+    python -m benchmarks.llm_gateway --error-rate 0.2 --concurrency 8
+
+Starts benchmarks/fake_llm_server.py in-process with the given latency,
+tail (slow-rate/slow-ms) and injected 503 rate, then sends the same workload
+through a gateway without hedging and one with hedging, and reports success
+rate, p50/p95/p99 latency and how many hedges were launched and won.
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from http.server import ThreadingHTTPServer
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from app.core.config import settings  # noqa: E402
+from app.services.llm_gateway import LLM_HEDGES, LLMError, LLMGateway, _route  # noqa: E402
+from benchmarks.fake_llm_server import FakeLLMHandler  # noqa: E402
+from benchmarks.stats import environment_info, summarize  # noqa: E402
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def _messages(i: int):
+    # Distinct per request, so coalescing of identical calls does not hide upstream latency
+    return [{"role": "user", "content": f"Create the SOAP note in JSON for: fever for three days (#{i})."}]
+
+
+def _start_fake_server(args) -> str:
+    FakeLLMHandler.latency_ms = args.latency_ms
+    FakeLLMHandler.jitter_ms = args.jitter_ms
+    FakeLLMHandler.error_rate = args.error_rate
+    FakeLLMHandler.slow_rate = args.slow_rate
+    FakeLLMHandler.slow_ms = args.slow_ms
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeLLMHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def run(base_url: str, hedge: bool, args) -> dict:
+    settings.LLM_HEDGE_ENABLED = hedge
+    gateway = LLMGateway([_route("primary", "fake-model", base_url, "test")])
+    # Let the latency tracker see enough samples to know its p95
+    for i in range(25):
+        try:
+            gateway.chat(_messages(-1 - i))
+        except LLMError:
+            pass
+
+    launched = LLM_HEDGES.value(outcome="launched")
+    won = LLM_HEDGES.value(outcome="won")
+    latencies, failures = [], 0
+    lock = threading.Lock()
+
+    def one(i):
+        nonlocal failures
+        start = time.perf_counter()
+        try:
+            gateway.chat(_messages(i))
+        except LLMError:
+            with lock:
+                failures += 1
+            return
+        with lock:
+            latencies.append(time.perf_counter() - start)
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for future in [pool.submit(one, i) for i in range(args.requests)]:
+            future.result()
+    return {
+        "hedging": hedge,
+        "success_rate": len(latencies) / args.requests,
+        "latency": summarize(latencies),
+        "hedges_launched": LLM_HEDGES.value(outcome="launched") - launched,
+        "hedges_won": LLM_HEDGES.value(outcome="won") - won,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--slow-rate", type=float, default=0.05)
+    parser.add_argument("--slow-ms", type=float, default=3000.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--output-dir", default=RESULTS_DIR)
+    args = parser.parse_args()
+
+    base_url = _start_fake_server(args)
+    runs = [run(base_url, hedge, args) for hedge in (False, True)]
+
+    print(f"upstream: {args.latency_ms:.0f}±{args.jitter_ms:.0f} ms, {args.slow_rate:.0%} +{args.slow_ms:.0f} ms, "
+          f"{args.error_rate:.0%} errors; {args.requests} requests x{args.concurrency}\n")
+    print(f"{'hedging':<9}{'ok':>8}{'p50 s':>9}{'p95 s':>9}{'p99 s':>9}{'hedges':>9}{'won':>6}")
+    for r in runs:
+        latency = {pct: r["latency"].get(pct, 0.0) for pct in ("p50", "p95", "p99")}
+        print(f"{'on' if r['hedging'] else 'off':<9}{r['success_rate']:>8.1%}{latency['p50']:>9.3f}"
+              f"{latency['p95']:>9.3f}{latency['p99']:>9.3f}{r['hedges_launched']:>9.0f}{r['hedges_won']:>6.0f}")
+
+    payload = {
+        "kind": "llm_gateway",
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "environment": environment_info(),
+        "config": {k: v for k, v in vars(args).items() if k != "output_dir"},
+        "runs": runs,
+    }
+    os.makedirs(args.output_dir, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    path = os.path.join(args.output_dir, f"llm_gateway_{stamp}_{payload['environment']['git_revision']}.json")
+    with open(path, "w") as f:
+        json.dump(payload, f, indent=2)
+    print(f"\nSaved {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""
+End-to-end load test for the scribe workflow.
+
+Each virtual user repeatedly runs the full doctor flow against a running API:
+login -> search patients -> create visit -> transcribe -> SOAP -> prescription
+-> save visit -> prescription PDF, timing every stage.
+
+Run the API against local stand-ins so results only reflect our own code:
+
+    python -m benchmarks.fake_llm_server --latency-ms 800 &
+    OPENAI_BASE_URL=http://127.0.0.1:8100/v1 OPENAI_API_KEY=test WHISPER_MODEL=tiny \\
+        uvicorn app.main:app --port 8000 &
+    python -m benchmarks.load_test --users 8 --iterations 5
+
+Results are written to benchmarks/results/ and can be diffed with
+`python -m benchmarks.compare old.json new.json`.
+"""
+import argparse
+import asyncio
+import io
+import json
+import math
+import os
+import struct
+import time
+import uuid
+import wave
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks.stats import environment_info, summarize
+
+STAGES = [
+    "login", "search_patients", "create_visit", "transcribe",
+    "soap", "prescription", "save_visit", "prescription_pdf",
+]
+
+FALLBACK_TRANSCRIPT = (
+    "Doctor: What brings you in today? Patient: I have had a fever and a sore throat "
+    "for three days, and a mild headache. Doctor: Any cough or difficulty breathing? "
+    "Patient: No, just the throat and feeling tired."
+)
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def synthetic_wav(seconds: float = 10.0, sample_rate: int = 16000) -> bytes:
+    """Alternating tone bursts and silence; enough to exercise decode + inference."""
+    frames = bytearray()
+    for i in range(int(seconds * sample_rate)):
+        t = i / sample_rate
+        voiced = int(t * 2) % 2 == 0
+        sample = 0.3 * math.sin(2 * math.pi * 220 * t) if voiced else 0.0
+        frames += struct.pack("<h", int(sample * 32767))
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(bytes(frames))
+    return buffer.getvalue()
+
+
+class WorkflowRunner:
+    def __init__(self, client: httpx.AsyncClient, username: str, password: str, patient_name: str, audio: bytes, audio_name: str):
+        self.client = client
+        self.username = username
+        self.password = password
+        self.patient_name = patient_name
+        self.audio = audio
+        self.audio_name = audio_name
+        self.timings: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.completed = 0
+
+    async def _timed(self, stage: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.errors[stage] += 1
+            return None
+        elapsed = time.perf_counter() - start
+        if response.status_code >= 400:
+            self.errors[stage] += 1
+            return None
+        self.timings[stage].append(elapsed)
+        return response
+
+    async def run_once(self) -> None:
+        response = await self._timed("login", "POST", "/auth/login",
+                                     json={"username": self.username, "password": self.password})
+        if response is None:
+            return
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        response = await self._timed("search_patients", "GET", "/patients",
+                                     params={"search": self.patient_name[:5]}, headers=headers)
+        if response is None or not response.json():
+            return
+        patient_id = response.json()[0]["id"]
+
+        response = await self._timed("create_visit", "POST", "/visits",
+                                     json={"patient_id": patient_id}, headers=headers)
+        if response is None:
+            return
+        visit_id = response.json()["id"]
+
+        response = await self._timed("transcribe", "POST", "/ai/transcribe", headers=headers,
+                                     files={"audio": (self.audio_name, self.audio, "audio/wav")})
+        if response is None:
+            return
+        # Synthetic audio transcribes to (near) nothing; keep the LLM stages realistic
+        transcript = response.json().get("transcription", "").strip() or FALLBACK_TRANSCRIPT
+
+        response = await self._timed("soap", "POST", "/ai/soap", json={"transcription": transcript}, headers=headers)
+        if response is None:
+            return
+        soap = response.json()
+
+        response = await self._timed("prescription", "POST", "/ai/prescription",
+                                     json={"soap_assessment": soap.get("assessment", "")}, headers=headers)
+        if response is None:
+            return
+        prescription = response.json()
+
+        response = await self._timed("save_visit", "PUT", f"/visits/{visit_id}", headers=headers, json={
+            "transcription_text": transcript,
+            "soap_note": soap,
+            "prescription_text": prescription.get("prescription_text", ""),
+        })
+        if response is None:
+            return
+
+        response = await self._timed("prescription_pdf", "GET", f"/ai/prescription/{visit_id}/pdf", headers=headers)
+        if response is None:
+            return
+        self.completed += 1
+
+
+async def prepare(client: httpx.AsyncClient, username: str, password: str, patient_name: str) -> None:
+    await client.post("/auth/register", json={
+        "email": f"{username}@bench.local", "username": username,
+        "password": password, "full_name": "Benchmark Doctor", "role": "doctor",
+    })
+    response = await client.post("/auth/login", json={"username": username, "password": password})
+    response.raise_for_status()
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    existing = await client.get("/patients", params={"search": patient_name}, headers=headers)
+    existing.raise_for_status()
+    if not existing.json():
+        created = await client.post("/patients", json={"name": patient_name, "age": 42, "gender": "Female"}, headers=headers)
+        created.raise_for_status()
+
+
+async def run_load_test(args) -> dict:
+    if args.audio:
+        with open(args.audio, "rb") as f:
+            audio = f.read()
+        audio_name = os.path.basename(args.audio)
+    else:
+        audio = synthetic_wav(args.audio_seconds)
+        audio_name = "synthetic.wav"
+
+    username = args.username or f"bench_{uuid.uuid4().hex[:8]}"
+    password = "bench-password"
+    patient_name = "Benchmark Patient"
+    limits = httpx.Limits(max_connections=args.users * 2, max_keepalive_connections=args.users * 2)
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        await prepare(client, username, password, patient_name)
+
+        runners = [WorkflowRunner(client, username, password, patient_name, audio, audio_name) for _ in range(args.users)]
+
+        async def user_loop(runner: WorkflowRunner):
+            for _ in range(args.iterations):
+                await runner.run_once()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(user_loop(r) for r in runners))
+        wall = time.perf_counter() - started
+
+    timings: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    for runner in runners:
+        for stage, values in runner.timings.items():
+            timings[stage].extend(values)
+        for stage, count in runner.errors.items():
+            errors[stage] += count
+    completed = sum(r.completed for r in runners)
+    total_requests = sum(len(v) for v in timings.values())
+
+    return {
+        "kind": "load_test",
+        "label": args.label,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "environment": environment_info(),
+        "config": {
+            "base_url": args.base_url, "users": args.users, "iterations": args.iterations,
+            "audio": audio_name, "audio_bytes": len(audio),
+        },
+        "wall_seconds": wall,
+        "workflows_completed": completed,
+        "workflows_per_second": completed / wall if wall else 0.0,
+        "requests_per_second": total_requests / wall if wall else 0.0,
+        "stages": {
+            stage: {**summarize(timings.get(stage, [])), "errors": errors.get(stage, 0)}
+            for stage in STAGES
+        },
+    }
+
+
+def print_report(result: dict) -> None:
+    print(f"\nWorkflows: {result['workflows_completed']} in {result['wall_seconds']:.1f}s "
+          f"({result['workflows_per_second']:.2f}/s, {result['requests_per_second']:.2f} req/s)")
+    print(f"{'stage':<18}{'count':>7}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for stage, stats in result["stages"].items():
+        if not stats.get("count"):
+            print(f"{stage:<18}{0:>7}{stats['errors']:>8}")
+            continue
+        print(f"{stage:<18}{stats['count']:>7}{stats['errors']:>8}"
+              f"{stats['p50'] * 1000:>10.1f}{stats['p95'] * 1000:>10.1f}{stats['p99'] * 1000:>10.1f}")
+
+
+def save_result(result: dict, output_dir: str) -> str:
+    os.makedirs(output_dir, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    name = f"{result['kind']}_{stamp}_{result['environment']['git_revision']}.json"
+    path = os.path.join(output_dir, name)
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000/api/v1")
+    parser.add_argument("--users", type=int, default=4, help="Concurrent virtual users")
+    parser.add_argument("--iterations", type=int, default=5, help="Workflows per user")
+    parser.add_argument("--audio", help="Audio file to upload (default: synthetic WAV)")
+    parser.add_argument("--audio-seconds", type=float, default=10.0)
+    parser.add_argument("--username", help="Reuse an existing benchmark user")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--label", default="")
+    parser.add_argument("--output-dir", default=RESULTS_DIR)
+    args = parser.parse_args()
+
+    result = asyncio.run(run_load_test(args))
+    print_report(result)
+    print(f"\nSaved {save_result(result, args.output_dir)}")
+
+
+if __name__ == "__main__":
+    main()
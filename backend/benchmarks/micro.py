@@ -0,0 +1,240 @@
+"""
+Microbenchmarks for service-level hot functions.
+
+    python -m benchmarks.micro                                # run everything
+    python -m benchmarks.micro --filter pdf --samples 30      # subset
+    python -m benchmarks.micro --save-baseline                # store as baseline
+    python -m benchmarks.micro --compare                      # compare with baseline
+
+Each benchmark reports median/IQR per call, ops/s and a tracemalloc
+allocation report (peak and net new bytes/blocks for one call).
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+# Keep generated PDFs out of the real storage directory; must run before app imports
+os.environ.setdefault("STORAGE_BACKEND", "local")
+os.environ.setdefault("STORAGE_LOCAL_ROOT", tempfile.mkdtemp(prefix="scribe-bench-"))
+
+from benchmarks.runner import benchmark, registered, run_benchmark, compare_to_baseline  # noqa: E402
+from benchmarks.stats import environment_info  # noqa: E402
+from benchmarks.fake_llm_server import SOAP_REPLY, PRESCRIPTION_REPLY  # noqa: E402
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+DEFAULT_BASELINE = os.path.join(RESULTS_DIR, "micro_baseline.json")
+
+PATIENT_INFO = {"name": "Benchmark Patient", "age": 42, "gender": "Female", "phone": "555-0100"}
+
+
+def _medications(count: int):
+    return [
+        {
+            "name": f"Medication {i}",
+            "dosage": "500 mg",
+            "frequency": "Twice daily",
+            "duration": "5 days",
+            "instructions": "Take after food with a full glass of water.",
+        }
+        for i in range(count)
+    ]
+
+
+# ============================================================
+# PRESCRIPTION TEXT / PDF
+# ============================================================
+@benchmark("format_prescription_text", group="prescription")
+def _format_prescription_text():
+    from app.services.prescription_service import format_prescription_text
+    meds, advice = _medications(5), ["Drink plenty of fluids.", "Rest."]
+    return lambda: format_prescription_text(meds, advice, "Follow up in 3 days.")
+
+
+def _pdf_benchmark(count: int):
+    from app.services.pdf_service import generate_prescription_pdf
+    data = {"medications": _medications(count), "advice": ["Rest.", "Hydrate."], "follow_up": "In one week."}
+    return lambda: generate_prescription_pdf(1, PATIENT_INFO, data, {"full_name": "Jane Doe"})
+
+
+@benchmark("generate_prescription_pdf_1_med", group="pdf")
+def _pdf_1():
+    return _pdf_benchmark(1)
+
+
+@benchmark("generate_prescription_pdf_20_meds", group="pdf")
+def _pdf_20():
+    return _pdf_benchmark(20)
+
+
+# ============================================================
+# LLM OUTPUT PARSING
+# ============================================================
+@benchmark("json_loads_soap", group="llm_parse")
+def _json_soap():
+    raw = json.dumps(SOAP_REPLY)
+    return lambda: json.loads(raw)
+
+
+@benchmark("json_loads_prescription", group="llm_parse")
+def _json_prescription():
+    raw = json.dumps(PRESCRIPTION_REPLY)
+    return lambda: json.loads(raw)
+
+
+@benchmark("pydantic_validate_json_soap", group="llm_parse")
+def _pydantic_soap():
+    from app.schemas.ai import SOAPNote
+    raw = json.dumps(SOAP_REPLY)
+    return lambda: SOAPNote.model_validate_json(raw)
+
+
+@benchmark("parse_structured_fenced_prescription", group="llm_parse")
+def _parse_fenced_prescription():
+    from app.schemas.ai import PrescriptionDraft
+    from app.services.structured_output import parse_structured
+    # The unconstrained-model worst case: fences and chatter around the JSON
+    raw = f"Here is the prescription:\n```json\n{json.dumps(PRESCRIPTION_REPLY)}\n```\nStay well!"
+    return lambda: parse_structured(raw, PrescriptionDraft)
+
+
+# ============================================================
+# TRANSCRIPT COMPACTION
+# ============================================================
+CONSULT_TRANSCRIPT = (
+    "Um, so I I have had, uh, a fever for three days. The fever is worse at night. "
+    "The fever is worse at night. [BLANK_AUDIO] Any cough? Mm-hmm, a dry cough, er, mostly in the morning. "
+) * 200
+
+
+@benchmark("clean_transcript_long", group="compaction")
+def _clean_transcript():
+    from app.services.transcript_compaction import clean_transcript
+    return lambda: clean_transcript(CONSULT_TRANSCRIPT)
+
+
+@benchmark("count_tokens_long", group="compaction")
+def _count_tokens():
+    from app.services.transcript_compaction import count_tokens
+    count_tokens("warm-up")
+    return lambda: count_tokens(CONSULT_TRANSCRIPT)
+
+
+# ============================================================
+# AUTH
+# ============================================================
+@benchmark("verify_password", group="auth")
+def _verify_password():
+    from app.core.security import get_password_hash, verify_password
+    hashed = get_password_hash("correct horse battery staple")
+    return lambda: verify_password("correct horse battery staple", hashed)
+
+
+@benchmark("create_access_token", group="auth")
+def _create_token():
+    from app.core.security import create_access_token
+    claims = {"sub": "1", "user_id": 1, "username": "doctor", "role": "doctor"}
+    return lambda: create_access_token(claims)
+
+
+@benchmark("decode_token", group="auth")
+def _decode_token():
+    from app.core.security import create_access_token, decode_token
+    token = create_access_token({"sub": "1", "user_id": 1, "username": "doctor", "role": "doctor"})
+    return lambda: decode_token(token)
+
+
+# ============================================================
+# RESPONSE SERIALIZATION
+# ============================================================
+@benchmark("visit_response_list_500", group="serialization")
+def _visit_list():
+    from typing import List
+    from pydantic import TypeAdapter
+    from app.schemas.visit import VisitResponse
+
+    now = datetime.now(timezone.utc)
+    rows = [
+        SimpleNamespace(
+            id=i, patient_id=i % 50, transcription_text="Patient reports fever. " * 40,
+            soap_note=SOAP_REPLY, prescription_text="PRESCRIPTION\n" * 20,
+            audio_file_url=f"/api/v1/audio/files/{i}.webm", doctor_notes=None,
+            created_at=now, updated_at=None,
+        )
+        for i in range(500)
+    ]
+    adapter = TypeAdapter(List[VisitResponse])
+    # Same work FastAPI does for response_model=List[VisitResponse]: validate ORM rows, dump JSON
+    return lambda: adapter.dump_json(adapter.validate_python(rows, from_attributes=True))
+
+
+def _format_time(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("µs", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.0f} ns"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filter", help="Only run benchmarks whose name contains this string")
+    parser.add_argument("--samples", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--min-time", type=float, default=0.05, help="Minimum seconds per sample")
+    parser.add_argument("--save-baseline", nargs="?", const=DEFAULT_BASELINE, help="Write results as the baseline")
+    parser.add_argument("--compare", nargs="?", const=DEFAULT_BASELINE, help="Compare against a baseline file")
+    parser.add_argument("--threshold", type=float, default=5.0, help="Minimum median change (%%) to report")
+    parser.add_argument("--output-dir", default=RESULTS_DIR)
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'benchmark':<36}{'median':>12}{'iqr':>12}{'ops/s':>12}{'peak KiB':>11}{'alloc KiB':>11}{'blocks':>9}")
+    for bench in registered(args.filter):
+        result = run_benchmark(bench, args.samples, args.warmup, args.min_time)
+        results[bench.name] = result.to_dict()
+        print(f"{bench.name:<36}{_format_time(result.stats['median']):>12}{_format_time(result.stats['iqr']):>12}"
+              f"{result.stats['ops_per_second']:>12.1f}{result.peak_bytes / 1024:>11.1f}"
+              f"{result.allocated_bytes / 1024:>11.1f}{result.allocated_blocks:>9}")
+
+    payload = {
+        "kind": "micro",
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "environment": environment_info(),
+        "config": {"samples": args.samples, "warmup": args.warmup, "min_time": args.min_time},
+        "benchmarks": results,
+    }
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    path = os.path.join(args.output_dir, f"micro_{stamp}_{payload['environment']['git_revision']}.json")
+    with open(path, "w") as f:
+        json.dump(payload, f, indent=2)
+    print(f"\nSaved {path}")
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(payload, f, indent=2)
+        print(f"Baseline written to {args.save_baseline}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        rows = compare_to_baseline(results, baseline["benchmarks"], args.threshold)
+        print(f"\nvs baseline {baseline['environment']['git_revision']}:")
+        print(f"{'benchmark':<36}{'old':>12}{'new':>12}{'Δ%':>9}{'p-value':>10}  verdict")
+        slower = False
+        for row in rows:
+            if row["verdict"] == "new":
+                print(f"{row['name']:<36}{'':>12}{'':>12}{'':>9}{'':>10}  new")
+                continue
+            print(f"{row['name']:<36}{_format_time(row['old_median']):>12}{_format_time(row['new_median']):>12}"
+                  f"{row['change_pct']:>+9.1f}{row['p_value']:>10.4f}  {row['verdict']}")
+            slower |= row["verdict"] == "slower"
+        sys.exit(1 if slower else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+Small, dependency-free microbenchmark runner.
+
+- calibrates the inner loop so each sample runs for at least `min_sample_time`
+- runs warm-up rounds before measuring
+- records per-call timings for every sample plus a tracemalloc report
+- compares against a stored baseline with a Mann-Whitney U test
+"""
+import gc
+import math
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.stats import percentile
+
+_BENCHMARKS: Dict[str, "Benchmark"] = {}
+
+
+@dataclass
+class Benchmark:
+    name: str
+    setup: Callable[[], Callable[[], object]]
+    group: str = ""
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    group: str
+    loops: int
+    samples: List[float]
+    peak_bytes: int
+    allocated_bytes: int
+    allocated_blocks: int
+    stats: Dict[str, float] = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "group": self.group,
+            "loops": self.loops,
+            "samples": self.samples,
+            "stats": self.stats,
+            "memory": {
+                "peak_bytes": self.peak_bytes,
+                "allocated_bytes": self.allocated_bytes,
+                "allocated_blocks": self.allocated_blocks,
+            },
+        }
+
+
+def benchmark(name: str, group: str = ""):
+    """
+    Registers a benchmark. The decorated function does the (untimed) setup and
+    returns the zero-argument callable to measure.
+    """
+    def decorator(setup: Callable[[], Callable[[], object]]):
+        _BENCHMARKS[name] = Benchmark(name=name, setup=setup, group=group)
+        return setup
+    return decorator
+
+
+def registered(pattern: Optional[str] = None) -> List[Benchmark]:
+    return [b for name, b in _BENCHMARKS.items() if not pattern or pattern in name]
+
+
+def _calibrate(fn: Callable[[], object], min_sample_time: float) -> int:
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_sample_time or loops >= 1_000_000:
+            return loops
+        # Aim slightly past the target to avoid another calibration round
+        loops = max(loops * 2, int(loops * min_sample_time * 1.2 / max(elapsed, 1e-9)))
+
+
+def _measure_memory(fn: Callable[[], object]):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        result = fn()
+        after = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    stats = after.compare_to(before, "filename")
+    allocated = sum(max(s.size_diff, 0) for s in stats)
+    blocks = sum(max(s.count_diff, 0) for s in stats)
+    return peak, allocated, blocks
+
+
+def run_benchmark(bench: Benchmark, samples: int, warmup: int, min_sample_time: float) -> BenchmarkResult:
+    fn = bench.setup()
+    loops = _calibrate(fn, min_sample_time)
+
+    for _ in range(warmup):
+        for _ in range(loops):
+            fn()
+
+    timings = []
+    for _ in range(samples):
+        gc.collect()
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        timings.append((time.perf_counter() - start) / loops)
+
+    peak, allocated, blocks = _measure_memory(fn)
+
+    mean = sum(timings) / len(timings)
+    stdev = math.sqrt(sum((t - mean) ** 2 for t in timings) / (len(timings) - 1)) if len(timings) > 1 else 0.0
+    result = BenchmarkResult(
+        name=bench.name, group=bench.group, loops=loops, samples=timings,
+        peak_bytes=peak, allocated_bytes=allocated, allocated_blocks=blocks,
+    )
+    result.stats = {
+        "median": percentile(timings, 50),
+        "mean": mean,
+        "stdev": stdev,
+        "iqr": percentile(timings, 75) - percentile(timings, 25),
+        "min": min(timings),
+        "ops_per_second": 1.0 / percentile(timings, 50) if timings else 0.0,
+    }
+    return result
+
+
+# ============================================================
+# BASELINE COMPARISON
+# ============================================================
+def mann_whitney_u(a: List[float], b: List[float]) -> float:
+    """Two-sided p-value of the Mann-Whitney U test (normal approximation, tie-corrected)."""
+    n1, n2 = len(a), len(b)
+    if n1 == 0 or n2 == 0:
+        return 1.0
+    combined = sorted([(v, 0) for v in a] + [(v, 1) for v in b])
+    ranks = [0.0] * len(combined)
+    tie_term = 0.0
+    i = 0
+    while i < len(combined):
+        j = i
+        while j + 1 < len(combined) and combined[j + 1][0] == combined[i][0]:
+            j += 1
+        avg_rank = (i + j) / 2.0 + 1
+        for k in range(i, j + 1):
+            ranks[k] = avg_rank
+        ties = j - i + 1
+        tie_term += ties ** 3 - ties
+        i = j + 1
+
+    rank_sum_a = sum(rank for rank, (_, origin) in zip(ranks, combined) if origin == 0)
+    u = rank_sum_a - n1 * (n1 + 1) / 2.0
+    mean_u = n1 * n2 / 2.0
+    n = n1 + n2
+    var_u = n1 * n2 / 12.0 * ((n + 1) - tie_term / (n * (n - 1))) if n > 1 else 0.0
+    if var_u <= 0:
+        return 1.0
+    z = (abs(u - mean_u) - 0.5) / math.sqrt(var_u)
+    return math.erfc(max(z, 0.0) / math.sqrt(2))
+
+
+def compare_to_baseline(current: dict, baseline: dict, threshold: float, alpha: float = 0.05) -> List[dict]:
+    """
+    A change is reported as significant only if the medians differ by more
+    than `threshold` percent AND the sample distributions differ (p < alpha).
+    """
+    rows = []
+    for name, result in current.items():
+        base = baseline.get(name)
+        if base is None:
+            rows.append({"name": name, "verdict": "new"})
+            continue
+        old_median = base["stats"]["median"]
+        new_median = result["stats"]["median"]
+        change = (new_median - old_median) / old_median * 100.0 if old_median else 0.0
+        p_value = mann_whitney_u(base["samples"], result["samples"])
+        if p_value < alpha and abs(change) > threshold:
+            verdict = "slower" if change > 0 else "faster"
+        else:
+            verdict = "same"
+        rows.append({
+            "name": name,
+            "old_median": old_median,
+            "new_median": new_median,
+            "change_pct": change,
+            "p_value": p_value,
+            "old_peak_bytes": base["memory"]["peak_bytes"],
+            "new_peak_bytes": result["memory"]["peak_bytes"],
+            "verdict": verdict,
+        })
+    return rows
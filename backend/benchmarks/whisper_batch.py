@@ -0,0 +1,119 @@
+"""
+Throughput of batched Whisper decoding across concurrent transcriptions.
+
+    python -m benchmarks.whisper_batch --model base --audio visit.wav --requests 8
+    python -m benchmarks.whisper_batch --batch-sizes 1,4,8 --profile int8
+
+For every batch size, `--requests` transcriptions are started at once through
+a WhisperBatchScheduler and the audio-seconds-per-second throughput, mean
+achieved batch size and per-request latency are reported. The stock sequential
+`model.transcribe()` (one request at a time) is measured as the baseline.
+"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+os.environ.setdefault("WHISPER_MODEL", "tiny")
+
+import whisper  # noqa: E402
+
+from app.services.transcription_service import configure_torch_threads, load_whisper_model  # noqa: E402
+from app.services.whisper_batcher import WhisperBatchScheduler  # noqa: E402
+from benchmarks.load_test import synthetic_wav  # noqa: E402
+from benchmarks.stats import environment_info, summarize  # noqa: E402
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def _load_audio(path):
+    if not path:
+        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as f:
+            f.write(synthetic_wav(60.0))
+        path = f.name
+    return whisper.load_audio(path)
+
+
+def _run_concurrently(transcribe, audio, requests: int) -> dict:
+    latencies = []
+    lock = threading.Lock()
+
+    def one():
+        start = time.perf_counter()
+        transcribe(audio)
+        with lock:
+            latencies.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=requests) as pool:
+        for future in [pool.submit(one) for _ in range(requests)]:
+            future.result()
+    wall = time.perf_counter() - started
+    audio_seconds = len(audio) / whisper.audio.SAMPLE_RATE * requests
+    return {
+        "wall_seconds": wall,
+        "audio_seconds_per_second": audio_seconds / wall if wall else 0.0,
+        "latency": summarize(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="base")
+    parser.add_argument("--profile", default="default", help="WHISPER_CPU_PROFILE to load")
+    parser.add_argument("--audio", help="Recording to transcribe (default: 60 s synthetic tone)")
+    parser.add_argument("--requests", type=int, default=8, help="Concurrent transcriptions per run")
+    parser.add_argument("--batch-sizes", default="1,4,8")
+    parser.add_argument("--wait-ms", type=int, default=50)
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--output-dir", default=RESULTS_DIR)
+    args = parser.parse_args()
+
+    threads = configure_torch_threads(args.threads) if args.threads else os.cpu_count()
+    model = load_whisper_model(args.model, cpu_profile=args.profile)
+    audio = _load_audio(args.audio)
+    model_lock = threading.Lock()
+
+    def sequential(samples):
+        with model_lock:
+            return model.transcribe(samples, fp16=False)
+
+    sequential(audio[: whisper.audio.SAMPLE_RATE * 5])  # warm-up
+    runs = {"sequential": _run_concurrently(sequential, audio, args.requests)}
+
+    for size in [int(s) for s in args.batch_sizes.split(",") if s.strip()]:
+        scheduler = WhisperBatchScheduler(model, model_lock, max_batch_size=size, max_wait_ms=args.wait_ms)
+        run = _run_concurrently(scheduler.transcribe, audio, args.requests)
+        run["mean_batch_size"] = scheduler.windows_decoded / max(scheduler.batches_decoded, 1)
+        runs[f"batch_{size}"] = run
+
+    base = runs["sequential"]["audio_seconds_per_second"]
+    print(f"model={args.model} profile={args.profile} threads={threads} requests={args.requests} "
+          f"audio={len(audio) / whisper.audio.SAMPLE_RATE:.0f}s\n")
+    print(f"{'run':<12}{'audio s/s':>11}{'speedup':>9}{'mean batch':>12}{'p50 s':>9}{'p95 s':>9}")
+    for name, run in runs.items():
+        print(f"{name:<12}{run['audio_seconds_per_second']:>11.2f}{run['audio_seconds_per_second'] / base:>8.2f}x"
+              f"{run.get('mean_batch_size', 1.0):>12.2f}{run['latency']['p50']:>9.2f}{run['latency']['p95']:>9.2f}")
+
+    payload = {
+        "kind": "whisper_batch",
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "environment": environment_info(),
+        "config": {"model": args.model, "profile": args.profile, "threads": threads,
+                   "requests": args.requests, "wait_ms": args.wait_ms},
+        "runs": runs,
+    }
+    os.makedirs(args.output_dir, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    path = os.path.join(args.output_dir, f"whisper_batch_{stamp}_{payload['environment']['git_revision']}.json")
+    with open(path, "w") as f:
+        json.dump(payload, f, indent=2)
+    print(f"\nSaved {path}")
+
+
+if __name__ == "__main__":
+    main()
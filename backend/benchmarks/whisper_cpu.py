@@ -0,0 +1,156 @@
+"""
+Compare Whisper CPU inference profiles: real-time factor and word error rate.
+
+    python -m benchmarks.whisper_cpu --model base --audio visit1.wav visit2.wav
+    python -m benchmarks.whisper_cpu --profiles default,int8 --threads 4 --compile
+
+Reference transcripts are read from a sidecar file next to each recording
+(visit1.wav -> visit1.txt). Without one, only RTF and the word error rate
+against the default profile's output are reported. With no --audio at all a
+synthetic tone is used, which only measures speed.
+"""
+import argparse
+import gc
+import json
+import os
+import tempfile
+import time
+from datetime import datetime, timezone
+
+# The service loads its own model on import; keep that one small
+os.environ.setdefault("WHISPER_MODEL", "tiny")
+
+import whisper  # noqa: E402
+from whisper.normalizers import EnglishTextNormalizer  # noqa: E402
+
+from app.services.transcription_service import configure_torch_threads, load_whisper_model  # noqa: E402
+from app.utils.process_memory import memory_usage  # noqa: E402
+from benchmarks.load_test import synthetic_wav  # noqa: E402
+from benchmarks.stats import environment_info, percentile, word_error_rate  # noqa: E402
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+normalizer = EnglishTextNormalizer()
+
+
+def _words(text: str):
+    return normalizer(text).split()
+
+
+def _reference_for(path: str):
+    sidecar = os.path.splitext(path)[0] + ".txt"
+    if os.path.exists(sidecar):
+        with open(sidecar) as f:
+            return f.read()
+    return None
+
+
+def _load_inputs(paths):
+    if not paths:
+        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as f:
+            f.write(synthetic_wav(30.0))
+        paths = [f.name]
+    inputs = []
+    for path in paths:
+        audio = whisper.load_audio(path)
+        inputs.append({
+            "name": os.path.basename(path),
+            "audio": audio,
+            "seconds": len(audio) / whisper.audio.SAMPLE_RATE,
+            "reference": _reference_for(path),
+        })
+    return inputs
+
+
+def run_profile(profile: str, args, inputs) -> dict:
+    gc.collect()
+    rss_before = memory_usage()["rss"]
+    started = time.perf_counter()
+    model = load_whisper_model(args.model, cpu_profile=profile, compile_encoder=args.compile)
+    load_seconds = time.perf_counter() - started
+    rss_after = memory_usage()["rss"]
+
+    # Warm-up: first call pays for allocator growth (and compilation with --compile)
+    model.transcribe(inputs[0]["audio"][: whisper.audio.SAMPLE_RATE * 5], fp16=False)
+
+    files = []
+    for item in inputs:
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            result = model.transcribe(item["audio"], fp16=False, language=args.language)
+            timings.append(time.perf_counter() - start)
+        median = percentile(timings, 50)
+        entry = {
+            "name": item["name"],
+            "audio_seconds": item["seconds"],
+            "median_seconds": median,
+            "rtf": median / item["seconds"] if item["seconds"] else 0.0,
+            "text": result["text"].strip(),
+        }
+        if item["reference"] is not None:
+            entry["wer"] = word_error_rate(_words(item["reference"]), _words(result["text"]))
+        files.append(entry)
+
+    total_audio = sum(f["audio_seconds"] for f in files)
+    total_time = sum(f["median_seconds"] for f in files)
+    del model
+    return {
+        "profile": profile,
+        "load_seconds": load_seconds,
+        "model_rss_bytes": max(rss_after - rss_before, 0),
+        "rtf": total_time / total_audio if total_audio else 0.0,
+        "files": files,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="base")
+    parser.add_argument("--audio", nargs="*", default=[])
+    parser.add_argument("--profiles", default="default,int8", help="Comma-separated CPU profiles to compare")
+    parser.add_argument("--threads", type=int, default=0, help="torch threads (0 = all CPUs)")
+    parser.add_argument("--compile", action="store_true", help="torch.compile the encoder")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--language", default="en")
+    parser.add_argument("--output-dir", default=RESULTS_DIR)
+    args = parser.parse_args()
+
+    threads = configure_torch_threads(args.threads) if args.threads else os.cpu_count()
+    inputs = _load_inputs(args.audio)
+    profiles = [run_profile(p.strip(), args, inputs) for p in args.profiles.split(",") if p.strip()]
+
+    # Without references, measure how far each profile drifts from the fp32 output
+    baseline = next((p for p in profiles if p["profile"] == "default"), None)
+    for profile in profiles:
+        for entry, base in zip(profile["files"], baseline["files"] if baseline else []):
+            entry["wer_vs_default"] = word_error_rate(_words(base["text"]), _words(entry["text"]))
+
+    print(f"model={args.model} threads={threads} compile={args.compile} repeat={args.repeat}\n")
+    print(f"{'profile':<10}{'file':<28}{'audio s':>9}{'time s':>9}{'RTF':>8}{'WER':>8}{'WER vs fp32':>13}")
+    for profile in profiles:
+        for entry in profile["files"]:
+            wer = f"{entry['wer'] * 100:.1f}%" if "wer" in entry else "-"
+            drift = f"{entry['wer_vs_default'] * 100:.1f}%" if "wer_vs_default" in entry else "-"
+            print(f"{profile['profile']:<10}{entry['name'][:27]:<28}{entry['audio_seconds']:>9.1f}"
+                  f"{entry['median_seconds']:>9.2f}{entry['rtf']:>8.3f}{wer:>8}{drift:>13}")
+        print(f"{profile['profile']:<10}{'TOTAL':<28}{'':>9}{'':>9}{profile['rtf']:>8.3f}"
+              f"   load {profile['load_seconds']:.1f}s, +{profile['model_rss_bytes'] / 2**20:.0f} MiB RSS")
+
+    payload = {
+        "kind": "whisper_cpu",
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "environment": environment_info(),
+        "config": {"model": args.model, "threads": threads, "compile": args.compile, "repeat": args.repeat},
+        "profiles": profiles,
+    }
+    os.makedirs(args.output_dir, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    path = os.path.join(args.output_dir, f"whisper_cpu_{stamp}_{payload['environment']['git_revision']}.json")
+    with open(path, "w") as f:
+        json.dump(payload, f, indent=2)
+    print(f"\nSaved {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Production launcher: gunicorn master + uvicorn workers.
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+The master imports the app (and with it the Whisper weights) once, then forks
+WEB_CONCURRENCY workers that share those pages copy-on-write instead of each
+loading its own copy. Every worker gets its own torch thread budget, logging
+thread and DB pool, and the master periodically logs each worker's memory.
+Running more than one worker requires STATE_BACKEND=redis (checked at import),
+so revocations, login limits and /metrics are shared rather than per process.
+"""
+import gc
+import os
+import threading
+import time
+
+from app.core.config import settings
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = settings.WEB_CONCURRENCY
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+# Transcriptions run for a while but keep the event loop (and heartbeat) responsive
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+
+
+def when_ready(server):
+    # Move everything allocated during preload into the permanent generation so
+    # the workers' garbage collector never writes to (and un-shares) those pages
+    gc.collect()
+    gc.freeze()
+
+    if settings.WORKER_MEMORY_REPORT_SECONDS > 0:
+        threading.Thread(target=_report_worker_memory, args=(server,), name="worker-memory", daemon=True).start()
+
+
+def post_fork(server, worker):
+    from app.db.database import engine
+    from app.services.transcription_service import configure_torch_threads
+    from app.utils.logger import restart_logging_after_fork
+
+    restart_logging_after_fork()
+    # Never share pooled connections across processes
+    engine.dispose(close=False)
+    threads = configure_torch_threads(settings.TORCH_NUM_THREADS)
+    server.log.info("Worker %s ready (torch threads: %s)", worker.pid, threads)
+
+
+def _report_worker_memory(server):
+    from app.utils.process_memory import memory_usage
+
+    mib = 1024 * 1024
+    while True:
+        time.sleep(settings.WORKER_MEMORY_REPORT_SECONDS)
+        total_pss = 0
+        for pid in list(server.WORKERS):
+            try:
+                usage = memory_usage(pid)
+            except OSError:
+                continue
+            total_pss += usage["pss"]
+            server.log.info(
+                "worker %s memory: rss=%.0fMiB pss=%.0fMiB shared=%.0fMiB private=%.0fMiB",
+                pid, usage["rss"] / mib, usage["pss"] / mib, usage["shared"] / mib, usage["private"] / mib,
+            )
+        server.log.info("workers total pss=%.0fMiB", total_pss / mib)
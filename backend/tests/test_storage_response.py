@@ -0,0 +1,29 @@
+import pytest
+
+from app.utils.storage_response import parse_range_header
+
+
+def test_byte_ranges():
+    assert parse_range_header("bytes=0-99", 1000) == (0, 99)
+    assert parse_range_header("bytes=900-", 1000) == (900, 999)
+    assert parse_range_header("bytes=-100", 1000) == (900, 999)
+    assert parse_range_header("bytes=-5000", 1000) == (0, 999)
+    assert parse_range_header("bytes=0-5000", 1000) == (0, 999)
+
+
+def test_ignored_ranges():
+    assert parse_range_header("bytes=0-1,5-6", 1000) is None
+    assert parse_range_header("bytes=-", 1000) is None
+    assert parse_range_header("items=0-1", 1000) is None
+
+
+@pytest.mark.parametrize("header", ["bytes=-5", "bytes=0-", "bytes=0-0"])
+def test_empty_object_is_unsatisfiable(header):
+    with pytest.raises(ValueError):
+        parse_range_header(header, 0)
+
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=5-4", "bytes=-0"])
+def test_unsatisfiable_ranges(header):
+    with pytest.raises(ValueError):
+        parse_range_header(header, 1000)
@@ -0,0 +1,45 @@
+from app.services.transcript_compaction import clean_transcript
+
+
+def test_fillers_are_removed():
+    assert clean_transcript("Um, the pain started, uh, two days ago.") == "The pain started two days ago."
+    assert clean_transcript("It's, erm, worse at night.") == "It's worse at night."
+
+
+def test_answers_that_look_like_fillers_are_kept():
+    assert clean_transcript("Uh-huh. Mm-hmm, that's right.") == "Uh-huh. Mm-hmm, that's right."
+
+
+def test_clinical_abbreviations_are_kept():
+    text = "She was seen in the ER and transferred to UH. HM noted on exam."
+    assert clean_transcript(text) == text
+
+
+def test_bracketed_clinical_text_is_kept():
+    text = "Use albuterol (PRN) for wheeze. He takes 10 mg [sic] daily."
+    assert clean_transcript(text) == text
+
+
+def test_whisper_tags_are_removed():
+    text = "[BLANK_AUDIO] Any allergies? [Music] No known drug allergies. (coughing) ♪♪"
+    assert clean_transcript(text) == "Any allergies? No known drug allergies."
+
+
+def test_intentional_double_words_are_kept():
+    assert clean_transcript("She had had chest pain before.") == "She had had chest pain before."
+    assert clean_transcript("I know that that hurts.") == "I know that that hurts."
+
+
+def test_stutters_are_collapsed():
+    assert clean_transcript("I I think th- the rash is new.") == "I think the rash is new."
+    assert clean_transcript("It's sore sore sore here.") == "It's sore here."
+
+
+def test_repeated_dosing_instruction_is_kept():
+    text = "Take metformin 500 mg BID with meals. Take metformin 500 mg BID with meals."
+    assert clean_transcript(text) == text
+
+
+def test_repetition_loop_is_collapsed():
+    text = "Blood pressure is 120 over 80. " + "The patient is stable. " * 5
+    assert clean_transcript(text) == "Blood pressure is 120 over 80. The patient is stable."
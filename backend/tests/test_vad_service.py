@@ -0,0 +1,59 @@
+import numpy as np
+
+from app.services.vad_service import SAMPLE_RATE, SpeechRegion, detect_speech
+
+rng = np.random.default_rng(0)
+
+
+def _noise(seconds: float, dbfs: float) -> np.ndarray:
+    return (rng.standard_normal(int(seconds * SAMPLE_RATE)) * 10 ** (dbfs / 20)).astype(np.float32)
+
+
+def _speech(seconds: float, dbfs: float) -> np.ndarray:
+    # Noise shaped by a 4 Hz syllable envelope that dips ~10 dB between syllables
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    envelope = 0.65 + 0.35 * np.sin(2 * np.pi * 4 * t)
+    return (_noise(seconds, dbfs) * envelope).astype(np.float32)
+
+
+def _covered(regions, start_s: float, end_s: float) -> bool:
+    start, end = int(start_s * SAMPLE_RATE), int(end_s * SAMPLE_RATE)
+    return any(r.start <= start and r.end >= end for r in regions)
+
+
+def test_continuous_speech_is_kept_whole():
+    audio = _speech(20, -20)
+    assert detect_speech(audio) == [SpeechRegion(0, len(audio))]
+
+
+def test_mostly_speech_with_one_short_pause_keeps_the_speech():
+    audio = np.concatenate([_speech(15, -20), _noise(1, -70), _speech(15, -20)])
+    regions = detect_speech(audio)
+    assert _covered(regions, 0.5, 14.5)
+    assert _covered(regions, 16.5, 30.5)
+
+
+def test_quiet_speaker_is_detected():
+    audio = np.concatenate([_noise(3, -80), _speech(5, -55), _noise(3, -80), _speech(5, -55), _noise(3, -80)])
+    regions = detect_speech(audio)
+    assert len(regions) == 2
+    assert _covered(regions, 3.3, 7.7)
+    assert _covered(regions, 11.3, 15.7)
+
+
+def test_steady_noise_without_pauses_still_reaches_whisper():
+    audio = _noise(10, -40)
+    assert detect_speech(audio) == [SpeechRegion(0, len(audio))]
+
+
+def test_pauses_are_cut_out():
+    audio = np.concatenate([_speech(4, -25), _noise(4, -65), _speech(4, -25)])
+    regions = detect_speech(audio)
+    assert len(regions) == 2
+    assert regions[0].end < 6 * SAMPLE_RATE < regions[1].start
+
+
+def test_only_silent_audio_is_skipped():
+    assert detect_speech(_noise(5, -75)) == []
+    assert detect_speech(np.zeros(SAMPLE_RATE, dtype=np.float32)) == []
+    assert detect_speech(np.zeros(0, dtype=np.float32)) == []